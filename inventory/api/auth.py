@@ -1,39 +1,137 @@
 import frappe
 import jwt
 import datetime
-import os
-import secrets
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
 from frappe import _
 
+from inventory.api.log_buffer import log_api_error
+
+# Verified tokens kept per worker process (token hash -> claims) until they expire
+MAX_VERIFIED_TOKENS = 4096
+
+# Cache key prefix and lifetime of the user details served to token holders
+USER_CLAIMS_CACHE_KEY = "jwt_user_claims_v2"
+USER_CLAIMS_CACHE_TTL = 3600
+
+# Seconds a worker keeps the site's JWT settings before reading site_config.json again
+JWT_SETTINGS_TTL = 60
+
+_site_settings = {}
+_verified_tokens = OrderedDict()
+_verified_tokens_lock = threading.Lock()
+
 # Configuration with fallbacks
 def get_jwt_settings():
-    """Get JWT settings from site_config.json with fallbacks"""
+    """Get JWT settings from site_config.json with fallbacks, kept per site and process
+    for `JWT_SETTINGS_TTL` seconds so a rotated secret or expiry is picked up
+
+    Without `jwt_secret_key` the secret is derived from the site's encryption key, so
+    every worker of a site signs and verifies with the same key.
+    """
+    site = frappe.local.site
+    settings = _site_settings.get(site)
+    if settings and settings["loaded_at"] > time.monotonic() - JWT_SETTINGS_TTL:
+        return settings
+
     # Try to get settings from site_config.json
     secret_key = frappe.conf.get("jwt_secret_key")
     expiry_time = frappe.conf.get("jwt_expiry_time")
     
     # If settings not found, use defaults
     if not secret_key:
-        # In production, use a random key and log it
-        if frappe.local.flags.in_production:
-            secret_key = secrets.token_hex(32)
-            frappe.log_error(f"JWT_SECRET_KEY not set in site_config.json. Using temporary key: {secret_key}")
-        else:
-            # For development, use a fixed key
-            secret_key = "your-secret-key-for-development-only"
+        from frappe.utils.password import get_encryption_key
+        secret_key = hmac.new(
+            get_encryption_key().encode(), f"inventory-jwt:{site}".encode(), hashlib.sha256
+        ).hexdigest()
     
     if not expiry_time:
         # Default: 24 hours
         expiry_time = 24 * 60 * 60
     
-    return {
+    _site_settings[site] = {
         "secret_key": secret_key,
         "algorithm": "HS256",
-        "expiry_time": expiry_time
+        "expiry_time": int(expiry_time),
+        "loaded_at": time.monotonic()
     }
+    return _site_settings[site]
+
+def verify_token(token, verify_exp=True):
+    """Decode and verify a token, remembering verified tokens until their `exp`
+
+    Raises jwt.ExpiredSignatureError / jwt.InvalidTokenError like jwt.decode.
+    """
+    settings = get_jwt_settings()
+    if not verify_exp:
+        return jwt.decode(
+            token,
+            settings["secret_key"],
+            algorithms=[settings["algorithm"]],
+            options={"verify_exp": False}
+        )
+
+    key = (frappe.local.site, hashlib.sha256(token.encode()).hexdigest())
+    with _verified_tokens_lock:
+        cached = _verified_tokens.get(key)
+        if cached:
+            if cached["exp"] > time.time():
+                _verified_tokens.move_to_end(key)
+                return cached
+            del _verified_tokens[key]
 
-# Get JWT settings
-JWT_SETTINGS = get_jwt_settings()
+    payload = jwt.decode(token, settings["secret_key"], algorithms=[settings["algorithm"]])
+
+    with _verified_tokens_lock:
+        _verified_tokens[key] = payload
+        while len(_verified_tokens) > MAX_VERIFIED_TOKENS:
+            _verified_tokens.popitem(last=False)
+    return payload
+
+def get_user_claims(user):
+    """Name, email, roles and enabled flag of a user, cached until the user is updated
+
+    Returns None for a user that no longer exists.
+    """
+    cache_key = f"{USER_CLAIMS_CACHE_KEY}:{user}"
+    claims = frappe.cache().get_value(cache_key)
+    if claims is None:
+        if not frappe.db.exists("User", user):
+            return None
+        user_doc = frappe.get_doc("User", user)
+        claims = {
+            "full_name": user_doc.full_name,
+            "email": user_doc.email,
+            "roles": [role.role for role in user_doc.roles],
+            "enabled": user_doc.enabled
+        }
+        frappe.cache().set_value(cache_key, claims, expires_in_sec=USER_CLAIMS_CACHE_TTL)
+    return claims
+
+def clear_user_claims(doc, method=None):
+    """User on_update/on_trash hook: drop the cached claims (roles may have changed)"""
+    frappe.cache().delete_value(f"{USER_CLAIMS_CACHE_KEY}:{doc.name}")
+
+def is_active_user(claims):
+    return bool(claims and claims.get("enabled"))
+
+def make_token(user):
+    """Signed token carrying the user's name, email and roles"""
+    settings = get_jwt_settings()
+    claims = get_user_claims(user)
+    now = datetime.datetime.utcnow()
+    payload = {
+        "user": user,
+        "exp": now + datetime.timedelta(seconds=settings["expiry_time"]),
+        "iat": now,
+        "full_name": claims["full_name"],
+        "email": claims["email"],
+        "roles": claims["roles"]
+    }
+    return jwt.encode(payload, settings["secret_key"], algorithm=settings["algorithm"]), claims
 
 @frappe.whitelist(allow_guest=True)
 def login():
@@ -75,15 +173,7 @@ def login():
         frappe.local.login_manager.post_login()
         
         # Generate JWT token
-        user = frappe.get_doc("User", frappe.session.user)
-        token_payload = {
-            "user": user.name,
-            "exp": datetime.datetime.utcnow() + datetime.timedelta(seconds=JWT_SETTINGS["expiry_time"]),
-            "iat": datetime.datetime.utcnow(),
-            "roles": [role.role for role in user.roles]
-        }
-        
-        token = jwt.encode(token_payload, JWT_SETTINGS["secret_key"], algorithm=JWT_SETTINGS["algorithm"])
+        token, claims = make_token(frappe.session.user)
         
         # Return success response with token
         return {
@@ -91,13 +181,13 @@ def login():
             "message": "Authentication successful",
             "token": token,
             "user": {
-                "name": user.full_name,
-                "email": user.email,
-                "roles": [role.role for role in user.roles]
+                "name": claims["full_name"],
+                "email": claims["email"],
+                "roles": claims["roles"]
             }
         }
     except Exception as e:
-        frappe.log_error(f"Mobile API Login Error: {str(e)}")
+        log_api_error("login", e)
         return generate_error_response(f"Login failed: {str(e)}")
 
 @frappe.whitelist()
@@ -112,15 +202,19 @@ def validate_token():
         token = auth_header.split(" ")[1]
         
         try:
-            payload = jwt.decode(token, JWT_SETTINGS["secret_key"], algorithms=[JWT_SETTINGS["algorithm"]])
-            user = frappe.get_doc("User", payload["user"])
+            payload = verify_token(token)
+            # The token's own copy of the roles may be outdated: serve the current ones
+            claims = get_user_claims(payload["user"])
+            if not is_active_user(claims):
+                frappe.local.response["http_status_code"] = 401
+                return generate_error_response("User is disabled")
             
             return {
                 "success": True,
                 "user": {
-                    "name": user.full_name,
-                    "email": user.email,
-                    "roles": [role.role for role in user.roles]
+                    "name": claims.get("full_name"),
+                    "email": claims.get("email"),
+                    "roles": claims.get("roles") or []
                 }
             }
         except jwt.ExpiredSignatureError:
@@ -130,7 +224,7 @@ def validate_token():
             frappe.local.response["http_status_code"] = 401
             return generate_error_response("Invalid token")
     except Exception as e:
-        frappe.log_error(f"Token Validation Error: {str(e)}")
+        log_api_error("validate_token", e)
         frappe.local.response["http_status_code"] = 500
         return generate_error_response(f"Error validating token: {str(e)}")
 
@@ -147,23 +241,13 @@ def refresh_token():
         
         try:
             # Decode token without verifying expiration
-            payload = jwt.decode(
-                token, 
-                JWT_SETTINGS["secret_key"], 
-                algorithms=[JWT_SETTINGS["algorithm"]],
-                options={"verify_exp": False}
-            )
-            
-            # Generate new token
-            user = frappe.get_doc("User", payload["user"])
-            new_payload = {
-                "user": user.name,
-                "exp": datetime.datetime.utcnow() + datetime.timedelta(seconds=JWT_SETTINGS["expiry_time"]),
-                "iat": datetime.datetime.utcnow(),
-                "roles": [role.role for role in user.roles]
-            }
+            payload = verify_token(token, verify_exp=False)
+            if not is_active_user(get_user_claims(payload["user"])):
+                frappe.local.response["http_status_code"] = 401
+                return generate_error_response("User is disabled")
             
-            new_token = jwt.encode(new_payload, JWT_SETTINGS["secret_key"], algorithm=JWT_SETTINGS["algorithm"])
+            # Generate new token (roles come from the cached claims, refreshed on User update)
+            new_token, claims = make_token(payload["user"])
             
             return {
                 "success": True,
@@ -174,7 +258,7 @@ def refresh_token():
             frappe.local.response["http_status_code"] = 401
             return generate_error_response("Invalid token")
     except Exception as e:
-        frappe.log_error(f"Token Refresh Error: {str(e)}")
+        log_api_error("refresh_token", e)
         frappe.local.response["http_status_code"] = 500
         return generate_error_response(f"Error refreshing token: {str(e)}")
 
@@ -212,7 +296,10 @@ def authenticate_request():
         token = auth_header.split(" ")[1]
         
         try:
-            payload = jwt.decode(token, JWT_SETTINGS["secret_key"], algorithms=[JWT_SETTINGS["algorithm"]])
+            payload = verify_token(token)
+            if not is_active_user(get_user_claims(payload["user"])):
+                frappe.local.response["http_status_code"] = 401
+                return generate_error_response("User is disabled")
             frappe.session.user = payload["user"]
             return {"success": True}
         except jwt.ExpiredSignatureError:
@@ -222,7 +309,7 @@ def authenticate_request():
             frappe.local.response["http_status_code"] = 401
             return generate_error_response("Invalid token")
     except Exception as e:
-        frappe.log_error(f"Authentication Error: {str(e)}")
+        log_api_error("authenticate_request", e)
         frappe.local.response["http_status_code"] = 500
         return generate_error_response(f"Error authenticating request: {str(e)}")
 
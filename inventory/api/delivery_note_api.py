@@ -2,6 +2,7 @@ import frappe
 from frappe import _
 from frappe.utils import cint, flt, getdate, now_datetime
 from frappe.utils.response import build_response
+from inventory.api.log_buffer import log_api_error
 
 @frappe.whitelist()
 def list_delivery_notes():
@@ -23,7 +24,7 @@ def list_delivery_notes():
             "data": delivery_notes
         }
     except Exception as e:
-        frappe.log_error(f"Error in list_delivery_notes: {str(e)}")
+        log_api_error("list_delivery_notes", e)
         return {
             "success": False,
             "message": f"Failed to retrieve delivery notes: {str(e)}"
@@ -63,7 +64,7 @@ def get_delivery_note(delivery_note_id):
             "message": f"Delivery note {delivery_note_id} not found"
         }
     except Exception as e:
-        frappe.log_error(f"Error in get_delivery_note: {str(e)}")
+        log_api_error("get_delivery_note", e)
         return {
             "success": False,
             "message": f"Failed to retrieve delivery note: {str(e)}"
@@ -169,7 +170,7 @@ def create_delivery_note():
             }
         }
     except Exception as e:
-        frappe.log_error(f"Error in create_delivery_note: {str(e)}")
+        log_api_error("create_delivery_note", e)
         return {
             "success": False,
             "message": f"Failed to create delivery note: {str(e)}"
@@ -277,7 +278,7 @@ def update_delivery_note(delivery_note_id):
             "message": f"Delivery note {delivery_note_id} not found"
         }
     except Exception as e:
-        frappe.log_error(f"Error in update_delivery_note: {str(e)}")
+        log_api_error("update_delivery_note", e)
         return {
             "success": False,
             "message": f"Failed to update delivery note: {str(e)}"
@@ -324,7 +325,7 @@ def delete_delivery_note(delivery_note_id):
             "message": f"Delivery note {delivery_note_id} not found"
         }
     except Exception as e:
-        frappe.log_error(f"Error in delete_delivery_note: {str(e)}")
+        log_api_error("delete_delivery_note", e)
         return {
             "success": False,
             "message": f"Failed to delete delivery note: {str(e)}"
@@ -375,7 +376,7 @@ def submit_delivery_note(delivery_note_id):
             "message": f"Delivery note {delivery_note_id} not found"
         }
     except Exception as e:
-        frappe.log_error(f"Error in submit_delivery_note: {str(e)}")
+        log_api_error("submit_delivery_note", e)
         return {
             "success": False,
             "message": f"Failed to submit delivery note: {str(e)}"
@@ -433,7 +434,7 @@ def cancel_delivery_note(delivery_note_id):
             "message": f"Delivery note {delivery_note_id} not found"
         }
     except Exception as e:
-        frappe.log_error(f"Error in cancel_delivery_note: {str(e)}")
+        log_api_error("cancel_delivery_note", e)
         return {
             "success": False,
             "message": f"Failed to cancel delivery note: {str(e)}"
@@ -469,7 +470,7 @@ def get_delivery_notes_for_customer(customer_id):
             "data": delivery_notes
         }
     except Exception as e:
-        frappe.log_error(f"Error in get_delivery_notes_for_customer: {str(e)}")
+        log_api_error("get_delivery_notes_for_customer", e)
         return {
             "success": False,
             "message": f"Failed to retrieve delivery notes: {str(e)}"
@@ -494,47 +495,27 @@ def get_delivery_note_items_from_sales_order(sales_order_id):
             }
         
         # Check if sales order exists
-        if not frappe.db.exists("Sales Order", sales_order_id):
+        so = frappe.db.get_value("Sales Order", sales_order_id, ["customer", "customer_name"], as_dict=True)
+        if not so:
             return {
                 "success": False,
                 "message": f"Sales Order {sales_order_id} not found"
             }
         
-        # Get sales order
-        so = frappe.get_doc("Sales Order", sales_order_id)
-        
         # Get customer details
         customer_info = {
             "customer": so.customer,
             "customer_name": so.customer_name
         }
         
-        # Get items
-        items = []
-        for item in so.items:
-            # Get delivered quantity
-            delivered_qty = frappe.db.sql("""
-                SELECT SUM(dni.quantity)
-                FROM `tabDelivery Note Item` dni
-                JOIN `tabDelivery Note` dn ON dni.parent = dn.name
-                WHERE dni.sales_order = %s
-                AND dni.item = %s
-                AND dn.docstatus = 1
-            """, (sales_order_id, item.item), as_dict=0)
-            
-            delivered_qty = flt(delivered_qty[0][0]) if delivered_qty and delivered_qty[0][0] else 0
-            pending_qty = flt(item.quantity) - delivered_qty
-            
-            if pending_qty > 0:
-                items.append({
-                    "item": item.item,
-                    "item_name": item.item_name,
-                    "quantity": pending_qty,
-                    "rate": item.rate,
-                    "uom": item.uom,
-                    "sales_order": sales_order_id,
-                    "sales_order_item": item.name
-                })
+        # Pending quantities come straight from the lines' delivered_qty counters
+        items = frappe.db.sql("""
+            SELECT item, item_name, quantity - delivered_qty AS quantity, rate, uom,
+                parent AS sales_order, name AS sales_order_item
+            FROM `tabSales Order Item`
+            WHERE parent = %s AND parenttype = 'Sales Order' AND quantity > delivered_qty
+            ORDER BY idx
+        """, (sales_order_id,), as_dict=True)
         
         return {
             "success": True,
@@ -544,7 +525,7 @@ def get_delivery_note_items_from_sales_order(sales_order_id):
             }
         }
     except Exception as e:
-        frappe.log_error(f"Error in get_delivery_note_items_from_sales_order: {str(e)}")
+        log_api_error("get_delivery_note_items_from_sales_order", e)
         return {
             "success": False,
             "message": f"Failed to retrieve sales order items: {str(e)}"
@@ -0,0 +1,219 @@
+"""Buffered, structured error and latency logging for the POS and mobile endpoints.
+
+`log_api_error` does not touch the database: it records the error in redis, where
+identical errors (same endpoint, error class and message shape) are counted instead of
+repeated, and a per-site rate limit caps how many distinct records a burst can create.
+Slow requests are recorded the same way by the after_request hook.
+
+`flush_api_log` (scheduler, or a background job once the buffer fills) moves the
+buffered records into Error Log in batches, each with its daily occurrence count, endpoint,
+latency, error class and the correlation id of the first request it happened in.
+"""
+
+import hashlib
+import json
+import re
+import time
+import uuid
+
+import frappe
+from frappe.utils import cint, now
+
+CORRELATION_HEADER = "X-Request-ID"
+
+# Redis keys of the pipeline
+LOG_BUFFER_KEY = "inventory_api_log_buffer"
+LOG_SEEN_KEY = "inventory_api_log_seen"
+LOG_COUNT_KEY = "inventory_api_log_count"
+LOG_RATE_KEY = "inventory_api_log_rate"
+
+# Identical records are merged within this window
+DEDUPE_WINDOW_SECONDS = 60
+
+# Distinct records accepted per site and window; the rest are only counted
+MAX_RECORDS_PER_WINDOW = 100
+
+# The buffer never grows beyond this many records
+MAX_BUFFERED_RECORDS = 10000
+
+# Records written to Error Log per flush (a flush job is queued when this many are waiting)
+FLUSH_BATCH_SIZE = 500
+
+# Requests slower than this are logged (site config `inventory_slow_request_ms`)
+DEFAULT_SLOW_REQUEST_MS = 3000
+
+MAX_MESSAGE_LENGTH = 1000
+
+_NUMBERS = re.compile(r"\d+")
+
+
+def start_request():
+    """before_request hook: request start time and correlation id"""
+    frappe.local.inventory_request_started = time.perf_counter()
+    frappe.local.inventory_correlation_id = (
+        frappe.get_request_header(CORRELATION_HEADER) or uuid.uuid4().hex[:16]
+    )[:64]
+
+
+def finish_request(response=None, request=None):
+    """after_request hook: echo the correlation id and log slow inventory calls"""
+    correlation_id = getattr(frappe.local, "inventory_correlation_id", None)
+    if not correlation_id:
+        return
+
+    if response is not None:
+        response.headers[CORRELATION_HEADER] = correlation_id
+
+    latency_ms = get_latency_ms()
+    endpoint = get_endpoint()
+    slow_request_ms = cint(frappe.conf.get("inventory_slow_request_ms")) or DEFAULT_SLOW_REQUEST_MS
+    if endpoint and latency_ms is not None and latency_ms > slow_request_ms:
+        push_record({
+            "kind": "slow",
+            "endpoint": endpoint,
+            "latency_ms": latency_ms,
+            "error_class": None,
+            "message": f"Slow request ({latency_ms:.0f} ms)",
+        })
+
+
+def get_latency_ms():
+    started = getattr(frappe.local, "inventory_request_started", None)
+    return round((time.perf_counter() - started) * 1000, 1) if started else None
+
+
+def get_endpoint():
+    """Method of the current API call (None outside an inventory API request)"""
+    request = getattr(frappe.local, "request", None)
+    if not request or "/method/" not in request.path:
+        return None
+    method = request.path.split("/method/", 1)[1].strip("/")
+    return method if method.startswith("inventory.") else None
+
+
+def log_api_error(endpoint, exc=None, message=None):
+    """Record a failed endpoint call without writing to the database
+
+    Use in place of `frappe.log_error` in request paths. `endpoint` names the function;
+    the record also carries the request method, latency, error class, message and
+    correlation id. Never raises.
+    """
+    try:
+        push_record({
+            "kind": "error",
+            "endpoint": get_endpoint() or endpoint,
+            "function": endpoint,
+            "latency_ms": get_latency_ms(),
+            "error_class": type(exc).__name__ if exc else None,
+            "message": (message or str(exc or ""))[:MAX_MESSAGE_LENGTH],
+        }, exc)
+    except Exception:
+        pass
+
+
+def get_fingerprint(record):
+    """Identical errors share a fingerprint: numbers (ids, quantities) are ignored"""
+    key = "|".join([
+        record["kind"], record["endpoint"] or "", record.get("error_class") or "",
+        _NUMBERS.sub("#", record["message"] if record["kind"] == "error" else ""),
+    ])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def push_record(record, exc=None):
+    """Dedupe, rate-limit and buffer one record; a repeat costs a single redis round trip"""
+    cache = frappe.cache()
+    window = int(time.time() // DEDUPE_WINDOW_SECONDS)
+    fingerprint = get_fingerprint(record)
+    count_key = cache.make_key(f"{LOG_COUNT_KEY}:{fingerprint}")
+
+    pipe = cache.pipeline()
+    pipe.incr(count_key)
+    pipe.expire(count_key, 24 * 3600)
+    pipe.set(cache.make_key(f"{LOG_SEEN_KEY}:{fingerprint}:{window}"), 1, nx=True, ex=DEDUPE_WINDOW_SECONDS * 2)
+    first_in_window = pipe.execute()[2]
+    if not first_in_window:
+        # Already buffered in this window: the count is all that changes
+        return
+
+    rate_key = cache.make_key(f"{LOG_RATE_KEY}:{window}")
+    pipe = cache.pipeline()
+    pipe.incr(rate_key)
+    pipe.expire(rate_key, DEDUPE_WINDOW_SECONDS * 2)
+    if pipe.execute()[0] > MAX_RECORDS_PER_WINDOW:
+        return
+
+    record.update({
+        "fingerprint": fingerprint,
+        "correlation_id": getattr(frappe.local, "inventory_correlation_id", None),
+        "user": getattr(getattr(frappe.local, "session", None), "user", None),
+        "timestamp": now(),
+        "traceback": frappe.get_traceback() if exc else None,
+    })
+    buffer_key = cache.make_key(LOG_BUFFER_KEY)
+    pipe = cache.pipeline()
+    pipe.rpush(buffer_key, json.dumps(record, default=str))
+    pipe.ltrim(buffer_key, -MAX_BUFFERED_RECORDS, -1)
+    buffered = pipe.execute()[0]
+
+    if buffered == FLUSH_BATCH_SIZE:
+        frappe.enqueue(
+            "inventory.api.log_buffer.flush_api_log",
+            queue="short",
+            job_id=f"{frappe.local.site}:inventory_flush_api_log",
+            deduplicate=True,
+            enqueue_after_commit=False,
+        )
+
+
+def peek_records(limit):
+    """Oldest buffered records, left in the buffer until `drop_records`"""
+    cache = frappe.cache()
+    return [json.loads(raw) for raw in cache.lrange(cache.make_key(LOG_BUFFER_KEY), 0, limit - 1)]
+
+
+def drop_records(count):
+    cache = frappe.cache()
+    cache.ltrim(cache.make_key(LOG_BUFFER_KEY), count, -1)
+
+
+def flush_api_log():
+    """Move buffered records to Error Log, one multi-row insert per batch
+
+    A batch leaves the buffer only once its Error Logs are committed, so a failed insert
+    or a worker that dies mid-batch leaves the records for the next flush.
+    """
+    cache = frappe.cache()
+    while True:
+        records = peek_records(FLUSH_BATCH_SIZE)
+        if not records:
+            return
+
+        pipe = cache.pipeline()
+        for record in records:
+            pipe.get(cache.make_key(f"{LOG_COUNT_KEY}:{record['fingerprint']}"))
+        counts = pipe.execute()
+
+        timestamp = now()
+        values = []
+        for record, count in zip(records, counts, strict=True):
+            # Occurrences over the last day, including the ones merged into this record
+            record["occurrences_24h"] = cint(count) or 1
+            title = f"{record['endpoint'] or record.get('function')}: {record['error_class'] or record['kind']}"
+            traceback = record.pop("traceback", None)
+            values.append((
+                frappe.generate_hash(length=10), timestamp, timestamp, "Administrator", "Administrator",
+                title[:140], json.dumps(record, indent=1, default=str) + (f"\n\n{traceback}" if traceback else ""),
+                0,
+            ))
+
+        frappe.db.bulk_insert(
+            "Error Log",
+            fields=["name", "creation", "modified", "owner", "modified_by", "method", "error", "seen"],
+            values=values,
+        )
+        frappe.db.commit()
+        drop_records(len(records))
+
+        if len(records) < FLUSH_BATCH_SIZE:
+            return
@@ -1,9 +1,32 @@
 import frappe
 from frappe import _
 from frappe.utils import cint, flt
+from inventory.api.log_buffer import log_api_error
+from inventory.inventory.doctype.stock_closing_balance.stock_closing_balance import get_stock_ledger_source
+from inventory.api.sync import (
+    format_rows,
+    get_deleted_names,
+    get_sync_cursor,
+    parse_modified_since,
+    with_etag,
+)
+
+CUSTOMER_FIELDS = ["name", "customer_name", "customer_type", "contact_number", "email", "wilaya", "commune"]
+# Items whose own record, selling price or stock changed after %(since)s
+CHANGED_ITEMS_QUERY = """
+    SELECT name FROM `tabItem` WHERE modified > %(since)s
+    UNION
+    SELECT item_code FROM `tabItem Price` WHERE selling = 1 AND modified > %(since)s
+    UNION
+    SELECT item FROM `tabStock Ledger Entry` WHERE creation > %(since)s
+"""
+ITEM_FIELDS = [
+    "item_code", "item_name", "description", "item_group", "uom", "disabled", "batch_tracking",
+    "default_price", "available_qty"
+]
 
 @frappe.whitelist()
-def list_customers(search_text=None, limit=20, offset=0):
+def list_customers(search_text=None, limit=20, offset=0, modified_since=None, columnar=0):
     """
     Get a list of customers with optional search filter
     
@@ -11,17 +34,24 @@ def list_customers(search_text=None, limit=20, offset=0):
         search_text (str, optional): Search text to filter customers by name or ID
         limit (int, optional): Limit number of results (default: 20)
         offset (int, optional): Offset for pagination (default: 0)
+        modified_since (str, optional): Delta sync cursor, only customers changed after it
+        columnar (int, optional): Return column arrays instead of a list of objects
         
     Returns:
-        dict: List of customers
+        dict: List of customers, deleted/deactivated customers and the next sync cursor
     """
     try:
         # Convert limit and offset to integers with defaults
         limit = cint(limit) or 20
         offset = cint(offset) or 0
+        modified_since = parse_modified_since(modified_since)
+        sync_cursor = get_sync_cursor()
         
         # Build filters
         filters = {"status": "Active"}
+        if modified_since:
+            # Deactivated customers are sent back as tombstones, so keep every status
+            filters = {"modified": [">", modified_since]}
         
         # Add search filter if provided
         if search_text:
@@ -33,24 +63,32 @@ def list_customers(search_text=None, limit=20, offset=0):
         customers = frappe.get_all(
             "Customer",
             filters=filters,
-            fields=["name", "customer_name", "customer_type", "contact_number", "email", "wilaya", "commune"],
+            fields=CUSTOMER_FIELDS + ["status"],
             limit=limit,
             start=offset,
             order_by="customer_name asc"
         )
         
+        deleted = get_deleted_names("Customer", modified_since)
+        deleted += [c.name for c in customers if c.status != "Active"]
+        customers = [c for c in customers if c.status == "Active"]
+        for customer in customers:
+            customer.pop("status")
+        
         # Get total count for pagination
         total_count = frappe.db.count("Customer", filters=filters)
         
-        return {
+        return with_etag({
             "success": True,
-            "data": customers,
+            "data": format_rows(customers, CUSTOMER_FIELDS, columnar),
+            "deleted": deleted,
+            "sync_cursor": sync_cursor,
             "total": total_count,
             "limit": limit,
             "offset": offset
-        }
+        })
     except Exception as e:
-        frappe.log_error(f"Error in list_customers: {str(e)}")
+        log_api_error("list_customers", e)
         return {
             "success": False,
             "message": f"Failed to retrieve customers: {str(e)}"
@@ -108,109 +146,145 @@ def get_customer(customer_id):
             "message": f"Customer {customer_id} not found"
         }
     except Exception as e:
-        frappe.log_error(f"Error in get_customer: {str(e)}")
+        log_api_error("get_customer", e)
         return {
             "success": False,
             "message": f"Failed to retrieve customer: {str(e)}"
         }
 
 @frappe.whitelist()
-def list_items(search_text=None, item_group=None, limit=20, offset=0):
+def list_items(search_text=None, item_group=None, limit=20, offset=0, modified_since=None, columnar=0,
+               after_item_name=None, after_item_code=None):
     """
     Get a list of items with optional search filter
     
+    Items, their default selling price and available stock come from a single query;
+    price and stock are only computed for the rows of the page. The total count is only
+    returned with the first page (`total` is None on the following ones).
+    
     Args:
         search_text (str, optional): Search text to filter items by name or code
-        item_group (str, optional): Filter by item group
+        item_group (str, optional): Filter by item group (item category)
         limit (int, optional): Limit number of results (default: 20)
         offset (int, optional): Offset for pagination (default: 0)
+        modified_since (str, optional): Delta sync cursor, only items whose data, price
+            or stock changed after it
+        columnar (int, optional): Return column arrays instead of a list of objects
+        after_item_name / after_item_code (str, optional): Keyset cursor, the `next`
+            values of the previous page; constant cost for any page, unlike `offset`
         
     Returns:
-        dict: List of items
+        dict: List of items, deleted/disabled items, the next page cursor and the next sync cursor
     """
     try:
         # Convert limit and offset to integers with defaults
         limit = cint(limit) or 20
         offset = cint(offset) or 0
+        modified_since = parse_modified_since(modified_since)
+        sync_cursor = get_sync_cursor()
         
-        # Build filters
-        filters = {}
+        conditions = []
+        values = {"limit": limit, "offset": offset}
         
         # Add item group filter if provided
         if item_group:
-            filters["item_group"] = item_group
+            conditions.append("item.item_category = %(item_group)s")
+            values["item_group"] = item_group
         
         # Add search filter if provided
         if search_text:
-            filters.update([
-                [
-                    "Item",
-                    "name",
-                    "like",
-                    f"%{search_text}%"
-                ],
-                [
-                    "Item",
-                    "item_name",
-                    "like",
-                    f"%{search_text}%"
-                ]
-            ])
-        
-        # Get items - MODIFIED: removed non-existent fields
-        items = frappe.get_all(
-            "Item",
-            filters=filters,
-            fields=[
-                "name as item_code", 
-                "item_name", 
-                "description", 
-                "item_group", 
-                "unit_of_measurement as uom", 
-                "disabled",
-                "batch_tracking"
-            ],
-            limit=limit,
-            start=offset,
-            order_by="item_name asc"
-        )
+            conditions.append("(item.name LIKE %(search)s OR item.item_name LIKE %(search)s)")
+            values["search"] = f"%{search_text}%"
+        
+        # Delta sync: items changed themselves, or through their price or stock
+        if modified_since:
+            conditions.append(f"item.name IN ({CHANGED_ITEMS_QUERY})")
+            values["since"] = modified_since
+        
+        keyset_condition = ""
+        if after_item_code:
+            keyset_condition = """
+                WHERE (matched.item_name > %(after_item_name)s
+                    OR (matched.item_name = %(after_item_name)s AND matched.item_code > %(after_item_code)s))
+            """
+            values.update({"after_item_name": after_item_name or "", "after_item_code": after_item_code})
+            values["offset"] = 0
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        items = frappe.db.sql("""
+            SELECT
+                page.item_code,
+                page.item_name,
+                page.description,
+                page.item_group,
+                page.uom,
+                page.disabled,
+                page.batch_tracking,
+                COALESCE((
+                    SELECT MAX(ip.price_list_rate)
+                    FROM `tabItem Price` ip
+                    WHERE ip.item_code = page.item_code AND ip.selling = 1 AND ip.is_default_price = 1
+                ), 0) AS default_price,
+                COALESCE((
+                    SELECT SUM(sle.actual_qty)
+                    FROM {source} sle
+                    WHERE sle.item = page.item_code AND sle.is_cancelled = 0
+                ), 0) AS available_qty
+            FROM (
+                SELECT matched.*
+                FROM (
+                    SELECT
+                        item.name AS item_code,
+                        COALESCE(item.item_name, '') AS item_name,
+                        item.description,
+                        item.item_category AS item_group,
+                        item.unit_of_measurement AS uom,
+                        item.disabled,
+                        item.batch_tracking
+                    FROM `tabItem` item
+                    {where}
+                ) matched
+                {keyset_condition}
+                ORDER BY matched.item_name, matched.item_code
+                LIMIT %(limit)s OFFSET %(offset)s
+            ) page
+            ORDER BY page.item_name, page.item_code
+        """.format(
+            source=get_stock_ledger_source(),
+            where=where,
+            keyset_condition=keyset_condition
+        ), values, as_dict=True)
+        
+        # Counting every match costs as much as the page itself, so only the first page pays it
+        total_count = None
+        if not after_item_code and not offset:
+            total_count = frappe.db.sql(f"SELECT COUNT(*) FROM `tabItem` item {where}", values)[0][0]
         
-        # Get the default price for each item
         for item in items:
-            # Get default selling price
-            default_price = frappe.db.get_value(
-                "Item Price",
-                {
-                    "item_code": item.item_code,
-                    "selling": 1,
-                    "is_default_price": 1
-                },
-                "price_list_rate"
-            )
-            
-            item.default_price = flt(default_price) if default_price else 0
-            
-            # Get available stock (sum of actual quantity from Stock Ledger)
-            stock_qty = frappe.db.sql("""
-                SELECT SUM(actual_qty) 
-                FROM `tabStock Ledger Entry` 
-                WHERE item = %s AND is_cancelled = 0
-            """, item.item_code)[0][0]
-            
-            item.available_qty = flt(stock_qty) if stock_qty else 0
+            item.default_price = flt(item.default_price)
+            item.available_qty = flt(item.available_qty)
         
-        # Get total count for pagination
-        total_count = frappe.db.count("Item", filters=filters)
+        next_cursor = None
+        if len(items) == limit:
+            next_cursor = {"after_item_name": items[-1].item_name, "after_item_code": items[-1].item_code}
         
-        return {
+        deleted = get_deleted_names("Item", modified_since)
+        if modified_since:
+            deleted += [item.item_code for item in items if item.disabled]
+            items = [item for item in items if not item.disabled]
+        
+        return with_etag({
             "success": True,
-            "data": items,
+            "data": format_rows(items, ITEM_FIELDS, columnar),
+            "deleted": deleted,
+            "sync_cursor": sync_cursor,
+            "next": next_cursor,
             "total": total_count,
             "limit": limit,
             "offset": offset
-        }
+        })
     except Exception as e:
-        frappe.log_error(f"Error in list_items: {str(e)}")
+        log_api_error("list_items", e)
         return {
             "success": False,
             "message": f"Failed to retrieve items: {str(e)}"
@@ -267,9 +341,9 @@ def get_item(item_code):
         item_dict["selling_prices"] = selling_prices or []
         
         # Get available stock (sum of actual quantity from Stock Ledger)
-        stock_qty = frappe.db.sql("""
+        stock_qty = frappe.db.sql(f"""
             SELECT SUM(actual_qty) 
-            FROM `tabStock Ledger Entry` 
+            FROM {get_stock_ledger_source()} sle 
             WHERE item = %s AND is_cancelled = 0
         """, item_code)[0][0]
         
@@ -277,11 +351,11 @@ def get_item(item_code):
         
         # If batch tracking is enabled, get batch information
         if item.batch_tracking:
-            batches = frappe.db.sql("""
+            batches = frappe.db.sql(f"""
                 SELECT b.name, b.batch_number, b.manufacturing_date, b.expiry_date,
                 SUM(sle.actual_qty) as qty
                 FROM `tabBatch` b
-                JOIN `tabStock Ledger Entry` sle ON sle.batch = b.name
+                JOIN {get_stock_ledger_source()} sle ON sle.batch_no = b.name
                 WHERE sle.item = %s AND sle.is_cancelled = 0
                 GROUP BY b.name
                 HAVING SUM(sle.actual_qty) > 0
@@ -300,7 +374,7 @@ def get_item(item_code):
             "message": f"Item {item_code} not found"
         }
     except Exception as e:
-        frappe.log_error(f"Error in get_item: {str(e)}")
+        log_api_error("get_item", e)
         return {
             "success": False,
             "message": f"Failed to retrieve item: {str(e)}"
@@ -370,7 +444,7 @@ def get_item_price(item_code, customer=None):
             "data": result
         }
     except Exception as e:
-        frappe.log_error(f"Error in get_item_price: {str(e)}")
+        log_api_error("get_item_price", e)
         return {
             "success": False,
             "message": f"Failed to retrieve item price: {str(e)}"
@@ -404,11 +478,11 @@ def get_batch_list(item_code):
             }
         
         # Get batches with available quantity
-        batches = frappe.db.sql("""
+        batches = frappe.db.sql(f"""
             SELECT b.name, b.batch_number, b.manufacturing_date, b.expiry_date,
             SUM(sle.actual_qty) as available_qty
             FROM `tabBatch` b
-            JOIN `tabStock Ledger Entry` sle ON sle.batch = b.name
+            JOIN {get_stock_ledger_source()} sle ON sle.batch_no = b.name
             WHERE sle.item = %s AND sle.is_cancelled = 0
             GROUP BY b.name
             HAVING SUM(sle.actual_qty) > 0
@@ -420,7 +494,7 @@ def get_batch_list(item_code):
             "data": batches or []
         }
     except Exception as e:
-        frappe.log_error(f"Error in get_batch_list: {str(e)}")
+        log_api_error("get_batch_list", e)
         return {
             "success": False,
             "message": f"Failed to retrieve batch list: {str(e)}"
@@ -456,7 +530,7 @@ def get_stock_balance(item_code=None, warehouse=None):
                 i.unit_of_measurement as uom,
                 SUM(sle.actual_qty) as available_qty
             FROM 
-                `tabStock Ledger Entry` sle
+                {source} sle
             JOIN
                 `tabItem` i ON sle.item = i.name
             WHERE 
@@ -470,6 +544,7 @@ def get_stock_balance(item_code=None, warehouse=None):
             ORDER BY 
                 i.item_name
         """.format(
+            source=get_stock_ledger_source(),
             item_condition=f"AND sle.item = %(item)s" if item_code else "",
             warehouse_condition=f"AND sle.warehouse = %(warehouse)s" if warehouse else ""
         ), filters, as_dict=1)
@@ -479,64 +554,367 @@ def get_stock_balance(item_code=None, warehouse=None):
             "data": stock_balance or []
         }
     except Exception as e:
-        frappe.log_error(f"Error in get_stock_balance: {str(e)}")
+        log_api_error("get_stock_balance", e)
         return {
             "success": False,
             "message": f"Failed to retrieve stock balance: {str(e)}"
         }
 
 @frappe.whitelist()
-def get_uoms():
+def get_uoms(modified_since=None, columnar=0):
     """
     Get list of all UOMs (Units of Measurement)
     
+    Args:
+        modified_since (str, optional): Delta sync cursor, only UOMs changed after it
+        columnar (int, optional): Return column arrays instead of a list of objects
+    
     Returns:
-        dict: List of UOMs
+        dict: List of UOMs, deleted UOMs and the next sync cursor
     """
     try:
+        modified_since = parse_modified_since(modified_since)
+        sync_cursor = get_sync_cursor()
+        
         uoms = frappe.get_all(
             "UOM",
+            filters={"modified": [">", modified_since]} if modified_since else {},
             fields=["name", "uom_name"],
             order_by="uom_name asc"
         )
         
-        return {
+        return with_etag({
             "success": True,
-            "data": uoms
-        }
+            "data": format_rows(uoms, ["name", "uom_name"], columnar),
+            "deleted": get_deleted_names("UOM", modified_since),
+            "sync_cursor": sync_cursor
+        })
     except Exception as e:
-        frappe.log_error(f"Error in get_uoms: {str(e)}")
+        log_api_error("get_uoms", e)
         return {
             "success": False,
             "message": f"Failed to retrieve UOMs: {str(e)}"
         }
 
 @frappe.whitelist()
-def get_brands():
+def get_brands(modified_since=None):
     """
     Get list of all unique brands from items
     
+    Args:
+        modified_since (str, optional): Delta sync cursor; the (short) list is only
+            sent again if an item changed after it
+    
     Returns:
-        dict: List of brands
+        dict: List of brands and the next sync cursor
     """
     try:
+        modified_since = parse_modified_since(modified_since)
+        sync_cursor = get_sync_cursor()
+        
+        if modified_since and not frappe.db.sql("""
+            SELECT 1 FROM `tabItem` WHERE modified > %s LIMIT 1
+        """, modified_since):
+            return with_etag({
+                "success": True,
+                "unchanged": True,
+                "data": [],
+                "sync_cursor": sync_cursor
+            })
+        
         brands = frappe.db.sql("""
-            SELECT DISTINCT brand_name
+            SELECT DISTINCT brand
             FROM `tabItem`
-            WHERE brand_name IS NOT NULL AND brand_name != ''
-            ORDER BY brand_name ASC
+            WHERE brand IS NOT NULL AND brand != ''
+            ORDER BY brand ASC
         """, as_dict=True)
         
         # Convert to simple list of brand names
-        brand_list = [brand.brand_name for brand in brands]
+        brand_list = [brand.brand for brand in brands]
+        
+        return with_etag({
+            "success": True,
+            "data": brand_list,
+            "sync_cursor": sync_cursor
+        })
+    except Exception as e:
+        log_api_error("get_brands", e)
+        return {
+            "success": False,
+            "message": f"Failed to retrieve brands: {str(e)}"
+        }
+# Largest number of item codes accepted by one multi-get or batch request
+MAX_BATCH_ITEMS = 200
+
+# Sub-request methods accepted by `batch`, resolved set-wise per (method, customer/warehouse)
+BATCH_METHODS = {
+    "get_item": ("customer", lambda codes, arg: get_item_map(codes, arg)),
+    "get_item_price": ("customer", lambda codes, arg: get_item_price_map(codes, arg)),
+    "get_stock_balance": ("warehouse", lambda codes, arg: get_stock_balance_map(codes, arg)),
+}
+
+def parse_item_codes(item_codes):
+    """Item codes from a JSON list or a comma separated string, de-duplicated"""
+    if isinstance(item_codes, str):
+        item_codes = frappe.parse_json(item_codes) if item_codes.strip().startswith("[") else item_codes.split(",")
+    item_codes = list(dict.fromkeys(code.strip() for code in item_codes or [] if code and code.strip()))
+
+    if not item_codes:
+        frappe.throw("At least one item code is required")
+    if len(item_codes) > MAX_BATCH_ITEMS:
+        frappe.throw(f"At most {MAX_BATCH_ITEMS} item codes can be requested at once")
+    return item_codes
+
+def get_item_price_map(item_codes, customer=None):
+    """{item_code: price info} for many items with one query, same shape as get_item_price"""
+    prices = frappe.db.sql("""
+        SELECT item_code, customer, is_default_price, price_list_rate
+        FROM `tabItem Price`
+        WHERE item_code IN %(items)s
+            AND selling = 1
+            AND (is_default_price = 1 OR customer = %(customer)s)
+    """, {"items": tuple(item_codes), "customer": customer or ""}, as_dict=True)
+
+    result = {
+        code: {"item_code": code, "default_price": 0, "customer_price": 0, "has_customer_specific_price": False}
+        for code in item_codes
+    }
+    for price in prices:
+        row = result[price.item_code]
+        if customer and price.customer == customer:
+            row["customer_price"] = flt(price.price_list_rate)
+            row["has_customer_specific_price"] = True
+        if price.is_default_price and not row["default_price"]:
+            row["default_price"] = flt(price.price_list_rate)
+
+    for row in result.values():
+        if not row["has_customer_specific_price"]:
+            row["customer_price"] = row["default_price"]
+    return result
+
+def get_stock_balance_map(item_codes, warehouse=None):
+    """{item_code: stock balance row} for many items with one grouped query"""
+    rows = frappe.db.sql("""
+        SELECT
+            i.name AS item,
+            i.item_name,
+            i.unit_of_measurement AS uom,
+            COALESCE(SUM(sle.actual_qty), 0) AS available_qty
+        FROM `tabItem` i
+        LEFT JOIN {source} sle
+            ON sle.item = i.name AND sle.is_cancelled = 0 {warehouse_condition}
+        WHERE i.name IN %(items)s
+        GROUP BY i.name, i.item_name, i.unit_of_measurement
+    """.format(
+        source=get_stock_ledger_source(),
+        warehouse_condition="AND sle.warehouse = %(warehouse)s" if warehouse else ""
+    ), {"items": tuple(item_codes), "warehouse": warehouse}, as_dict=True)
+
+    for row in rows:
+        row.available_qty = flt(row.available_qty)
+    return {row.item: row for row in rows}
+
+def get_item_map(item_codes, customer=None):
+    """{item_code: item details} for many items, same shape as get_item
+
+    One query each for items, barcodes, selling prices, stock and batches,
+    whatever the number of items.
+    """
+    items = {
+        item.name: item for item in frappe.db.sql("""
+            SELECT * FROM `tabItem` WHERE name IN %(items)s
+        """, {"items": tuple(item_codes)}, as_dict=True)
+    }
+    if not items:
+        return {}
+    codes = tuple(items)
+
+    for item in items.values():
+        item.barcodes = []
+        item.selling_prices = []
+        item.default_price = 0
+        item.available_qty = 0
+
+    for barcode in frappe.db.sql("""
+        SELECT parent, barcode, barcode_type
+        FROM `tabItem Barcode`
+        WHERE parent IN %(items)s AND parenttype = 'Item'
+        ORDER BY idx
+    """, {"items": codes}, as_dict=True):
+        items[barcode.pop("parent")].barcodes.append(barcode)
+
+    for price in frappe.db.sql("""
+        SELECT name, item_code, price_list_rate, customer, valid_from, valid_upto, is_default_price
+        FROM `tabItem Price`
+        WHERE item_code IN %(items)s AND selling = 1
+    """, {"items": codes}, as_dict=True):
+        item = items[price.item_code]
+        if price.is_default_price and not item.default_price:
+            item.default_price = flt(price.price_list_rate)
+        if not customer or price.customer in (None, "", customer):
+            item.selling_prices.append({
+                "name": price.name,
+                "price_list_rate": price.price_list_rate,
+                "customer": price.customer,
+                "valid_from": price.valid_from,
+                "valid_upto": price.valid_upto
+            })
+
+    for code, balance in get_stock_balance_map(codes).items():
+        items[code].available_qty = balance.available_qty
+
+    batch_items = tuple(code for code, item in items.items() if item.batch_tracking)
+    if batch_items:
+        for item in items.values():
+            if item.batch_tracking:
+                item.batches = []
+        for batch in frappe.db.sql("""
+            SELECT sle.item, b.name, b.batch_id AS batch_number, b.manufacturing_date, b.expiry_date,
+                SUM(sle.actual_qty) AS qty
+            FROM `tabBatch` b
+            JOIN {source} sle ON sle.batch_no = b.name
+            WHERE sle.item IN %(items)s AND sle.is_cancelled = 0
+            GROUP BY sle.item, b.name, b.batch_id, b.manufacturing_date, b.expiry_date
+            HAVING SUM(sle.actual_qty) > 0
+            ORDER BY b.expiry_date
+        """.format(source=get_stock_ledger_source()), {"items": batch_items}, as_dict=True):
+            items[batch.pop("item")].batches.append(batch)
+
+    return items
+
+@frappe.whitelist()
+def get_items_batch(item_codes, customer=None):
+    """
+    Get details for many items at once (multi-get version of get_item)
+    
+    Args:
+        item_codes (list|str): Item codes, as a JSON list or comma separated
+        customer (str, optional): Only list selling prices that apply to this customer
         
+    Returns:
+        dict: Item details keyed by item code, and the codes that were not found
+    """
+    try:
+        item_codes = parse_item_codes(item_codes)
+        items = get_item_map(item_codes, customer)
         return {
             "success": True,
-            "data": brand_list
+            "data": items,
+            "not_found": [code for code in item_codes if code not in items]
         }
     except Exception as e:
-        frappe.log_error(f"Error in get_brands: {str(e)}")
+        log_api_error("get_items_batch", e)
         return {
             "success": False,
-            "message": f"Failed to retrieve brands: {str(e)}"
-        }
\ No newline at end of file
+            "message": f"Failed to retrieve items: {str(e)}"
+        }
+
+@frappe.whitelist()
+def get_item_prices_batch(item_codes, customer=None):
+    """
+    Get pricing for many items at once (multi-get version of get_item_price)
+    
+    Args:
+        item_codes (list|str): Item codes, as a JSON list or comma separated
+        customer (str, optional): The customer ID for customer-specific pricing
+        
+    Returns:
+        dict: Item pricing keyed by item code
+    """
+    try:
+        return {
+            "success": True,
+            "data": get_item_price_map(parse_item_codes(item_codes), customer)
+        }
+    except Exception as e:
+        log_api_error("get_item_prices_batch", e)
+        return {
+            "success": False,
+            "message": f"Failed to retrieve item prices: {str(e)}"
+        }
+
+@frappe.whitelist()
+def get_stock_balances_batch(item_codes, warehouse=None):
+    """
+    Get stock balance for many items at once (multi-get version of get_stock_balance)
+    
+    Args:
+        item_codes (list|str): Item codes, as a JSON list or comma separated
+        warehouse (str, optional): Filter by specific warehouse
+        
+    Returns:
+        dict: Stock balance keyed by item code
+    """
+    try:
+        return {
+            "success": True,
+            "data": get_stock_balance_map(parse_item_codes(item_codes), warehouse)
+        }
+    except Exception as e:
+        log_api_error("get_stock_balances_batch", e)
+        return {
+            "success": False,
+            "message": f"Failed to retrieve stock balances: {str(e)}"
+        }
+
+@frappe.whitelist()
+def batch(requests):
+    """
+    Run many read sub-requests in one call
+    
+    Sub-requests are grouped by method and customer/warehouse, and each group is
+    resolved with one set-based query whatever the number of items.
+    
+    Args:
+        requests (list|str): JSON list of sub-requests, each
+            {"id": "...", "method": "get_item" | "get_item_price" | "get_stock_balance",
+             "args": {"item_code": "...", "customer": "...", "warehouse": "..."}}
+        
+    Returns:
+        dict: One response per sub-request, in order, each with its id
+    """
+    try:
+        requests = frappe.parse_json(requests) if isinstance(requests, str) else requests or []
+        if len(requests) > MAX_BATCH_ITEMS:
+            frappe.throw(f"At most {MAX_BATCH_ITEMS} sub-requests can be sent at once")
+
+        # Group item codes by (method, customer/warehouse)
+        groups = {}
+        for request in requests:
+            method = request.get("method")
+            args = request.get("args") or {}
+            if method in BATCH_METHODS and args.get("item_code"):
+                key = (method, args.get(BATCH_METHODS[method][0]))
+                groups.setdefault(key, []).append(args["item_code"])
+
+        results = {}
+        for (method, arg), item_codes in groups.items():
+            results[(method, arg)] = BATCH_METHODS[method][1](list(dict.fromkeys(item_codes)), arg)
+
+        responses = []
+        for request in requests:
+            method = request.get("method")
+            args = request.get("args") or {}
+            response = {"id": request.get("id")}
+            if method not in BATCH_METHODS:
+                response.update({"success": False, "message": f"Unsupported method: {method}"})
+            elif not args.get("item_code"):
+                response.update({"success": False, "message": "Item code is required"})
+            else:
+                data = results[(method, args.get(BATCH_METHODS[method][0]))].get(args["item_code"])
+                if data is None:
+                    response.update({"success": False, "message": f"Item {args['item_code']} not found"})
+                else:
+                    response.update({"success": True, "data": data})
+            responses.append(response)
+
+        return {
+            "success": True,
+            "responses": responses
+        }
+    except Exception as e:
+        log_api_error("batch", e)
+        return {
+            "success": False,
+            "message": f"Failed to process batch: {str(e)}"
+        }
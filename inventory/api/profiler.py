@@ -0,0 +1,246 @@
+"""Opt-in per-request profiler for the whitelisted inventory endpoints.
+
+A request to `/api/method/inventory.*` is profiled when the site config sets
+`inventory_profiler_sample_rate` (fraction of requests, e.g. 0.05) or when a System
+Manager sends the `X-Inventory-Profile: 1` header. A profiled request records its SQL
+query count and time, redis calls and time, Python time, and the query shapes that ran
+repeatedly (the N+1 suspects).
+
+The numbers are returned in `X-Inventory-Profile` and `Server-Timing` response headers
+and added to hourly buckets in redis (one pipelined write per request), which
+`get_request_profiles` aggregates into the top offenders.
+"""
+
+import random
+import re
+import time
+from collections import Counter
+
+import frappe
+from frappe.utils import cint, flt
+
+PROFILE_HEADER = "X-Inventory-Profile"
+
+# A query shape run this many times in one request is reported as repeated
+REPEATED_QUERY_THRESHOLD = 3
+
+# Hourly buckets, kept for a day
+PROFILE_CACHE_KEY = "inventory_request_profile"
+PROFILE_SHAPES_CACHE_KEY = "inventory_request_profile_shapes"
+PROFILE_BUCKET_SECONDS = 3600
+PROFILE_RETENTION_HOURS = 24
+
+# Shapes are cut to this length before they are stored
+MAX_SHAPE_LENGTH = 300
+
+# Counters summed per endpoint and bucket
+PROFILE_COUNTERS = ["calls", "queries", "db_ms", "redis", "redis_ms", "py_ms", "total_ms", "repeated_queries"]
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+_redis_counter_installed = False
+
+
+def get_query_shape(query):
+    """Query text with literals and placeholders replaced, so repeated statements group together"""
+    shape = _STRING_LITERAL.sub("?", str(query))
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _VALUE_LIST.sub("(...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()[:MAX_SHAPE_LENGTH]
+
+
+def get_profiled_method():
+    """Dotted path of the inventory method the current request calls, if any"""
+    request = getattr(frappe.local, "request", None)
+    if not request or "/method/" not in request.path:
+        return None
+
+    method = request.path.split("/method/", 1)[1].strip("/")
+    return method if method.startswith("inventory.") else None
+
+
+def should_profile():
+    if cint(frappe.get_request_header(PROFILE_HEADER)) and "System Manager" in frappe.get_roles():
+        return True
+
+    sample_rate = flt(frappe.conf.get("inventory_profiler_sample_rate"))
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+def start_request_profile():
+    """before_request hook: start profiling this request when it is selected"""
+    method = get_profiled_method()
+    if not method or not should_profile():
+        return
+
+    profile = frappe._dict(
+        method=method,
+        started=time.perf_counter(),
+        queries=0,
+        db_time=0.0,
+        redis=0,
+        redis_time=0.0,
+        shapes=Counter(),
+    )
+    frappe.local.inventory_request_profile = profile
+    install_redis_counter()
+
+    sql = frappe.db.sql
+
+    def profiled_sql(query, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return sql(query, *args, **kwargs)
+        finally:
+            profile.db_time += time.perf_counter() - started
+            profile.queries += 1
+            profile.shapes[get_query_shape(query)] += 1
+
+    frappe.db.sql = profiled_sql
+    profile.restore_sql = lambda: setattr(frappe.db, "sql", sql)
+
+
+def install_redis_counter():
+    """Count redis commands of profiled requests (installed once per process)"""
+    global _redis_counter_installed
+    if _redis_counter_installed:
+        return
+
+    from frappe.utils.redis_wrapper import RedisWrapper
+
+    execute_command = RedisWrapper.execute_command
+
+    def profiled_execute_command(self, *args, **kwargs):
+        profile = getattr(frappe.local, "inventory_request_profile", None)
+        if not profile:
+            return execute_command(self, *args, **kwargs)
+
+        started = time.perf_counter()
+        try:
+            return execute_command(self, *args, **kwargs)
+        finally:
+            profile.redis_time += time.perf_counter() - started
+            profile.redis += 1
+
+    RedisWrapper.execute_command = profiled_execute_command
+    _redis_counter_installed = True
+
+
+def finish_request_profile(response=None, request=None):
+    """after_request hook: report the profile in the response headers and record it"""
+    profile = getattr(frappe.local, "inventory_request_profile", None)
+    if not profile:
+        return
+
+    frappe.local.inventory_request_profile = None
+    profile.restore_sql()
+
+    total_ms = (time.perf_counter() - profile.started) * 1000
+    db_ms = profile.db_time * 1000
+    redis_ms = profile.redis_time * 1000
+    repeated = {
+        shape: count for shape, count in profile.shapes.items() if count >= REPEATED_QUERY_THRESHOLD
+    }
+    result = {
+        "calls": 1,
+        "queries": profile.queries,
+        "db_ms": round(db_ms, 3),
+        "redis": profile.redis,
+        "redis_ms": round(redis_ms, 3),
+        "py_ms": round(max(total_ms - db_ms - redis_ms, 0), 3),
+        "total_ms": round(total_ms, 3),
+        # Executions beyond the first of every repeated shape
+        "repeated_queries": sum(count - 1 for count in repeated.values()),
+    }
+
+    if response is not None:
+        response.headers[PROFILE_HEADER] = ";".join(
+            f"{key}={result[key]}" for key in PROFILE_COUNTERS if key != "calls"
+        )
+        response.headers["Server-Timing"] = (
+            f"db;dur={result['db_ms']}, redis;dur={result['redis_ms']}, app;dur={result['py_ms']}"
+        )
+
+    try:
+        record_request_profile(profile.method, result, repeated)
+    except Exception:
+        # Profiling must never fail the request
+        pass
+
+
+def get_bucket(timestamp=None):
+    return int((timestamp or time.time()) // PROFILE_BUCKET_SECONDS)
+
+
+def record_request_profile(method, result, repeated):
+    """Add one request to the current hourly bucket, in a single redis round trip"""
+    cache = frappe.cache()
+    bucket = get_bucket()
+    key = cache.make_key(f"{PROFILE_CACHE_KEY}:{bucket}")
+    shapes_key = cache.make_key(f"{PROFILE_SHAPES_CACHE_KEY}:{bucket}")
+    expires_in_sec = PROFILE_RETENTION_HOURS * PROFILE_BUCKET_SECONDS
+
+    pipe = cache.pipeline()
+    for counter in PROFILE_COUNTERS:
+        pipe.hincrbyfloat(key, f"{method}|{counter}", result[counter])
+    for shape, count in repeated.items():
+        pipe.hincrby(shapes_key, f"{method}|{shape}", count)
+    pipe.expire(key, expires_in_sec)
+    if repeated:
+        pipe.expire(shapes_key, expires_in_sec)
+    pipe.execute()
+
+
+@frappe.whitelist()
+def get_request_profiles(hours=1, sort_by="queries", limit=20):
+    """Top profiled endpoints over the last `hours` hours
+
+    Rows are sorted by the average of `sort_by` (queries, db_ms, redis, py_ms,
+    total_ms or repeated_queries) and include the most repeated query shapes.
+    """
+    frappe.only_for("System Manager")
+    if sort_by not in PROFILE_COUNTERS:
+        frappe.throw(f"Invalid sort_by: {sort_by}")
+
+    cache = frappe.cache()
+    current = get_bucket()
+    buckets = range(current - min(max(cint(hours), 1), PROFILE_RETENTION_HOURS) + 1, current + 1)
+
+    pipe = cache.pipeline()
+    for bucket in buckets:
+        pipe.hgetall(cache.make_key(f"{PROFILE_CACHE_KEY}:{bucket}"))
+        pipe.hgetall(cache.make_key(f"{PROFILE_SHAPES_CACHE_KEY}:{bucket}"))
+    buckets_data = pipe.execute()
+
+    totals, shapes = {}, {}
+    for counters, bucket_shapes in zip(buckets_data[::2], buckets_data[1::2]):
+        for field, value in counters.items():
+            method, counter = field.decode().rsplit("|", 1)
+            method_totals = totals.setdefault(method, dict.fromkeys(PROFILE_COUNTERS, 0.0))
+            method_totals[counter] += float(value)
+        for field, value in bucket_shapes.items():
+            method, shape = field.decode().split("|", 1)
+            method_shapes = shapes.setdefault(method, Counter())
+            method_shapes[shape] += int(value)
+
+    rows = []
+    for method, method_totals in totals.items():
+        calls = method_totals["calls"] or 1
+        row = {"method": method, "calls": int(method_totals["calls"])}
+        row.update({
+            f"avg_{counter}": round(method_totals[counter] / calls, 3)
+            for counter in PROFILE_COUNTERS if counter != "calls"
+        })
+        row["repeated_shapes"] = [
+            {"shape": shape, "executions": count}
+            for shape, count in shapes.get(method, Counter()).most_common(5)
+        ]
+        rows.append(row)
+
+    rows.sort(key=lambda row: row[f"avg_{sort_by}"] if sort_by != "calls" else row["calls"], reverse=True)
+    return rows[:cint(limit) or 20]
@@ -32,7 +32,9 @@ def list_customers(*args, **kwargs):
     search_text = frappe.local.form_dict.get("search_text")
     limit = frappe.local.form_dict.get("limit")
     offset = frappe.local.form_dict.get("offset")
-    return master_data_api.list_customers(search_text, limit, offset)
+    modified_since = frappe.local.form_dict.get("modified_since")
+    columnar = frappe.local.form_dict.get("columnar")
+    return master_data_api.list_customers(search_text, limit, offset, modified_since, columnar)
 
 @frappe.whitelist()
 def get_customer(*args, **kwargs):
@@ -47,7 +49,13 @@ def list_items(*args, **kwargs):
     item_group = frappe.local.form_dict.get("item_group")
     limit = frappe.local.form_dict.get("limit")
     offset = frappe.local.form_dict.get("offset")
-    return master_data_api.list_items(search_text, item_group, limit, offset)
+    modified_since = frappe.local.form_dict.get("modified_since")
+    columnar = frappe.local.form_dict.get("columnar")
+    after_item_name = frappe.local.form_dict.get("after_item_name")
+    after_item_code = frappe.local.form_dict.get("after_item_code")
+    return master_data_api.list_items(
+        search_text, item_group, limit, offset, modified_since, columnar, after_item_name, after_item_code
+    )
 
 @frappe.whitelist()
 def get_item(*args, **kwargs):
@@ -75,6 +83,34 @@ def get_stock_balance(*args, **kwargs):
     warehouse = frappe.local.form_dict.get("warehouse")
     return master_data_api.get_stock_balance(item_code, warehouse)
 
+# Batch read endpoints
+@frappe.whitelist()
+def get_items_batch(*args, **kwargs):
+    """Get details for many items at once"""
+    item_codes = frappe.local.form_dict.get("item_codes")
+    customer = frappe.local.form_dict.get("customer")
+    return master_data_api.get_items_batch(item_codes, customer)
+
+@frappe.whitelist()
+def get_item_prices_batch(*args, **kwargs):
+    """Get pricing for many items at once"""
+    item_codes = frappe.local.form_dict.get("item_codes")
+    customer = frappe.local.form_dict.get("customer")
+    return master_data_api.get_item_prices_batch(item_codes, customer)
+
+@frappe.whitelist()
+def get_stock_balances_batch(*args, **kwargs):
+    """Get stock balance for many items at once"""
+    item_codes = frappe.local.form_dict.get("item_codes")
+    warehouse = frappe.local.form_dict.get("warehouse")
+    return master_data_api.get_stock_balances_batch(item_codes, warehouse)
+
+@frappe.whitelist()
+def batch(*args, **kwargs):
+    """Run many read sub-requests (get_item, get_item_price, get_stock_balance) in one call"""
+    requests = frappe.local.form_dict.get("requests")
+    return master_data_api.batch(requests)
+
 # Delivery Note API endpoints
 @frappe.whitelist()
 def list_delivery_notes(*args, **kwargs):
@@ -132,12 +168,15 @@ def get_delivery_note_items_from_sales_order(*args, **kwargs):
 @frappe.whitelist()
 def get_uoms(*args, **kwargs):
     """Get list of all UOMs (Units of Measurement)"""
-    return master_data_api.get_uoms()
+    modified_since = frappe.local.form_dict.get("modified_since")
+    columnar = frappe.local.form_dict.get("columnar")
+    return master_data_api.get_uoms(modified_since, columnar)
 
 @frappe.whitelist()
 def get_brands(*args, **kwargs):
     """Get list of all unique brands from items"""
-    return master_data_api.get_brands()
+    modified_since = frappe.local.form_dict.get("modified_since")
+    return master_data_api.get_brands(modified_since)
 
 # Define more API endpoints here as needed
 
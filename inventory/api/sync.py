@@ -0,0 +1,80 @@
+import hashlib
+
+import frappe
+from frappe.utils import cint, get_datetime, now
+
+
+def get_sync_cursor():
+    """Cursor to hand back to the client, taken before reading so nothing is skipped"""
+    return now()
+
+
+def parse_modified_since(modified_since):
+    """Validated `modified_since` cursor, or None for a full download"""
+    if not modified_since:
+        return None
+    try:
+        return get_datetime(modified_since)
+    except Exception:
+        frappe.throw(f"Invalid modified_since: {modified_since}")
+
+
+def get_deleted_names(doctype, modified_since):
+    """Tombstones: names of `doctype` records deleted after the cursor"""
+    if not modified_since:
+        return []
+    return frappe.db.sql_list("""
+        SELECT deleted_name
+        FROM `tabDeleted Document`
+        WHERE deleted_doctype = %s AND creation > %s
+    """, (doctype, modified_since))
+
+
+def to_columns(rows, fields):
+    """Column-oriented payload: one array per field instead of one dict per row"""
+    return {field: [row.get(field) for row in rows] for field in fields}
+
+
+def format_rows(rows, fields, columnar=0):
+    """Rows as a list of dicts, or column arrays when the client opted in"""
+    if cint(columnar):
+        return to_columns(rows, fields)
+    return rows
+
+
+# Payload keys that change on every call and are left out of the content hash
+ETAG_EXCLUDED_KEYS = ("sync_cursor",)
+
+
+def with_etag(payload, etag=None):
+    """Tag a response with its content hash and answer 304 when the client already has it
+
+    Pass `etag` when the payload already carries its own hash, so the header and the
+    body agree. The ETag header and the 304 status are applied by `apply_etag_response`
+    (after_request hook). Returns None when the client's copy is current.
+    """
+    if not etag:
+        content = {key: value for key, value in payload.items() if key not in ETAG_EXCLUDED_KEYS}
+        etag = hashlib.md5(frappe.as_json(content).encode()).hexdigest()
+    frappe.local.flags.response_etag = etag
+
+    request = getattr(frappe.local, "request", None)
+    if request and etag in (request.headers.get("If-None-Match") or ""):
+        frappe.local.flags.response_not_modified = True
+        return None
+
+    return payload
+
+
+def apply_etag_response(response=None, request=None):
+    """after_request hook: ETag header and bodiless 304 for responses built with `with_etag`"""
+    etag = frappe.local.flags.get("response_etag")
+    if not etag or response is None:
+        return
+
+    response.headers["ETag"] = f'"{etag}"'
+    response.headers["Cache-Control"] = "private, no-cache"
+
+    if frappe.local.flags.get("response_not_modified"):
+        response.status_code = 304
+        response.set_data(b"")
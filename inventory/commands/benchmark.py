@@ -0,0 +1,382 @@
+"""Repeatable benchmarks for the POS, pricing, stock, report and mobile API hot paths.
+
+`bench run-benchmarks` runs every benchmark against the current site (seed it first
+with `bench generate-load-data`) and reports latency percentiles, SQL query counts
+and rows read per call. Each call is treated like a fresh request (the request-local
+lookup cache is reset) and rolled back unless it commits on its own. The JSON output
+can be saved and compared between commits with `--compare`.
+"""
+
+import fnmatch
+import glob
+import json
+import math
+import os
+import random
+import subprocess
+import time
+from contextlib import contextmanager
+
+import click
+import frappe
+from frappe.commands import get_site, pass_context
+from frappe.utils import add_months, getdate, now, today
+
+# Lines per invoice for the create_pos_invoice benchmarks
+INVOICE_SIZES = [1, 20, 100]
+
+PERCENTILES = [50, 90, 95, 99]
+
+# Extra filters per script report; every report also gets from_date/to_date
+REPORT_FILTERS = {
+    "customer_sales_analysis": {"group_by": "Customer"},
+    "customers_by_region": {"status": "Active", "view_type": "Detailed"},
+    "expiry_date_tracking": {"expiring_soon_days": 30, "warning_days": 90},
+    "supplier_directory": {"status": "Active"},
+    "supplier_purchase_analysis": {"group_by": "Supplier", "months": 3},
+}
+
+# Tables whose size is recorded with the results
+DATASET_DOCTYPES = ["Item", "Item Price", "Customer", "Stock Ledger Entry", "POS Session", "POS Invoice"]
+
+
+@contextmanager
+def count_queries():
+    """Count the SQL statements sent through frappe.db while the block runs"""
+    counter = {"queries": 0}
+    sql = frappe.db.sql
+
+    def counting_sql(*args, **kwargs):
+        counter["queries"] += 1
+        return sql(*args, **kwargs)
+
+    frappe.db.sql = counting_sql
+    try:
+        yield counter
+    finally:
+        frappe.db.sql = sql
+
+
+def get_rows_read():
+    """Rows read so far by this connection (Postgres: in the current transaction)"""
+    if frappe.db.db_type == "postgres":
+        return frappe.db.sql("""
+            SELECT COALESCE(SUM(COALESCE(seq_tup_read, 0) + COALESCE(idx_tup_fetch, 0)), 0)
+            FROM pg_stat_xact_user_tables
+        """)[0][0]
+    return sum(int(row[1]) for row in frappe.db.sql("SHOW SESSION STATUS LIKE %s", ("Handler_read%",)))
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(values)), 1)
+    return values[min(rank, len(values)) - 1]
+
+
+def summarize(timings, queries, rows_read):
+    timings = sorted(timings)
+    queries = sorted(queries)
+    rows_read = sorted(value for value in rows_read if value is not None)
+    result = {
+        "runs": len(timings),
+        "mean_ms": round(sum(timings) / len(timings), 3),
+        "min_ms": round(timings[0], 3),
+        "max_ms": round(timings[-1], 3),
+    }
+    for pct in PERCENTILES:
+        result[f"p{pct}_ms"] = round(percentile(timings, pct), 3)
+    result["queries"] = percentile(queries, 50)
+    result["max_queries"] = queries[-1]
+    result["rows_read"] = percentile(rows_read, 50)
+    return result
+
+
+def measure(benchmark, iterations, warmup):
+    """Run one benchmark `warmup + iterations` times and summarize the measured runs"""
+    timings, queries, rows_read = [], [], []
+    for iteration in range(warmup + iterations):
+        frappe.local.pos_lookup_cache = {}
+        if benchmark.get("before"):
+            benchmark.before(iteration)
+
+        rows_before = get_rows_read()
+        with count_queries() as counter:
+            started = time.perf_counter()
+            benchmark.run(iteration)
+            elapsed = (time.perf_counter() - started) * 1000
+        rows = get_rows_read() - rows_before
+
+        frappe.db.rollback()
+
+        if iteration >= warmup:
+            timings.append(elapsed)
+            queries.append(counter["queries"])
+            # A commit inside the call resets the Postgres transaction counters
+            rows_read.append(rows if rows >= 0 else None)
+
+    return summarize(timings, queries, rows_read)
+
+
+def get_benchmark_context(pos_profile=None, seed=42):
+    """Sample data shared by the benchmarks, read once before measuring"""
+    from inventory.pos.cache import get_pos_profile
+
+    pos_profile = pos_profile or frappe.db.get_value(
+        "POS Profile", {"warehouse_name": ["is", "set"]}, "name", order_by="name asc"
+    )
+    profile = get_pos_profile(pos_profile)
+    if not profile or not profile.warehouse_name:
+        raise click.ClickException("No POS Profile with a warehouse. Run `bench generate-load-data` first.")
+
+    rng = random.Random(seed)
+    items = frappe.db.sql("""
+        SELECT item_code, item_name, standard_rate
+        FROM `tabItem`
+        WHERE disabled = 0 AND is_sales_item = 1
+        ORDER BY item_code
+        LIMIT 1000
+    """, as_dict=True)
+    if len(items) < max(INVOICE_SIZES):
+        raise click.ClickException(f"At least {max(INVOICE_SIZES)} sales items are needed. Run `bench generate-load-data` first.")
+    rng.shuffle(items)
+
+    barcodes = frappe.db.sql_list("SELECT barcode FROM `tabItem Barcode` ORDER BY name LIMIT 1000")
+    rng.shuffle(barcodes)
+
+    to_date = frappe.db.sql("SELECT MAX(posting_date) FROM `tabPOS Invoice` WHERE docstatus = 1")[0][0]
+    return frappe._dict({
+        "pos_profile": profile.name,
+        "warehouse": profile.warehouse_name,
+        "items": items,
+        "barcodes": barcodes or [item.item_code for item in items],
+        "to_date": getdate(to_date or today()),
+    })
+
+
+def open_benchmark_session(ctx):
+    """POS Session for the create_pos_invoice benchmarks, rolled back with each run"""
+    return frappe.get_doc({
+        "doctype": "POS Session",
+        "pos_profile": ctx.pos_profile,
+        "pos_user": frappe.session.user,
+        "period_start_date": getdate(),
+        "opening_time": now(),
+        "opening_amount": 0,
+        "status": "Open",
+    }).insert(ignore_permissions=True).name
+
+
+def get_invoice_benchmark(ctx, lines):
+    from inventory.pos.doctype.pos_invoice.pos_invoice import create_pos_invoice
+
+    state = frappe._dict()
+
+    def before(iteration):
+        state.session = open_benchmark_session(ctx)
+
+    def run(iteration):
+        items = [ctx.items[(iteration * lines + row) % len(ctx.items)] for row in range(lines)]
+        total = sum(item.standard_rate or 0 for item in items)
+        create_pos_invoice(
+            ctx.pos_profile,
+            [{"item_code": item.item_code, "item_name": item.item_name, "qty": 1,
+              "rate": item.standard_rate or 0} for item in items],
+            payments=[{"payment_method": "Cash", "amount": total}],
+            pos_session=state.session,
+        )
+
+    return frappe._dict(before=before, run=run)
+
+
+def get_close_session_benchmark(ctx, runs):
+    """Close already generated sessions again; everything is rolled back after each run"""
+    from inventory.pos.doctype.pos_session.pos_session import close_session
+
+    sessions = frappe.db.sql_list("""
+        SELECT name FROM `tabPOS Session`
+        WHERE status = 'Closed' AND invoice_count > 0
+        ORDER BY name
+        LIMIT %s
+    """, (runs,))
+    if not sessions:
+        return None
+
+    def before(iteration):
+        session = sessions[iteration % len(sessions)]
+        frappe.db.set_value("POS Session", session, {"status": "Open", "z_report": None}, update_modified=False)
+        frappe.db.sql("DELETE FROM `tabPOS Z Report` WHERE pos_session = %s", (session,))
+
+    def run(iteration):
+        close_session(sessions[iteration % len(sessions)])
+
+    return frappe._dict(before=before, run=run)
+
+
+def get_report_benchmarks(ctx):
+    """One benchmark per script report of the app, with its usual filters"""
+    benchmarks = {}
+    app_path = frappe.get_app_path("inventory")
+    for report_json in sorted(glob.glob(os.path.join(app_path, "*", "report", "*", "*.json"))):
+        with open(report_json) as f:
+            report = json.load(f)
+        if report.get("report_type") != "Script Report":
+            continue
+
+        module_dir, report_name = report_json.split(os.sep)[-4], os.path.basename(os.path.dirname(report_json))
+        module = frappe.get_module(f"inventory.{module_dir}.report.{report_name}.{report_name}")
+        filters = dict(REPORT_FILTERS.get(report_name, {}))
+        months = filters.pop("months", 1)
+        filters.update({"from_date": add_months(ctx.to_date, -months), "to_date": ctx.to_date})
+
+        benchmarks[f"report:{report_name}"] = frappe._dict(
+            run=lambda iteration, module=module, filters=filters: module.execute(frappe._dict(filters))
+        )
+    return benchmarks
+
+
+def get_benchmarks(ctx, runs):
+    from inventory.api import master_data_api
+    from inventory.inventory.doctype.item_price.item_price import (
+        get_all_selling_prices_cached,
+        invalidate_all_price_cache,
+    )
+    from inventory.inventory.doctype.sales_order.sales_order import search_item_by_barcode
+    from inventory.pos.api import get_pos_items
+
+    benchmarks = {
+        f"create_pos_invoice:{lines}_lines": get_invoice_benchmark(ctx, lines) for lines in INVOICE_SIZES
+    }
+    benchmarks.update({
+        "get_pos_items": frappe._dict(run=lambda iteration: get_pos_items(ctx.warehouse)),
+        "search_item_by_barcode": frappe._dict(
+            run=lambda iteration: search_item_by_barcode(ctx.barcodes[iteration % len(ctx.barcodes)])
+        ),
+        "get_all_selling_prices_cached:cold": frappe._dict(
+            before=lambda iteration: invalidate_all_price_cache(),
+            run=lambda iteration: get_all_selling_prices_cached(),
+        ),
+        "get_all_selling_prices_cached:warm": frappe._dict(
+            run=lambda iteration: get_all_selling_prices_cached()
+        ),
+    })
+
+    close_session_benchmark = get_close_session_benchmark(ctx, runs)
+    if close_session_benchmark:
+        benchmarks["close_session"] = close_session_benchmark
+
+    benchmarks.update(get_report_benchmarks(ctx))
+    benchmarks.update({
+        "api:list_customers": frappe._dict(run=lambda iteration: master_data_api.list_customers()),
+        "api:list_customers:search": frappe._dict(
+            run=lambda iteration: master_data_api.list_customers(search_text="محمد")
+        ),
+        "api:list_items": frappe._dict(run=lambda iteration: master_data_api.list_items()),
+        "api:list_items:search": frappe._dict(
+            run=lambda iteration: master_data_api.list_items(search_text=ctx.items[0].item_name[:4])
+        ),
+        "api:get_uoms": frappe._dict(run=lambda iteration: master_data_api.get_uoms()),
+        "api:get_brands": frappe._dict(run=lambda iteration: master_data_api.get_brands()),
+    })
+    return benchmarks
+
+
+def get_benchmark_meta(site, iterations, warmup):
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=frappe.get_app_path("inventory"),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        commit = None
+
+    return {
+        "site": site,
+        "db_type": frappe.db.db_type,
+        "commit": commit,
+        "timestamp": now(),
+        "iterations": iterations,
+        "warmup": warmup,
+        "dataset": {doctype: frappe.db.count(doctype) for doctype in DATASET_DOCTYPES},
+    }
+
+
+def print_comparison(results, baseline):
+    print(f"{'benchmark':45} {'p50 ms':>10} {'base':>10} {'change':>8} {'queries':>8} {'base':>6}")
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            print(f"{name:45} {result['p50_ms']:>10} {'-':>10} {'new':>8} {result['queries']:>8} {'-':>6}")
+            continue
+        change = (result["p50_ms"] - base["p50_ms"]) / base["p50_ms"] * 100 if base["p50_ms"] else 0
+        print(f"{name:45} {result['p50_ms']:>10} {base['p50_ms']:>10} {change:>+7.1f}% "
+              f"{result['queries']:>8} {base['queries']:>6}")
+
+
+@click.command('run-benchmarks')
+@click.option('--site', help='site name')
+@click.option('--iterations', default=20, help='Measured runs per benchmark')
+@click.option('--warmup', default=2, help='Unmeasured runs per benchmark before measuring')
+@click.option('--only', multiple=True, help='Run only benchmarks matching this pattern, e.g. "report:*" (repeatable)')
+@click.option('--pos-profile', help='POS Profile to benchmark (default: the first one with a warehouse)')
+@click.option('--seed', default=42, help='Seed for the sampled items and barcodes')
+@click.option('--output', help='Write the results as JSON to this file')
+@click.option('--compare', 'baseline_path', help='Compare with a JSON file written by a previous run')
+@click.option('--json', 'as_json', is_flag=True, help='Print the results as JSON')
+@pass_context
+def run_benchmarks_command(context, site=None, iterations=20, warmup=2, only=None, pos_profile=None,
+                           seed=42, output=None, baseline_path=None, as_json=False):
+    """Measure latency percentiles, query counts and rows read of the hot paths"""
+    site = get_site(context, site=site)
+    iterations = max(1, iterations)
+    warmup = max(0, warmup)
+
+    with frappe.init_site(site):
+        frappe.connect()
+        frappe.set_user("Administrator")
+
+        ctx = get_benchmark_context(pos_profile, seed)
+        benchmarks = {
+            name: benchmark for name, benchmark in get_benchmarks(ctx, iterations + warmup).items()
+            if not only or any(fnmatch.fnmatch(name, pattern) for pattern in only)
+        }
+
+        results = {}
+        for name, benchmark in benchmarks.items():
+            if not as_json:
+                print(f"Running {name}...")
+            try:
+                results[name] = measure(benchmark, iterations, warmup)
+            except Exception as e:
+                frappe.db.rollback()
+                results[name] = {"error": str(e)}
+
+        report = {"meta": get_benchmark_meta(site, iterations, warmup), "results": results}
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+
+    if as_json:
+        print(json.dumps(report, indent=2, default=str))
+        return
+
+    measured = {name: result for name, result in results.items() if "error" not in result}
+    if baseline_path:
+        with open(baseline_path) as f:
+            print_comparison(measured, json.load(f))
+    else:
+        print(f"{'benchmark':45} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'queries':>8} {'rows read':>10}")
+        for name, result in measured.items():
+            print(f"{name:45} {result['p50_ms']:>10} {result['p95_ms']:>10} {result['p99_ms']:>10} "
+                  f"{result['queries']:>8} {result['rows_read'] if result['rows_read'] is not None else '-':>10}")
+
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name}: failed ({result['error']})")
+
+
+commands = [
+    run_benchmarks_command
+]
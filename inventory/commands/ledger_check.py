@@ -0,0 +1,285 @@
+import json
+import multiprocessing
+import zlib
+
+import click
+import frappe
+from frappe.commands import get_site, pass_context
+from frappe.utils import flt
+
+# Tolerances used when comparing stored values with values recomputed from the ledger
+QTY_PRECISION = 6
+VALUE_PRECISION = 2
+
+# Keep at most this many mismatches per check in the report
+MAX_REPORTED_MISMATCHES = 50
+
+ARCHIVE_TABLE = "tabStock Ledger Entry Archive"
+
+
+def get_partition(key, partitions):
+    """Stable partition number for a key (item code, session name)"""
+    return zlib.crc32(key.encode("utf-8")) % partitions
+
+
+def chunked(values, size):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _init_worker(site):
+    frappe.init(site=site)
+    frappe.connect()
+
+
+def get_ledger_union_source():
+    """Ledger source including archived entries, used to rebuild closing snapshots"""
+    if not frappe.db.table_exists("Stock Ledger Entry Archive"):
+        return "`tabStock Ledger Entry`"
+
+    return f"""(
+        SELECT item, warehouse, batch_no, posting_date, actual_qty, valuation_rate, is_cancelled
+        FROM `tabStock Ledger Entry`
+        UNION ALL
+        SELECT item, warehouse, batch_no, posting_date, actual_qty, valuation_rate, is_cancelled
+        FROM `{ARCHIVE_TABLE}`
+    )"""
+
+
+def check_closing_balances(partition, partitions, chunk_size, repair):
+    """Compare the latest Stock Closing Balance snapshot with the ledger, for one item partition"""
+    from inventory.inventory.doctype.stock_closing_balance.stock_closing_balance import get_last_closing_date
+
+    result = {"checked": 0, "mismatches": [], "mismatch_count": 0, "repaired": 0}
+    closing_date = get_last_closing_date()
+    if not closing_date:
+        return result
+
+    period_closing = frappe.db.get_value(
+        "Stock Period Closing", {"docstatus": 1, "period_end_date": closing_date}, "name"
+    )
+    source = get_ledger_union_source()
+    items = [
+        item for item in frappe.db.sql_list("SELECT name FROM `tabItem` ORDER BY name")
+        if get_partition(item, partitions) == partition
+    ]
+
+    for item_chunk in chunked(items, chunk_size):
+        expected = {}
+        for row in frappe.db.sql(f"""
+            SELECT item, warehouse, batch_no,
+                SUM(actual_qty) AS qty, SUM(actual_qty * valuation_rate) AS stock_value
+            FROM {source} sle
+            WHERE item IN %(items)s AND posting_date <= %(closing_date)s AND is_cancelled = 0
+            GROUP BY item, warehouse, batch_no
+        """, {"items": tuple(item_chunk), "closing_date": closing_date}, as_dict=True):
+            if flt(row.qty, QTY_PRECISION) or flt(row.stock_value, VALUE_PRECISION):
+                expected[(row.item, row.warehouse, row.batch_no)] = (
+                    flt(row.qty, QTY_PRECISION), flt(row.stock_value, VALUE_PRECISION)
+                )
+
+        stored = {}
+        for row in frappe.db.sql("""
+            SELECT item, warehouse, batch_no, qty, stock_value
+            FROM `tabStock Closing Balance`
+            WHERE item IN %(items)s AND closing_date = %(closing_date)s
+        """, {"items": tuple(item_chunk), "closing_date": closing_date}, as_dict=True):
+            stored[(row.item, row.warehouse, row.batch_no)] = (
+                flt(row.qty, QTY_PRECISION), flt(row.stock_value, VALUE_PRECISION)
+            )
+
+        result["checked"] += len(expected.keys() | stored.keys())
+        bad_keys = [key for key in expected.keys() | stored.keys() if expected.get(key) != stored.get(key)]
+        if not bad_keys:
+            continue
+
+        result["mismatch_count"] += len(bad_keys)
+        for key in bad_keys[:MAX_REPORTED_MISMATCHES - len(result["mismatches"])]:
+            result["mismatches"].append({
+                "item": key[0], "warehouse": key[1], "batch_no": key[2],
+                "stored": stored.get(key), "ledger": expected.get(key)
+            })
+
+        if repair:
+            result["repaired"] += repair_closing_balances(
+                closing_date, period_closing, bad_keys, expected
+            )
+
+    return result
+
+
+def repair_closing_balances(closing_date, period_closing, keys, expected):
+    """Rewrite the snapshot rows for the given (item, warehouse, batch) keys"""
+    now = frappe.utils.now()
+    values = []
+    for item, warehouse, batch_no in keys:
+        frappe.db.sql("""
+            DELETE FROM `tabStock Closing Balance`
+            WHERE closing_date = %s AND item = %s AND warehouse = %s
+                AND COALESCE(batch_no, '') = %s
+        """, (closing_date, item, warehouse, batch_no or ""))
+
+        if (item, warehouse, batch_no) not in expected:
+            continue
+
+        qty, stock_value = expected[(item, warehouse, batch_no)]
+        values.append((
+            frappe.generate_hash(length=10), now, now, "Administrator", "Administrator",
+            closing_date, period_closing, item, warehouse, batch_no,
+            qty, stock_value / qty if qty else 0, stock_value
+        ))
+
+    frappe.db.bulk_insert(
+        "Stock Closing Balance",
+        fields=[
+            "name", "creation", "modified", "owner", "modified_by",
+            "closing_date", "period_closing", "item", "warehouse", "batch_no",
+            "qty", "valuation_rate", "stock_value",
+        ],
+        values=values,
+    )
+    frappe.db.commit()
+    return len(keys)
+
+
+SESSION_TOTAL_FIELDS = ["net_total", "grand_total", "total_quantity", "total_cost", "total_profit"]
+
+
+def check_session_totals(partition, partitions, chunk_size, repair):
+    """Compare stored POS Session totals with the totals of their submitted invoices
+
+    Only closed sessions are checked: the totals of a session are computed when it closes.
+    """
+    result = {"checked": 0, "mismatches": [], "mismatch_count": 0, "repaired": 0}
+    sessions = [
+        name for name in frappe.db.sql_list("""
+            SELECT name FROM `tabPOS Session` WHERE status = 'Closed' ORDER BY name
+        """)
+        if get_partition(name, partitions) == partition
+    ]
+
+    for session_chunk in chunked(sessions, chunk_size):
+        expected = {
+            row.pos_session: row for row in frappe.db.sql("""
+                SELECT pos_session,
+                    SUM(net_total) AS net_total,
+                    SUM(grand_total) AS grand_total,
+                    SUM(total_qty) AS total_quantity,
+                    SUM(total_cost) AS total_cost,
+                    SUM(total_profit) AS total_profit
+                FROM `tabPOS Invoice`
+                WHERE pos_session IN %(sessions)s AND docstatus = 1
+                GROUP BY pos_session
+            """, {"sessions": tuple(session_chunk)}, as_dict=True)
+        }
+        stored = frappe.db.sql("""
+            SELECT name, opening_amount, {fields}
+            FROM `tabPOS Session`
+            WHERE name IN %(sessions)s
+        """.format(fields=", ".join(SESSION_TOTAL_FIELDS)), {"sessions": tuple(session_chunk)}, as_dict=True)
+
+        for session in stored:
+            result["checked"] += 1
+            ledger = expected.get(session.name) or {}
+            diff = {
+                field: (flt(session.get(field), VALUE_PRECISION), flt(ledger.get(field), VALUE_PRECISION))
+                for field in SESSION_TOTAL_FIELDS
+                if flt(session.get(field), VALUE_PRECISION) != flt(ledger.get(field), VALUE_PRECISION)
+            }
+            if not diff:
+                continue
+
+            result["mismatch_count"] += 1
+            if len(result["mismatches"]) < MAX_REPORTED_MISMATCHES:
+                result["mismatches"].append({"pos_session": session.name, "stored_vs_ledger": diff})
+
+            if repair:
+                values = {field: flt(ledger.get(field)) for field in SESSION_TOTAL_FIELDS}
+                values["profit_margin_percent"] = (
+                    values["total_profit"] / values["net_total"] * 100 if values["net_total"] > 0 else 0
+                )
+                values["closing_amount"] = flt(session.opening_amount) + values["net_total"]
+                frappe.db.set_value("POS Session", session.name, values, update_modified=False)
+                result["repaired"] += 1
+
+        if repair:
+            frappe.db.commit()
+
+    return result
+
+
+# Checks run by check-stock-ledger, each called once per partition in a worker process
+LEDGER_CHECKS = {
+    "closing_balances": check_closing_balances,
+    "session_totals": check_session_totals,
+}
+
+
+def run_partition(args):
+    """Worker entry point: run every selected check for one partition"""
+    partition, partitions, chunk_size, repair, checks = args
+    return {
+        name: LEDGER_CHECKS[name](partition, partitions, chunk_size, repair)
+        for name in checks
+    }
+
+
+def merge_results(partition_results):
+    summary = {}
+    for partition_result in partition_results:
+        for name, result in partition_result.items():
+            total = summary.setdefault(name, {"checked": 0, "mismatch_count": 0, "repaired": 0, "mismatches": []})
+            total["checked"] += result["checked"]
+            total["mismatch_count"] += result["mismatch_count"]
+            total["repaired"] += result["repaired"]
+            total["mismatches"].extend(result["mismatches"])
+
+    for total in summary.values():
+        total["mismatches"] = total["mismatches"][:MAX_REPORTED_MISMATCHES]
+    return summary
+
+
+@click.command('check-stock-ledger')
+@click.option('--site', help='site name')
+@click.option('--workers', default=4, help='Number of parallel worker processes')
+@click.option('--chunk-size', default=500, help='Number of items (or sessions) aggregated per query')
+@click.option('--check', 'checks', multiple=True, type=click.Choice(list(LEDGER_CHECKS)),
+              help='Run only the given check (repeatable, default: all)')
+@click.option('--repair', is_flag=True, help='Rewrite stored values that do not match the ledger')
+@click.option('--json', 'as_json', is_flag=True, help='Print the report as JSON')
+@pass_context
+def check_stock_ledger_command(context, site=None, workers=4, chunk_size=500, checks=None,
+                               repair=False, as_json=False):
+    """Verify stored balances, values and POS Session totals against the Stock Ledger
+
+    The work is partitioned by a hash of the item code (or session name) and each
+    partition is recomputed in its own process with set-based queries per chunk.
+    """
+    site = get_site(context, site=site)
+    checks = list(checks) or list(LEDGER_CHECKS)
+    workers = max(1, workers)
+
+    tasks = [(partition, workers, chunk_size, repair, checks) for partition in range(workers)]
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(processes=workers, initializer=_init_worker, initargs=(site,)) as pool:
+        summary = merge_results(pool.map(run_partition, tasks))
+
+    if as_json:
+        print(json.dumps(summary, indent=2, default=str))
+        return
+
+    print(f"Stock ledger check for site: {site}")
+    print("=" * 50)
+    for name, total in summary.items():
+        print(f"{name}: checked {total['checked']}, mismatches {total['mismatch_count']}"
+              + (f", repaired {total['repaired']}" if repair else ""))
+        for mismatch in total["mismatches"][:10]:
+            print(f"  - {mismatch}")
+
+    if any(total["mismatch_count"] for total in summary.values()) and not repair:
+        print("Run again with --repair to fix the stored values.")
+
+
+commands = [
+    check_stock_ledger_command
+]
@@ -0,0 +1,848 @@
+"""Deterministic synthetic load data for performance work.
+
+`bench generate-load-data` seeds items with barcodes and price histories, customers
+spread over the wilayas by population, warehouses with POS profiles, one POS session
+per profile and day, submitted POS invoices with their stock ledger entries,
+stock receipts/adjustments, and Sales Orders that are open, partially or fully
+delivered by their Delivery Notes, with the lines' reserved/delivered quantities and
+the warehouse's Stock Reservations.
+
+Rows are generated in fixed-size chunks, each with its own random generator seeded
+from (seed, kind, chunk), and written with multi-row inserts by parallel worker
+processes. The same seed and end date always produce the same dataset, whatever the
+number of workers; the printed fingerprint lets two runs be compared.
+"""
+
+import json
+import multiprocessing
+import random
+import time
+import zlib
+from datetime import datetime, timedelta
+from functools import cache
+
+import click
+import frappe
+from frappe.commands import get_site, pass_context
+from frappe.utils import flt, getdate, today
+
+from inventory.commands.test_data import (
+    ALGERIAN_COMPANIES,
+    ALGERIAN_FIRST_NAMES,
+    ALGERIAN_LAST_NAMES,
+    ALGERIAN_PRODUCTS,
+)
+from inventory.inventory.doctype.item_price.item_price import invalidate_all_price_cache
+
+# Every generated record is named with this prefix so it can be cleared again
+LOAD_PREFIX = "LD"
+
+# Entities generated per task; fixed so the output does not depend on the worker count
+GENERATION_CHUNK = 2000
+
+# Dataset sizes; any of them can be overridden on the command line
+LOAD_PRESETS = {
+    "small": {"items": 2000, "customers": 5000, "warehouses": 4, "days": 30,
+              "invoices": 20000, "movements": 50000, "orders": 2000},
+    "medium": {"items": 20000, "customers": 50000, "warehouses": 8, "days": 180,
+               "invoices": 100000, "movements": 500000, "orders": 10000},
+    "large": {"items": 100000, "customers": 200000, "warehouses": 20, "days": 365,
+              "invoices": 500000, "movements": 3000000, "orders": 50000},
+}
+
+# Population of each wilaya (thousands, 2008 census) by wilaya code, to place customers
+WILAYA_POPULATION = {
+    "01": 400, "02": 1000, "03": 450, "04": 620, "05": 1120, "06": 910, "07": 720, "08": 270,
+    "09": 1000, "10": 700, "11": 180, "12": 650, "13": 950, "14": 850, "15": 1130, "16": 2990,
+    "17": 1090, "18": 640, "19": 1490, "20": 330, "21": 900, "22": 600, "23": 610, "24": 480,
+    "25": 940, "26": 820, "27": 740, "28": 990, "29": 780, "30": 560, "31": 1450, "32": 230,
+    "33": 50, "34": 630, "35": 800, "36": 410, "37": 50, "38": 300, "39": 650, "40": 390,
+    "41": 440, "42": 590, "43": 770, "44": 770, "45": 190, "46": 370, "47": 360, "48": 730,
+}
+
+ITEM_VARIANTS = ["ممتاز", "عادي", "اقتصادي", "عائلي", "صغير", "كبير", "مستورد", "محلي"]
+NEIGHBOURHOODS = ["النصر", "السلام", "الشهداء", "الإخوة", "الوحدة", "الأمل", "البدر", "الحرية"]
+
+# GS1 prefix of Algeria, used for the generated EAN-13 barcodes
+GS1_PREFIX = "613"
+
+WALK_IN_CUSTOMER = "Walk-in Customer"
+WALK_IN_SHARE = 0.7
+BASKET_SIZES = [1, 1, 1, 2, 2, 2, 3, 3, 4, 5, 6, 8]
+CARD_SHARE = 0.15
+SESSION_OPENING_AMOUNT = 5000
+SESSION_OPENING_TIME = 8 * 3600
+SESSION_LENGTH = 12 * 3600
+
+# Sales Orders: lines per order, quantity per line, and the share of orders that are
+# still open (nothing delivered) and partially delivered; the rest are fully delivered
+ORDER_SIZES = [1, 2, 2, 3, 3, 4, 5, 8]
+ORDER_QUANTITIES = [5, 10, 12, 20, 24, 50]
+OPEN_ORDER_SHARE = 0.3
+PARTIAL_ORDER_SHARE = 0.5
+
+# Records removed by clear-load-data, children first: (doctype, column, LIKE pattern)
+LOAD_DATA_TABLES = [
+    ("Stock Ledger Entry", "voucher_no", f"{LOAD_PREFIX}-%"),
+    ("Delivery Note Item", "parent", f"{LOAD_PREFIX}-DN-%"),
+    ("Delivery Note", "name", f"{LOAD_PREFIX}-DN-%"),
+    ("Sales Order Item", "parent", f"{LOAD_PREFIX}-SO-%"),
+    ("Sales Order", "name", f"{LOAD_PREFIX}-SO-%"),
+    ("Stock Reservation", "item", f"{LOAD_PREFIX}-ITEM-%"),
+    ("POS Invoice Item", "parent", f"{LOAD_PREFIX}-PINV-%"),
+    ("POS Invoice Payment", "parent", f"{LOAD_PREFIX}-PINV-%"),
+    ("POS Invoice", "name", f"{LOAD_PREFIX}-PINV-%"),
+    ("POS Session", "name", f"{LOAD_PREFIX}-SESS-%"),
+    ("POS Payment Method", "parent", f"{LOAD_PREFIX} POS %"),
+    ("POS Profile", "name", f"{LOAD_PREFIX} POS %"),
+    ("Item Price", "name", f"{LOAD_PREFIX}-IP-%"),
+    ("Item Barcode", "parent", f"{LOAD_PREFIX}-ITEM-%"),
+    ("Item", "name", f"{LOAD_PREFIX}-ITEM-%"),
+    ("Customer", "name", f"{LOAD_PREFIX}-%"),
+    ("Warehouse", "name", f"{LOAD_PREFIX} Warehouse %"),
+]
+
+STANDARD_FIELDS = ["name", "creation", "modified", "owner", "modified_by", "docstatus"]
+CHILD_FIELDS = [*STANDARD_FIELDS, "parent", "parenttype", "parentfield", "idx"]
+
+
+def _init_worker(site):
+    frappe.init(site=site)
+    frappe.connect()
+
+
+def get_chunk_rng(seed, kind, chunk):
+    return random.Random(f"{seed}:{kind}:{chunk}")
+
+
+def ean13(number):
+    """EAN-13 barcode (with check digit) for a 12 digit number"""
+    digits = f"{number:012d}"
+    total = sum(int(digit) * (3 if position % 2 else 1) for position, digit in enumerate(digits))
+    return digits + str((10 - total % 10) % 10)
+
+
+def item_code(index):
+    return f"{LOAD_PREFIX}-ITEM-{index + 1:06d}"
+
+
+def warehouse_name(index):
+    return f"{LOAD_PREFIX} Warehouse {index + 1:02d}"
+
+
+def pos_profile_name(index):
+    return f"{LOAD_PREFIX} POS {index + 1:02d}"
+
+
+def session_name(index):
+    return f"{LOAD_PREFIX}-SESS-{index + 1:06d}"
+
+
+def invoice_name(index):
+    return f"{LOAD_PREFIX}-PINV-{index + 1:08d}"
+
+
+def sales_order_name(index):
+    return f"{LOAD_PREFIX}-SO-{index + 1:07d}"
+
+
+def delivery_note_name(index, delivery):
+    return f"{LOAD_PREFIX}-DN-{index + 1:07d}-{delivery + 1}"
+
+
+@cache
+def get_item_spec(seed, index):
+    """Item attributes, derived from the seed and the item number alone"""
+    rng = random.Random(f"{seed}:item:{index}")
+    product = rng.choice(ALGERIAN_PRODUCTS)
+    price = rng.randint(*product["price_range"])
+    return frappe._dict({
+        "item_code": item_code(index),
+        "item_name": f"{product['name']} {rng.choice(ITEM_VARIANTS)} {index + 1}",
+        "category": product["category"],
+        "unit": product["unit"],
+        "price": price,
+        "cost": flt(price * rng.uniform(0.7, 0.9), 2),
+    })
+
+
+def pick_item(rng, items):
+    """Skewed item choice: a small part of the catalog makes most of the sales"""
+    return int(items * rng.random() ** 3)
+
+
+def get_day(ctx, day):
+    return ctx["start_date"] + timedelta(days=day)
+
+
+def get_timestamp(date, seconds):
+    return datetime.combine(date, datetime.min.time()) + timedelta(seconds=seconds)
+
+
+def generate_items(ctx, chunk, start, stop):
+    """Items with an EAN-13 barcode, a selling price history and a buying price"""
+    seed = ctx["seed"]
+    rng = get_chunk_rng(seed, "items", chunk)
+    items, barcodes, prices = [], [], []
+    created = get_timestamp(ctx["start_date"], 0)
+
+    for index in range(start, stop):
+        spec = get_item_spec(seed, index)
+        items.append((
+            spec.item_code, created, created, "Administrator", "Administrator", 0,
+            spec.item_code, spec.item_name, spec.item_name, spec.category, spec.unit, 0,
+            rng.choice([0, 5, 10, 20]), rng.choice([10, 20, 50]), spec.price, 1, spec.cost, spec.cost,
+        ))
+        barcodes.append((
+            f"{spec.item_code}-BC", created, created, "Administrator", "Administrator", 0,
+            spec.item_code, "Item", "barcodes", 1, ean13(int(GS1_PREFIX) * 10 ** 9 + index + 1), "EAN",
+        ))
+
+        # Newest price first (valid over the whole generated period), then the older ones
+        valid_upto, price = None, spec.price
+        for step in range(ctx["price_history"]):
+            valid_from = ctx["start_date"] - timedelta(days=step * ctx["price_interval"])
+            prices.append((
+                f"{LOAD_PREFIX}-IP-{index + 1:06d}-{step + 1}", created, created, "Administrator",
+                "Administrator", 0, 0, 1, 1, 1 if step == 0 else 0, spec.item_code, spec.item_name,
+                price, valid_from, valid_upto,
+            ))
+            valid_upto = valid_from - timedelta(days=1)
+            price = flt(price / rng.uniform(1.02, 1.12), 2)
+        prices.append((
+            f"{LOAD_PREFIX}-IP-{index + 1:06d}-B", created, created, "Administrator", "Administrator",
+            0, 1, 0, 1, 0, spec.item_code, spec.item_name, spec.cost, None, None,
+        ))
+
+    frappe.db.bulk_insert("Item", [*STANDARD_FIELDS,
+        "item_code", "item_name", "description", "item_category", "unit_of_measurement", "disabled",
+        "minimum_stock_level", "reorder_level", "standard_rate", "is_sales_item", "valuation_rate",
+        "last_purchase_rate",
+    ], items)
+    frappe.db.bulk_insert("Item Barcode", [*CHILD_FIELDS, "barcode", "barcode_type"], barcodes)
+    frappe.db.bulk_insert("Item Price", [*STANDARD_FIELDS,
+        "buying", "selling", "enabled", "is_default_price", "item_code", "item_name",
+        "price_list_rate", "valid_from", "valid_upto",
+    ], prices)
+    return items + barcodes + prices
+
+
+def draw_customer_name(rng, index):
+    first_name, last_name = rng.choice(ALGERIAN_FIRST_NAMES), rng.choice(ALGERIAN_LAST_NAMES)
+    is_company = rng.random() < 0.3
+    name = f"{LOAD_PREFIX}-{index + 1:06d} " + (
+        rng.choice(ALGERIAN_COMPANIES) if is_company else f"{first_name} {last_name}"
+    )
+    return name, f"{first_name} {last_name}", is_company
+
+
+@cache
+def get_customer(seed, index):
+    """Customer name and type, derived from the seed and the customer number alone"""
+    name, _contact_person, is_company = draw_customer_name(random.Random(f"{seed}:customer:{index}"), index)
+    return name, "Company" if is_company else "Individual"
+
+
+def get_customer_name(seed, index):
+    return get_customer(seed, index)[0]
+
+
+def generate_customers(ctx, chunk, start, stop):
+    """Individuals and companies placed in wilayas by population, with a commune when known"""
+    wilayas, weights = ctx["wilayas"], ctx["wilaya_weights"]
+    created = get_timestamp(ctx["start_date"], 0)
+    customers = []
+
+    for index in range(start, stop):
+        rng = random.Random(f"{ctx['seed']}:customer:{index}")
+        name, contact_person, is_company = draw_customer_name(rng, index)
+        wilaya = rng.choices(wilayas, weights=weights)[0]
+        communes = ctx["communes"].get(wilaya)
+        mobile = f"0{rng.choice([5, 6, 7])}{rng.randint(10000000, 99999999)}"
+        customers.append((
+            name, created, created, "Administrator", "Administrator", 0,
+            name, "Company" if is_company else "Individual", "Active",
+            f"{rng.randint(10, 48):02d}/00-{rng.randint(1000000, 9999999)}B{rng.randint(10, 99)}" if is_company else None,
+            str(rng.randint(10 ** 14, 10 ** 15 - 1)) if is_company else None,
+            contact_person, mobile, mobile,
+            f"client{index + 1}@example.dz" if rng.random() < 0.6 else None,
+            wilaya, rng.choice(communes) if communes else None,
+            f"حي {rng.choice(NEIGHBOURHOODS)} رقم {rng.randint(1, 300)}، {wilaya}",
+        ))
+
+    frappe.db.bulk_insert("Customer", [*STANDARD_FIELDS,
+        "customer_name", "customer_type", "status", "rc_number", "nif_number", "contact_person",
+        "contact_number", "mobile", "email", "wilaya", "commune", "address",
+    ], customers)
+    return customers
+
+
+def generate_sessions(ctx, chunk, start, stop):
+    """Closed POS sessions, one per profile and day; totals are filled from the invoices"""
+    sessions = []
+    for index in range(start, stop):
+        day = get_day(ctx, index // ctx["warehouses"])
+        opened = get_timestamp(day, SESSION_OPENING_TIME)
+        closed = get_timestamp(day, SESSION_OPENING_TIME + SESSION_LENGTH)
+        sessions.append((
+            session_name(index), opened, closed, "Administrator", "Administrator", 0,
+            "POS-SESS-.YYYY.-.MM.-.DD.-", pos_profile_name(index % ctx["warehouses"]), day, day,
+            "Closed", opened, closed, SESSION_OPENING_AMOUNT, "Administrator",
+        ))
+
+    frappe.db.bulk_insert("POS Session", [*STANDARD_FIELDS,
+        "naming_series", "pos_profile", "period_start_date", "period_end_date", "status",
+        "opening_time", "closing_time", "opening_amount", "pos_user",
+    ], sessions)
+    return sessions
+
+
+def generate_invoices(ctx, chunk, start, stop):
+    """Submitted POS invoices spread evenly over the sessions, with their stock ledger entries"""
+    seed = ctx["seed"]
+    rng = get_chunk_rng(seed, "invoices", chunk)
+    invoices, items, payments, entries = [], [], [], []
+
+    for index in range(start, stop):
+        session = index * ctx["sessions"] // ctx["invoices"]
+        warehouse = session % ctx["warehouses"]
+        day = get_day(ctx, session // ctx["warehouses"])
+        posted = get_timestamp(day, SESSION_OPENING_TIME + rng.randrange(SESSION_LENGTH))
+        name = invoice_name(index)
+
+        total_qty = net_total = total_cost = 0
+        lines = rng.choice(BASKET_SIZES)
+        for idx in range(1, lines + 1):
+            spec = get_item_spec(seed, pick_item(rng, ctx["items"]))
+            qty = rng.choice([1, 1, 1, 2, 2, 3, 5, 10])
+            amount, cost = flt(qty * spec.price, 2), flt(qty * spec.cost, 2)
+            row_name = f"{name}-{idx}"
+            items.append((
+                row_name, posted, posted, "Administrator", "Administrator", 1, name, "POS Invoice",
+                "items", idx, spec.item_code, spec.item_name, qty, spec.price, amount, spec.cost,
+                flt(amount - cost, 2), flt((amount - cost) / amount * 100, 2) if amount else 0,
+            ))
+            entries.append((
+                f"{LOAD_PREFIX}-SLE-{row_name}", posted, posted, "Administrator", "Administrator", 1,
+                spec.item_code, warehouse_name(warehouse), day, posted.time(), "POS Invoice", name,
+                row_name, -qty, spec.cost, -cost, ctx["company"], str(day.year), 0,
+            ))
+            total_qty += qty
+            net_total += amount
+            total_cost += cost
+
+        net_total, total_cost = flt(net_total, 2), flt(total_cost, 2)
+        profit = flt(net_total - total_cost, 2)
+        if rng.random() < CARD_SHARE:
+            method, paid = "Card", net_total
+        else:
+            # Cash is handed over rounded up to the next 100 DZD
+            method, paid = "Cash", flt(-(-net_total // 100) * 100, 2)
+        payments.append((
+            f"{name}-P1", posted, posted, "Administrator", "Administrator", 1, name, "POS Invoice",
+            "payments", 1, method, paid,
+        ))
+        invoices.append((
+            name, posted, posted, "Administrator", "Administrator", 1,
+            "POS-INV-.YYYY.-.MM.-.DD.-.####", pos_profile_name(warehouse), session_name(session),
+            get_invoice_customer(ctx, rng),
+            day, posted.time(), ctx["company"], warehouse_name(warehouse), "DZD", 1,
+            total_qty, lines, net_total, net_total, net_total, 0, total_cost, profit,
+            flt(profit / net_total * 100, 2) if net_total else 0, paid, flt(paid - net_total, 2), "Paid",
+        ))
+
+    frappe.db.bulk_insert("POS Invoice", [*STANDARD_FIELDS,
+        "naming_series", "pos_profile", "pos_session", "customer", "posting_date", "posting_time",
+        "company", "warehouse", "currency", "conversion_rate", "total_qty", "item_count", "net_total",
+        "grand_total", "rounded_total", "rounding_adjustment", "total_cost", "total_profit",
+        "profit_margin_percent", "paid_amount", "change_amount", "status",
+    ], invoices)
+    frappe.db.bulk_insert("POS Invoice Item", [*CHILD_FIELDS,
+        "item_code", "item_name", "qty", "rate", "amount", "cost_price", "profit_amount",
+        "profit_margin_percent",
+    ], items)
+    frappe.db.bulk_insert("POS Invoice Payment", [*CHILD_FIELDS, "payment_method", "amount"], payments)
+    insert_ledger_entries(entries)
+    return invoices + items + payments + entries
+
+
+def get_invoice_customer(ctx, rng):
+    if not ctx["customers"] or rng.random() < WALK_IN_SHARE:
+        return WALK_IN_CUSTOMER
+    return get_customer_name(ctx["seed"], rng.randrange(ctx["customers"]))
+
+
+def generate_opening_stock(ctx, chunk, start, stop):
+    """Opening balance of every item in every warehouse, the day before the first session"""
+    seed = ctx["seed"]
+    rng = get_chunk_rng(seed, "opening", chunk)
+    day = ctx["start_date"] - timedelta(days=1)
+    posted = get_timestamp(day, SESSION_OPENING_TIME)
+    entries = []
+
+    for index in range(start, stop):
+        spec = get_item_spec(seed, index)
+        for warehouse in range(ctx["warehouses"]):
+            qty = rng.randint(50, 1000)
+            entries.append((
+                f"{LOAD_PREFIX}-SLE-OPEN-{index + 1:06d}-{warehouse + 1:02d}", posted, posted,
+                "Administrator", "Administrator", 1, spec.item_code, warehouse_name(warehouse), day,
+                posted.time(), "Stock Entry", f"{LOAD_PREFIX}-OPEN-{warehouse + 1:02d}-{chunk + 1:05d}",
+                None, qty, spec.cost, flt(qty * spec.cost, 2), ctx["company"], str(day.year), 0,
+            ))
+
+    insert_ledger_entries(entries)
+    return entries
+
+
+def generate_movements(ctx, chunk, start, stop):
+    """Purchase receipts (ten lines each) and stock adjustments over the whole period"""
+    seed = ctx["seed"]
+    rng = get_chunk_rng(seed, "movements", chunk)
+    entries = []
+
+    for index in range(start, stop):
+        spec = get_item_spec(seed, pick_item(rng, ctx["items"]))
+        day = get_day(ctx, rng.randrange(ctx["days"]))
+        posted = get_timestamp(day, rng.randrange(7 * 3600, 18 * 3600))
+        rate = flt(spec.cost * rng.uniform(0.95, 1.05), 2)
+        if rng.random() < 0.8:
+            voucher_type, voucher_no = "Purchase Receipt", f"{LOAD_PREFIX}-PREC-{index // 10 + 1:07d}"
+            qty = rng.choice([10, 20, 24, 48, 50, 100, 200])
+        else:
+            voucher_type, voucher_no = "Stock Entry", f"{LOAD_PREFIX}-STE-{index + 1:08d}"
+            qty = -rng.randint(1, 10)
+        entries.append((
+            f"{LOAD_PREFIX}-SLE-MOV-{index + 1:08d}", posted, posted, "Administrator", "Administrator", 1,
+            spec.item_code, warehouse_name(rng.randrange(ctx["warehouses"])), day, posted.time(),
+            voucher_type, voucher_no, None, qty, rate, flt(qty * rate, 2), ctx["company"],
+            str(day.year), 0,
+        ))
+
+    insert_ledger_entries(entries)
+    return entries
+
+
+def get_order_deliveries(rng, quantities):
+    """Quantities delivered per line by each Delivery Note of an order
+
+    Open orders get none, partially delivered ones one note leaving at least one line
+    short, fully delivered ones one or two notes covering every line.
+    """
+    state = rng.random()
+    if state < OPEN_ORDER_SHARE:
+        return []
+
+    if state < OPEN_ORDER_SHARE + PARTIAL_ORDER_SHARE:
+        delivered = [rng.choice([0, qty // 2, qty]) for qty in quantities]
+        if all(qty == line_qty for qty, line_qty in zip(delivered, quantities, strict=True)) or not any(delivered):
+            delivered[0] = quantities[0] // 2
+        return [delivered]
+
+    if rng.random() < 0.5:
+        return [list(quantities)]
+    first = [qty // 2 for qty in quantities]
+    return [first, [qty - part for qty, part in zip(quantities, first, strict=True)]]
+
+
+def generate_orders(ctx, chunk, start, stop):
+    """Submitted Sales Orders with their Delivery Notes and the notes' stock ledger entries
+
+    The order lines carry what a real submission and delivery leave on them: the
+    delivered quantity, and the rest of the ordered quantity as reserved. Stock
+    Reservations are summed from the lines once every chunk is in (`update_order_reservations`).
+    """
+    seed = ctx["seed"]
+    rng = get_chunk_rng(seed, "orders", chunk)
+    warehouse = ctx["order_warehouse"]
+    orders, order_items, notes, note_items, entries = [], [], [], [], []
+
+    for index in range(start, stop):
+        name = sales_order_name(index)
+        day = get_day(ctx, rng.randrange(ctx["days"]))
+        ordered = get_timestamp(day, rng.randrange(7 * 3600, 18 * 3600))
+        customer, customer_type = get_customer(seed, rng.randrange(ctx["customers"]))
+
+        specs = {}
+        for _ in range(rng.choice(ORDER_SIZES)):
+            spec = get_item_spec(seed, pick_item(rng, ctx["items"]))
+            specs[spec.item_code] = spec
+        specs = list(specs.values())
+        quantities = [rng.choice(ORDER_QUANTITIES) for spec in specs]
+        deliveries = get_order_deliveries(rng, quantities)
+        delivered = [sum(delivery[idx] for delivery in deliveries) for idx in range(len(specs))]
+
+        if not deliveries:
+            status = "Ordered"
+        elif delivered == quantities:
+            status = "Completed"
+        else:
+            status = "Partially Delivered"
+
+        total_amount = 0
+        for idx, (spec, qty) in enumerate(zip(specs, quantities, strict=True), 1):
+            amount = flt(qty * spec.price, 2)
+            total_amount += amount
+            order_items.append((
+                f"{name}-{idx}", ordered, ordered, "Administrator", "Administrator", 1, name, "Sales Order",
+                "items", idx, spec.item_code, spec.item_name, qty, spec.price, amount,
+                qty - delivered[idx - 1], delivered[idx - 1], spec.unit, name,
+            ))
+        orders.append((
+            name, ordered, ordered, "Administrator", "Administrator", 1, "SO-.YYYY.-.MM.-.#####",
+            customer, customer, customer_type, day, status, day + timedelta(days=7),
+            flt(total_amount, 2),
+        ))
+
+        delivery_day = day
+        for delivery, delivery_quantities in enumerate(deliveries):
+            delivery_day = min(delivery_day + timedelta(days=rng.randint(0, 3)), ctx["end_date"])
+            posted = get_timestamp(delivery_day, rng.randrange(7 * 3600, 18 * 3600))
+            posted = max(posted, ordered)
+            note = delivery_note_name(index, delivery)
+            voucher_no = f"{note}-STE"
+
+            note_amount, idx = 0, 0
+            for line, (spec, qty) in enumerate(zip(specs, delivery_quantities, strict=True), 1):
+                if not qty:
+                    continue
+                idx += 1
+                amount = flt(qty * spec.price, 2)
+                note_amount += amount
+                row_name = f"{note}-{idx}"
+                note_items.append((
+                    row_name, posted, posted, "Administrator", "Administrator", 1, note, "Delivery Note",
+                    "items", idx, spec.item_code, spec.item_name, qty, spec.price, amount, spec.unit,
+                    note, name, f"{name}-{line}",
+                ))
+                # Delivered stock leaves through the note's Stock Entry (entry type Sale)
+                entries.append((
+                    f"{LOAD_PREFIX}-SLE-{row_name}", posted, posted, "Administrator", "Administrator", 1,
+                    spec.item_code, warehouse, posted.date(), posted.time(), "Stock Entry", voucher_no,
+                    row_name, -qty, spec.price, flt(-qty * spec.price, 2), ctx["company"],
+                    str(posted.year), 0,
+                ))
+            notes.append((
+                note, posted, posted, "Administrator", "Administrator", 1, "DN-.YYYY.-.MM.-.#####",
+                customer, customer, posted.date(), name, warehouse, posted.time(), flt(note_amount, 2),
+            ))
+
+    frappe.db.bulk_insert("Sales Order", [*STANDARD_FIELDS,
+        "naming_series", "customer", "customer_name", "customer_type", "order_date", "status",
+        "expected_delivery_date", "total_amount",
+    ], orders)
+    frappe.db.bulk_insert("Sales Order Item", [*CHILD_FIELDS,
+        "item", "item_name", "quantity", "rate", "amount", "reserved_qty", "delivered_qty", "uom",
+        "sales_order",
+    ], order_items)
+    frappe.db.bulk_insert("Delivery Note", [*STANDARD_FIELDS,
+        "naming_series", "customer", "customer_name", "delivery_date", "sales_order",
+        "source_warehouse", "posting_time", "total_amount",
+    ], notes)
+    frappe.db.bulk_insert("Delivery Note Item", [*CHILD_FIELDS,
+        "item", "item_name", "quantity", "rate", "amount", "uom", "delivery_note", "sales_order",
+        "sales_order_item",
+    ], note_items)
+    insert_ledger_entries(entries)
+    return orders + order_items + notes + note_items + entries
+
+
+def insert_ledger_entries(entries):
+    frappe.db.bulk_insert("Stock Ledger Entry", [*STANDARD_FIELDS,
+        "item", "warehouse", "posting_date", "posting_time", "voucher_type", "voucher_no",
+        "voucher_detail_no", "actual_qty", "valuation_rate", "stock_value_difference", "company",
+        "fiscal_year", "is_cancelled",
+    ], entries)
+
+
+# Generators run by generate-load-data, in this order, keyed by the count they chunk over
+LOAD_GENERATORS = {
+    "items": (generate_items, "items"),
+    "customers": (generate_customers, "customers"),
+    "sessions": (generate_sessions, "sessions"),
+    "opening": (generate_opening_stock, "items"),
+    "invoices": (generate_invoices, "invoices"),
+    "movements": (generate_movements, "movements"),
+    "orders": (generate_orders, "orders"),
+}
+
+
+def run_task(args):
+    """Worker entry point: generate and insert one chunk of one kind"""
+    kind, chunk, start, stop, ctx = args
+    generator = LOAD_GENERATORS[kind][0]
+    rows = generator(ctx, chunk, start, stop)
+    frappe.db.commit()
+    return kind, chunk, len(rows), zlib.crc32(repr(rows).encode("utf-8"))
+
+
+# POS Session totals recomputed from the generated invoices
+SESSION_TOTALS = {
+    "invoice_count": "COUNT(*)",
+    "total_quantity": "SUM(total_qty)",
+    "net_total": "SUM(net_total)",
+    "grand_total": "SUM(grand_total)",
+    "total_cost": "SUM(total_cost)",
+    "total_profit": "SUM(total_profit)",
+}
+
+
+def get_load_context(seed, end_date, sizes, price_history, price_interval):
+    """Everything the workers need, resolved once in the main process"""
+    wilayas = frappe.get_all("Wilaya", fields=["name", "wilaya_code"], order_by="wilaya_code")
+    if not wilayas:
+        raise click.ClickException("No Wilayas found. Run `bench install-geography` first.")
+    if not frappe.db.exists("Currency", "DZD"):
+        raise click.ClickException("Currency DZD not found.")
+
+    communes = {}
+    for row in frappe.get_all("Commune", fields=["name", "wilaya"], order_by="name"):
+        communes.setdefault(row.wilaya, []).append(row.name)
+
+    end_date = getdate(end_date)
+    return {
+        **sizes,
+        "seed": seed,
+        "end_date": end_date,
+        "start_date": end_date - timedelta(days=sizes["days"] - 1),
+        "sessions": sizes["warehouses"] * sizes["days"],
+        "price_history": price_history,
+        "price_interval": price_interval,
+        "company": frappe.db.get_single_value("Inventory Settings", "company_name") or "Default Company",
+        # Sales Orders reserve and Delivery Notes ship from the default warehouse
+        "order_warehouse": warehouse_name(0),
+        "wilayas": [row.name for row in wilayas],
+        "wilaya_weights": [WILAYA_POPULATION.get(row.wilaya_code, 100) for row in wilayas],
+        "communes": communes,
+    }
+
+
+def setup_load_masters(ctx):
+    """The few records created as documents: units, categories, warehouses and POS profiles"""
+    for product in ALGERIAN_PRODUCTS:
+        if not frappe.db.exists("UOM", product["unit"]):
+            frappe.get_doc({
+                "doctype": "UOM", "uom_name": product["unit"], "uom_abbreviation": product["unit"]
+            }).insert(ignore_permissions=True)
+        if not frappe.db.exists("Item Category", product["category"]):
+            frappe.get_doc({
+                "doctype": "Item Category", "category_name": product["category"]
+            }).insert(ignore_permissions=True)
+
+    for index in range(ctx["warehouses"]):
+        frappe.get_doc({
+            "doctype": "Warehouse",
+            "warehouse_name": warehouse_name(index),
+            "warehouse_code": f"{LOAD_PREFIX}-WH-{index + 1:02d}",
+            "warehouse_type": "Distribution",
+            "is_active": 1,
+        }).insert(ignore_permissions=True)
+        frappe.get_doc({
+            "doctype": "POS Profile",
+            "profile_name": pos_profile_name(index),
+            "company_name": ctx["company"],
+            "warehouse_name": warehouse_name(index),
+            "currency": "DZD",
+            "allow_negative_stock": 1,
+            "payment_methods": [
+                {"payment_method": "Cash", "is_default": 1},
+                {"payment_method": "Card"},
+            ],
+        }).insert(ignore_permissions=True)
+
+    set_default_warehouse(ctx["order_warehouse"])
+    frappe.db.commit()
+
+
+def set_default_warehouse(warehouse):
+    """Point Inventory Settings at the warehouse the generated orders reserve in"""
+    from inventory.pos.cache import invalidate_pos_lookup
+
+    frappe.db.set_single_value("Inventory Settings", "default_warehouse", warehouse)
+    invalidate_pos_lookup("Inventory Settings", "Inventory Settings")
+
+
+def get_load_tasks(ctx):
+    tasks = []
+    for kind, (_generator, count_key) in LOAD_GENERATORS.items():
+        for chunk, start in enumerate(range(0, ctx[count_key], GENERATION_CHUNK)):
+            tasks.append((kind, chunk, start, min(start + GENERATION_CHUNK, ctx[count_key]), ctx))
+    return tasks
+
+
+def update_session_totals():
+    """Fill the POS Session totals from their invoices, set-based"""
+    frappe.db.sql("""
+        UPDATE `tabPOS Session`
+        SET {totals}
+        WHERE name LIKE %(pattern)s
+    """.format(totals=", ".join(
+        f"""{field} = (
+            SELECT COALESCE({aggregate}, 0)
+            FROM `tabPOS Invoice` pi
+            WHERE pi.pos_session = `tabPOS Session`.name AND pi.docstatus = 1
+        )"""
+        for field, aggregate in SESSION_TOTALS.items()
+    )), {"pattern": f"{LOAD_PREFIX}-SESS-%"})
+
+    frappe.db.sql("""
+        UPDATE `tabPOS Session`
+        SET closing_amount = opening_amount + net_total,
+            profit_margin_percent = CASE WHEN net_total > 0 THEN total_profit / net_total * 100 ELSE 0 END
+        WHERE name LIKE %(pattern)s
+    """, {"pattern": f"{LOAD_PREFIX}-SESS-%"})
+    frappe.db.commit()
+
+
+def update_order_reservations(ctx):
+    """Stock Reservation rows holding what the generated orders still have reserved, set-based"""
+    frappe.db.sql("""
+        INSERT INTO `tabStock Reservation`
+            (name, creation, modified, owner, modified_by, docstatus, item, warehouse, reserved_qty, held_qty)
+        SELECT CONCAT(%(prefix)s, soi.item), %(now)s, %(now)s, 'Administrator', 'Administrator', 0,
+            soi.item, %(warehouse)s, SUM(soi.reserved_qty), 0
+        FROM `tabSales Order Item` soi
+        WHERE soi.parent LIKE %(pattern)s AND soi.parenttype = 'Sales Order'
+        GROUP BY soi.item
+        HAVING SUM(soi.reserved_qty) > 0
+    """, {
+        "prefix": f"{LOAD_PREFIX}-RES-",
+        "now": get_timestamp(ctx["end_date"], SESSION_OPENING_TIME + SESSION_LENGTH),
+        "warehouse": ctx["order_warehouse"],
+        "pattern": f"{LOAD_PREFIX}-SO-%",
+    })
+    frappe.db.commit()
+
+
+def analyze_tables(doctypes):
+    """Refresh planner statistics after a bulk load"""
+    for doctype in doctypes:
+        if frappe.db.db_type == "postgres":
+            frappe.db.sql(f'ANALYZE "tab{doctype}"')
+        else:
+            frappe.db.sql(f"ANALYZE TABLE `tab{doctype}`")
+
+
+def clear_load_data():
+    """Delete every generated record; returns {doctype: rows deleted}"""
+    deleted = {}
+    for doctype, column, pattern in LOAD_DATA_TABLES:
+        count = frappe.db.sql(
+            f"SELECT COUNT(*) FROM `tab{doctype}` WHERE `{column}` LIKE %s", (pattern,)
+        )[0][0]
+        if count:
+            frappe.db.sql(f"DELETE FROM `tab{doctype}` WHERE `{column}` LIKE %s", (pattern,))
+            deleted[doctype] = count
+
+    if (frappe.db.get_single_value("Inventory Settings", "default_warehouse") or "").startswith(f"{LOAD_PREFIX} Warehouse "):
+        set_default_warehouse(None)
+    frappe.db.commit()
+    invalidate_all_price_cache()
+    return deleted
+
+
+@click.command('generate-load-data')
+@click.option('--site', help='site name')
+@click.option('--preset', default="small", type=click.Choice(list(LOAD_PRESETS)), help='Dataset size')
+@click.option('--seed', default=42, help='Random seed; the same seed and end date give the same data')
+@click.option('--end-date', default=None, help='Date of the last POS session (default: today)')
+@click.option('--items', type=int, help='Number of items (overrides the preset)')
+@click.option('--customers', type=int, help='Number of customers (overrides the preset)')
+@click.option('--warehouses', type=int, help='Number of warehouses, one POS profile each (overrides the preset)')
+@click.option('--days', type=int, help='Number of days with one POS session per profile (overrides the preset)')
+@click.option('--invoices', type=int, help='Number of POS invoices (overrides the preset)')
+@click.option('--movements', type=int, help='Number of stock receipt/adjustment lines (overrides the preset)')
+@click.option('--orders', type=int, help='Number of Sales Orders, with their Delivery Notes (overrides the preset)')
+@click.option('--price-history', default=3, help='Selling prices kept per item')
+@click.option('--price-interval', default=90, help='Days between two selling price changes')
+@click.option('--workers', default=4, help='Number of parallel worker processes')
+@click.option('--replace', is_flag=True, help='Clear previously generated load data first')
+@click.option('--json', 'as_json', is_flag=True, help='Print the manifest as JSON')
+@pass_context
+def generate_load_data_command(context, site=None, preset="small", seed=42, end_date=None,
+                               price_history=3, price_interval=90, workers=4, replace=False,
+                               as_json=False, **overrides):
+    """Bulk-load a deterministic, production-sized dataset for performance measurements
+
+    Items with barcodes and price histories, customers across the wilayas, POS
+    sessions and invoices with their stock ledger entries, stock movements, and Sales
+    Orders with their Delivery Notes and reservations. Opening stock adds one ledger
+    entry per item and warehouse. Inventory Settings' default warehouse is set to the
+    first generated warehouse, where the orders reserve and ship.
+    """
+    site = get_site(context, site=site)
+    sizes = {key: overrides[key] if overrides.get(key) is not None else value
+             for key, value in LOAD_PRESETS[preset].items()}
+    sizes["warehouses"] = max(1, sizes["warehouses"])
+    sizes["days"] = max(1, sizes["days"])
+    if sizes["orders"] and not sizes["customers"]:
+        raise click.ClickException("Sales Orders need customers: pass --customers or --orders 0.")
+    workers = max(1, workers)
+
+    with frappe.init_site(site):
+        frappe.connect()
+        if replace:
+            clear_load_data()
+        elif frappe.db.exists("Warehouse", warehouse_name(0)):
+            raise click.ClickException("Load data already exists. Run `bench clear-load-data` or pass --replace.")
+
+        ctx = get_load_context(seed, end_date or today(), sizes, price_history, price_interval)
+        setup_load_masters(ctx)
+
+    tasks = get_load_tasks(ctx)
+    started = time.monotonic()
+    rows, checksums = {}, []
+    ctx_pool = multiprocessing.get_context("spawn")
+    with ctx_pool.Pool(processes=workers, initializer=_init_worker, initargs=(site,)) as pool:
+        for done, (kind, chunk, count, checksum) in enumerate(pool.imap_unordered(run_task, tasks), 1):
+            rows[kind] = rows.get(kind, 0) + count
+            checksums.append((kind, chunk, checksum))
+            if not as_json and (done % 50 == 0 or done == len(tasks)):
+                print(f"  {done}/{len(tasks)} chunks, {sum(rows.values())} rows")
+
+    with frappe.init_site(site):
+        frappe.connect()
+        update_session_totals()
+        update_order_reservations(ctx)
+        invalidate_all_price_cache()
+        analyze_tables([doctype for doctype, column, pattern in LOAD_DATA_TABLES])
+
+    elapsed = time.monotonic() - started
+    manifest = {
+        "site": site,
+        "seed": seed,
+        "start_date": str(ctx["start_date"]),
+        "end_date": str(ctx["end_date"]),
+        "sizes": {**sizes, "sessions": ctx["sessions"]},
+        "rows": rows,
+        "fingerprint": f"{zlib.crc32(json.dumps(sorted(checksums)).encode()):08x}",
+        "seconds": round(elapsed, 1),
+    }
+
+    if as_json:
+        print(json.dumps(manifest, indent=2))
+        return
+
+    print("=" * 50)
+    print(f"Generated {sum(rows.values())} rows in {elapsed:.1f}s ({sum(rows.values()) / max(elapsed, 0.001):.0f} rows/s)")
+    for kind, count in rows.items():
+        print(f"  - {kind}: {count} rows")
+    print(f"Seed {seed}, {manifest['start_date']} to {manifest['end_date']}, fingerprint {manifest['fingerprint']}")
+
+
+@click.command('clear-load-data')
+@click.option('--site', help='site name')
+@pass_context
+def clear_load_data_command(context, site=None):
+    """Delete the records created by generate-load-data"""
+    site = get_site(context, site=site)
+    with frappe.init_site(site):
+        frappe.connect()
+        for doctype, count in clear_load_data().items():
+            print(f"Deleted {count} {doctype} records")
+
+
+commands = [
+    generate_load_data_command,
+    clear_load_data_command
+]
@@ -105,11 +105,16 @@ fixtures = [
     }
 ]
 
-# Custom commands (bench inventory extract-geography, bench inventory install-geography, bench inventory create-algeria-test-data)
+# Custom commands (bench inventory extract-geography, bench inventory install-geography, bench inventory create-algeria-test-data,
+# bench inventory check-stock-ledger, bench inventory generate-load-data,
+# bench inventory run-benchmarks)
 # ---------------------
 commands = [
     "inventory.commands.fixtures",
-    "inventory.commands.test_data"
+    "inventory.commands.test_data",
+    "inventory.commands.ledger_check",
+    "inventory.commands.load_data",
+    "inventory.commands.benchmark"
 ]
 
 # Uninstallation
@@ -172,6 +177,13 @@ commands = [
 # 	}
 # }
 
+doc_events = {
+    "User": {
+        "on_update": "inventory.api.auth.clear_user_claims",
+        "on_trash": "inventory.api.auth.clear_user_claims"
+    }
+}
+
 # Scheduled Tasks
 # ---------------
 
@@ -193,6 +205,14 @@ commands = [
 # 	],
 # }
 
+scheduler_events = {
+    "all": [
+        "inventory.api.log_buffer.flush_api_log",
+        "inventory.pos.stock_posting.post_deferred_stock",
+        "inventory.pos.doctype.pos_cart_hold.pos_cart_hold.release_expired_cart_holds"
+    ]
+}
+
 # Testing
 # -------
 
@@ -224,7 +244,16 @@ commands = [
 # Request Events
 # ----------------
 # before_request = ["inventory.utils.before_request"]
-# after_request = ["inventory.utils.after_request"]
+before_request = [
+    "inventory.api.log_buffer.start_request",
+    "inventory.api.profiler.start_request_profile"
+]
+after_request = [
+    "inventory.api.sync.apply_etag_response",
+    "inventory.pos.bootstrap.apply_bootstrap_response",
+    "inventory.api.profiler.finish_request_profile",
+    "inventory.api.log_buffer.finish_request"
+]
 
 # Job Events
 # ----------
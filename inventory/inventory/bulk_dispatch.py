@@ -0,0 +1,260 @@
+# Copyright (c) 2025, Dases and contributors
+# For license information, please see license.txt
+
+"""Bulk dispatch: turn many Sales Orders into submitted Delivery Notes in a background job.
+
+The pending lines of all orders are read at once and screened against one set-based
+availability read; orders that cannot be served in full are reported and skipped. The
+others get their Delivery Note (and its stock posting) in chunks of DISPATCH_CHUNK_SIZE
+orders, one transaction per chunk, with a savepoint per order so one failing order does
+not take the rest of its chunk down. Stock may have moved since the screening, so each
+chunk first locks the reservation rows of its items (in item order, like
+`reserve_stock`) and each order is checked again under those locks before its note is
+submitted.
+
+Progress is published to the user who started the job and kept in redis, together with
+the per-order results, for `get_bulk_dispatch_status`.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import flt, getdate, nowdate
+
+from inventory.inventory.doctype.stock_reservation.stock_reservation import (
+    ensure_reservation_rows,
+    get_available_qty,
+    get_reservation_warehouse,
+    release_stock,
+    reserve_stock,
+)
+
+# Orders dispatched per transaction
+DISPATCH_CHUNK_SIZE = 50
+
+# Orders accepted by one job
+MAX_DISPATCH_ORDERS = 2000
+
+# Redis key of a job's progress and results (kept for a day)
+DISPATCH_STATUS_CACHE_KEY = "bulk_dispatch_status"
+DISPATCH_STATUS_TTL = 24 * 3600
+
+
+@frappe.whitelist()
+def start_bulk_dispatch(sales_orders, warehouse=None, delivery_date=None):
+    """Queue the dispatch of `sales_orders` from `warehouse` (default warehouse if empty)
+
+    Returns the job id to pass to `get_bulk_dispatch_status`.
+    """
+    frappe.has_permission("Delivery Note", "submit", throw=True)
+
+    sales_orders = frappe.parse_json(sales_orders) if isinstance(sales_orders, str) else sales_orders
+    sales_orders = list(dict.fromkeys(sales_orders or []))
+    if not sales_orders:
+        frappe.throw(_("Please select at least one Sales Order"))
+    if len(sales_orders) > MAX_DISPATCH_ORDERS:
+        frappe.throw(_("At most {0} Sales Orders can be dispatched at once").format(MAX_DISPATCH_ORDERS))
+
+    warehouse = warehouse or get_reservation_warehouse()
+    if not frappe.db.exists("Warehouse", warehouse):
+        frappe.throw(_("Warehouse {0} does not exist").format(warehouse))
+
+    job_id = frappe.generate_hash(length=12)
+    set_dispatch_status(job_id, {"status": "Queued", "total": len(sales_orders), "processed": 0, "results": []})
+    frappe.enqueue(
+        "inventory.inventory.bulk_dispatch.run_bulk_dispatch",
+        queue="long",
+        timeout=3600,
+        job_id=f"{frappe.local.site}:bulk_dispatch:{job_id}",
+        enqueue_after_commit=True,
+        dispatch_id=job_id,
+        sales_orders=sales_orders,
+        warehouse=warehouse,
+        delivery_date=str(getdate(delivery_date or nowdate())),
+    )
+    return job_id
+
+
+@frappe.whitelist()
+def get_bulk_dispatch_status(job_id):
+    """Progress and per-order results of a bulk dispatch job"""
+    status = frappe.cache().get_value(f"{DISPATCH_STATUS_CACHE_KEY}:{job_id}")
+    if not status:
+        frappe.throw(_("Bulk dispatch job {0} not found").format(job_id), frappe.DoesNotExistError)
+    return status
+
+
+def set_dispatch_status(job_id, status):
+    frappe.cache().set_value(f"{DISPATCH_STATUS_CACHE_KEY}:{job_id}", status, expires_in_sec=DISPATCH_STATUS_TTL)
+
+
+def run_bulk_dispatch(dispatch_id, sales_orders, warehouse, delivery_date):
+    """Background job: check all orders at once, then create their Delivery Notes in chunks
+
+    An unexpected error marks the job Failed (keeping the results of the committed chunks)
+    instead of leaving it Running.
+    """
+    status = {"status": "Running", "total": len(sales_orders), "processed": 0, "results": []}
+    set_dispatch_status(dispatch_id, status)
+    try:
+        return dispatch_orders(dispatch_id, status, sales_orders, warehouse, delivery_date)
+    except Exception as e:
+        frappe.db.rollback()
+        status.update({"status": "Failed", "error": str(e)})
+        set_dispatch_status(dispatch_id, status)
+        raise
+
+
+def dispatch_orders(dispatch_id, status, sales_orders, warehouse, delivery_date):
+    total = len(sales_orders)
+    results = status["results"]
+    orders, failures = get_dispatchable_orders(sales_orders, warehouse)
+    results.extend(failures)
+
+    for start in range(0, len(orders), DISPATCH_CHUNK_SIZE):
+        chunk = orders[start:start + DISPATCH_CHUNK_SIZE]
+        lock_reservation_rows(warehouse, {item_code for order in chunk for item_code in order.needed})
+        for order in chunk:
+            results.append(dispatch_order(order, warehouse, delivery_date))
+        frappe.db.commit()
+
+        status["processed"] = len(failures) + start + len(chunk)
+        set_dispatch_status(dispatch_id, status)
+        frappe.publish_progress(
+            status["processed"] * 100 / total,
+            title=_("Dispatching Sales Orders"),
+            description=_("{0} of {1} orders").format(status["processed"], total),
+        )
+
+    status.update({
+        "status": "Completed",
+        "processed": total,
+        "created": sum(1 for result in results if result["delivery_note"]),
+        "failed": sum(1 for result in results if not result["delivery_note"]),
+    })
+    set_dispatch_status(dispatch_id, status)
+    return status
+
+
+def get_dispatchable_orders(sales_orders, warehouse):
+    """Pending lines of the orders that can be delivered in full, and failures for the others
+
+    Orders are served in the given sequence from one availability read. An order's own
+    reservation counts as available to it when dispatching from the reservation warehouse.
+    """
+    lines = frappe.db.sql("""
+        SELECT so.name AS sales_order, so.customer, so.customer_name, so.docstatus, so.status,
+            soi.name AS sales_order_item, soi.item, soi.item_name, soi.rate, soi.uom,
+            soi.quantity - soi.delivered_qty AS pending_qty, soi.reserved_qty
+        FROM `tabSales Order` so
+        LEFT JOIN `tabSales Order Item` soi
+            ON soi.parent = so.name AND soi.parenttype = 'Sales Order' AND soi.quantity > soi.delivered_qty
+        WHERE so.name IN %(orders)s
+        ORDER BY so.name, soi.idx
+    """, {"orders": tuple(sales_orders)}, as_dict=True)
+
+    by_order = {}
+    for line in lines:
+        by_order.setdefault(line.sales_order, []).append(line)
+
+    item_codes = {line.item for line in lines if line.item}
+    pool = {item_code: row.available_qty for item_code, row in get_available_qty(warehouse, item_codes).items()}
+    own_reservation = warehouse == get_reservation_warehouse()
+
+    orders, failures = [], []
+    for sales_order in sales_orders:
+        order_lines = by_order.get(sales_order)
+        if not order_lines:
+            failures.append(get_result(sales_order, message=_("Sales Order not found")))
+            continue
+        if order_lines[0].docstatus != 1:
+            failures.append(get_result(sales_order, message=_("Sales Order is not submitted")))
+            continue
+        order_lines = [line for line in order_lines if line.item]
+        if not order_lines:
+            failures.append(get_result(sales_order, message=_("Nothing left to deliver")))
+            continue
+
+        needed = get_needed_qty(order_lines, own_reservation)
+
+        shortages = [
+            _("{0}: available {1}, required {2}").format(item_code, flt(pool.get(item_code)), flt(qty))
+            for item_code, qty in needed.items() if qty > flt(pool.get(item_code))
+        ]
+        if shortages:
+            failures.append(get_result(sales_order, message=_("Insufficient stock") + ": " + "; ".join(shortages)))
+            continue
+
+        for item_code, qty in needed.items():
+            pool[item_code] = flt(pool.get(item_code)) - max(qty, 0)
+        orders.append(frappe._dict(name=sales_order, lines=order_lines, needed=needed))
+
+    return orders, failures
+
+
+def get_needed_qty(order_lines, own_reservation):
+    """Stock an order takes beyond its own reservation, per item (negative when over-reserved)"""
+    needed = {}
+    for line in order_lines:
+        own = flt(line.reserved_qty) if own_reservation else 0
+        needed[line.item] = needed.get(line.item, 0) + flt(line.pending_qty) - own
+    return needed
+
+
+def lock_reservation_rows(warehouse, item_codes):
+    """Lock the (item, warehouse) reservation rows until the chunk commits"""
+    ensure_reservation_rows(warehouse, item_codes)
+    frappe.db.sql("""
+        SELECT name FROM `tabStock Reservation`
+        WHERE warehouse = %(warehouse)s AND item IN %(items)s
+        ORDER BY item
+        FOR UPDATE
+    """, {"warehouse": warehouse, "items": tuple(item_codes)})
+
+
+def dispatch_order(order, warehouse, delivery_date):
+    """Create and submit one order's Delivery Note; a failure only rolls back this order"""
+    first_line = order.lines[0]
+    frappe.db.savepoint("bulk_dispatch_order")
+    try:
+        dn = frappe.new_doc("Delivery Note")
+        dn.customer = first_line.customer
+        dn.customer_name = first_line.customer_name
+        dn.delivery_date = delivery_date
+        dn.sales_order = order.name
+        dn.source_warehouse = warehouse
+        for line in order.lines:
+            dn.append("items", {
+                "item": line.item,
+                "item_name": line.item_name,
+                "uom": line.uom,
+                "quantity": flt(line.pending_qty),
+                "rate": flt(line.rate),
+                "amount": flt(line.pending_qty) * flt(line.rate),
+                "sales_order": order.name,
+                "sales_order_item": line.sales_order_item,
+            })
+
+        # Re-checked under the chunk's locks, with the check of `reserve_stock`
+        shortages = reserve_stock(warehouse, order.needed, field="held_qty")
+        if shortages:
+            frappe.throw(_("Insufficient stock") + ": " + "; ".join(
+                _("{0}: available {1}, required {2}").format(item_code, flt(available), flt(order.needed[item_code]))
+                for item_code, available in shortages.items()))
+        release_stock(warehouse, order.needed, field="held_qty")
+
+        dn.insert()
+        dn.submit()
+        return get_result(order.name, delivery_note=dn.name)
+
+    except Exception as e:
+        frappe.db.rollback(save_point="bulk_dispatch_order")
+        return get_result(order.name, message=str(e))
+
+
+def get_result(sales_order, delivery_note=None, message=None):
+    return {
+        "sales_order": sales_order,
+        "delivery_note": delivery_note,
+        "status": "Created" if delivery_note else "Failed",
+        "message": message,
+    }
@@ -134,13 +134,17 @@ frappe.ui.form.on('Delivery Note', {
                         frm.clear_table("items");
                         
                         // Add items from Sales Order
+                        // Only what is still to be delivered
                         so.items.forEach(function(item) {
+                            let pending_qty = flt(item.quantity) - flt(item.delivered_qty);
+                            if(pending_qty <= 0) return;
                             let dn_item = frm.add_child("items");
                             dn_item.item = item.item;
-                            dn_item.quantity = item.quantity;
+                            dn_item.quantity = pending_qty;
                             dn_item.rate = item.rate;
-                            dn_item.amount = item.amount;
+                            dn_item.amount = pending_qty * flt(item.rate);
                             dn_item.sales_order = frm.doc.sales_order;
+                            dn_item.sales_order_item = item.name;
                         });
                         
                         frm.refresh_field("items");
@@ -1,6 +1,16 @@
 import frappe
 from frappe.model.document import Document
-from frappe.utils import getdate, now_datetime
+from frappe.utils import flt, getdate, now_datetime
+from inventory.inventory.doctype.sales_order.sales_order import (
+    release_order_reservation,
+    restore_order_reservation,
+    update_delivered_qty,
+    update_delivery_status,
+)
+from inventory.inventory.doctype.stock_reservation.stock_reservation import (
+    get_available_qty,
+    get_reservation_warehouse,
+)
 
 class DeliveryNote(Document):
     def validate(self):
@@ -25,38 +35,49 @@ class DeliveryNote(Document):
         # Check stock availability
         self.check_stock_availability()
     
-    def check_stock_availability(self):
-        """
-        Check if stock is available for all items.
-        Throws error if stock is insufficient to prevent submission.
-        """
+    def get_source_warehouse(self):
+        """The note's Source Warehouse, else the Default Warehouse of Inventory Settings"""
+        if self.source_warehouse:
+            return self.source_warehouse
+        
         # Get source warehouse from Inventory Settings
         try:
             source_warehouse = frappe.db.get_single_value("Inventory Settings", "default_warehouse")
             if not source_warehouse:
-                frappe.throw("Default Warehouse not set in Inventory Settings. Cannot validate stock availability.")
+                frappe.throw("Default Warehouse not set in Inventory Settings")
+            return source_warehouse
         except frappe.DoesNotExistError:
             frappe.throw("Inventory Settings doctype not found. Please create it first.")
+    
+    def check_stock_availability(self):
+        """
+        Check if stock is available for all items.
+        Throws error if stock is insufficient to prevent submission.
+        """
+        source_warehouse = self.get_source_warehouse()
         
         insufficient_items = []
         
-        for item in self.items:
-            # Get available stock from the source warehouse
-            available_stock = frappe.db.sql("""
-                SELECT COALESCE(SUM(actual_qty), 0) 
-                FROM `tabStock Ledger Entry` 
-                WHERE item = %s 
-                AND warehouse = %s 
-                AND is_cancelled = 0
-            """, (item.item, source_warehouse))[0][0] or 0
+        # Unreserved stock, plus what the linked Sales Order has reserved for itself
+        # (orders reserve in the default warehouse)
+        quantities = self.get_item_quantities()
+        availability = get_available_qty(source_warehouse, quantities)
+        own_reservation = {}
+        if source_warehouse == get_reservation_warehouse():
+            own_reservation = self.get_sales_order_reservation()
+        
+        item_names = {item.item: item.item_name or item.item for item in self.items}
+        
+        for item_code, required in quantities.items():
+            available_stock = availability[item_code].available_qty + flt(own_reservation.get(item_code))
             
-            if available_stock < item.quantity:
+            if available_stock < required:
                 insufficient_items.append({
-                    "item": item.item,
-                    "item_name": item.item_name or item.item,
+                    "item": item_code,
+                    "item_name": item_names[item_code],
                     "available": available_stock,
-                    "required": item.quantity,
-                    "shortage": item.quantity - available_stock
+                    "required": required,
+                    "shortage": required - available_stock
                 })
         
         # If any items have insufficient stock, throw error
@@ -75,17 +96,42 @@ class DeliveryNote(Document):
                 title="Insufficient Stock"
             )
     
+    def get_item_quantities(self):
+        """Delivered quantity per item code"""
+        quantities = {}
+        for item in self.items:
+            quantities[item.item] = quantities.get(item.item, 0) + flt(item.quantity)
+        return quantities
+    
+    def get_sales_order_reservation(self):
+        """Quantity per item still reserved by the linked Sales Order"""
+        if not self.sales_order:
+            return {}
+        
+        return dict(frappe.db.sql("""
+            SELECT item, SUM(reserved_qty)
+            FROM `tabSales Order Item`
+            WHERE parent = %s AND parenttype = 'Sales Order'
+            GROUP BY item
+        """, (self.sales_order,)))
+    
     def on_submit(self):
         # Create Stock Entry
         self.create_stock_entry()
         
         # Update Sales Order status if linked
         if self.sales_order:
+            # The delivered units leave the order's reservation
+            release_order_reservation(self.sales_order, self.get_item_quantities())
             self.update_sales_order_status()
     
     def on_cancel(self):
+        # Put the delivered units back before the order reserves them again
+        self.cancel_stock_entry()
+        
         # Update Sales Order status if linked
         if self.sales_order:
+            restore_order_reservation(self.sales_order, self.get_item_quantities())
             self.update_sales_order_status(cancelled=True)
     
     def create_stock_entry(self):
@@ -100,18 +146,16 @@ class DeliveryNote(Document):
         stock_entry.reference_document = self.name
         stock_entry.date = self.delivery_date
         
-        # Get source warehouse from Inventory Settings
-        try:
-            source_warehouse = frappe.db.get_single_value("Inventory Settings", "default_warehouse")
-            if not source_warehouse:
-                frappe.throw("Default Warehouse not set in Inventory Settings")
-            stock_entry.source_warehouse = source_warehouse
-        except frappe.DoesNotExistError:
-            frappe.throw("Inventory Settings doctype not found. Please create it first.")
+        stock_entry.source_warehouse = self.get_source_warehouse()
+        
+        # Valuation rates of the lines without a rate, in one read
+        missing_rates = list({item.item for item in self.items if not item.rate})
+        valuation_rates = dict(frappe.get_all("Item", filters={"name": ("in", missing_rates)},
+            fields=["name", "valuation_rate"], as_list=True)) if missing_rates else {}
         
         for item in self.items:
             # Include rate and amount for proper valuation
-            item_rate = frappe.db.get_value("Item", item.item, "valuation_rate") if not item.rate else item.rate
+            item_rate = flt(valuation_rates.get(item.item)) if not item.rate else item.rate
             item_amount = item.quantity * item_rate
             
             stock_entry.append("items", {
@@ -127,69 +171,21 @@ class DeliveryNote(Document):
         
         frappe.msgprint("Stock Entry created")
     
+    def cancel_stock_entry(self):
+        """Cancel the Stock Entry created for this delivery on submit"""
+        stock_entries = frappe.get_all("Stock Entry", filters={
+            "reference_document": self.name,
+            "entry_type": "Sale",
+            "docstatus": 1
+        }, pluck="name")
+        
+        for stock_entry in stock_entries:
+            frappe.get_doc("Stock Entry", stock_entry).cancel()
+    
     def update_sales_order_status(self, cancelled=False):
         """
-        Update the status of the linked Sales Order
+        Add (or take back) the delivered quantities on the linked Sales Order's lines
+        and derive its status from them
         """
-        if not cancelled:
-            # Get the Sales Order
-            so = frappe.get_doc("Sales Order", self.sales_order)
-            
-            # Check if all items are delivered
-            all_delivered = True
-            
-            # Get all delivery notes against this SO
-            delivery_notes = frappe.get_all(
-                "Delivery Note",
-                filters={"sales_order": self.sales_order, "docstatus": 1},
-                fields=["name"]
-            )
-            
-            # Get all items in delivery notes
-            delivered_items = {}
-            for dn in delivery_notes:
-                dn_items = frappe.get_all(
-                    "Delivery Note Item",
-                    filters={"parent": dn.name, "sales_order": self.sales_order},
-                    fields=["item", "quantity"]
-                )
-                
-                for item in dn_items:
-                    if item.item in delivered_items:
-                        delivered_items[item.item] += item.quantity
-                    else:
-                        delivered_items[item.item] = item.quantity
-            
-            # Compare with SO items
-            so_items = frappe.get_all(
-                "Sales Order Item",
-                filters={"parent": self.sales_order},
-                fields=["item", "quantity"]
-            )
-            
-            for item in so_items:
-                delivered_qty = delivered_items.get(item.item, 0)
-                if delivered_qty < item.quantity:
-                    all_delivered = False
-                    break
-            
-            # Update status
-            if all_delivered:
-                so.update_status("Completed")
-            else:
-                so.update_status("Partially Delivered")
-        else:
-            # Cancelled case - recheck status
-            so = frappe.get_doc("Sales Order", self.sales_order)
-            
-            # Get all active delivery notes against this SO
-            delivery_notes = frappe.get_all(
-                "Delivery Note",
-                filters={"sales_order": self.sales_order, "docstatus": 1},
-                fields=["name"]
-            )
-            
-            if not delivery_notes:
-                so.update_status("Ordered")
-            else:
-                so.update_status("Partially Delivered") 
\ No newline at end of file
+        update_delivered_qty(self.sales_order, self.items, cancel=cancelled)
+        update_delivery_status(self.sales_order)
@@ -2,4 +2,9 @@ import frappe
 from frappe.model.document import Document
 
 class InventorySettings(Document):
-    pass 
\ No newline at end of file
+    def on_update(self):
+        from inventory.pos.cache import invalidate_pos_lookup
+        from inventory.pos.receipt import invalidate_receipt_header_cache
+        invalidate_pos_lookup(self.doctype, self.name)
+        # Company details are printed in every POS receipt header
+        invalidate_receipt_header_cache() 
\ No newline at end of file
@@ -1,9 +1,43 @@
 # Copyright (c) 2025, Dases and Contributors
 # See license.txt
 
-# import frappe
+from unittest.mock import patch
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
+from werkzeug.wrappers import Response
+
+from inventory.api.master_data_api import get_brands, get_uoms, list_customers, list_items
+from inventory.api.sync import apply_etag_response
 
 
 class TestItem(FrappeTestCase):
-	pass
+	def tearDown(self):
+		clear_etag_flags()
+
+	def test_unchanged_master_data_answers_304(self):
+		for method in (list_customers, list_items, get_uoms, get_brands):
+			with self.subTest(method=method.__name__):
+				self.assertTrue(call(method)["success"])
+				etag = frappe.local.flags.response_etag
+
+				# Same request again: the sync cursor moved but the content did not
+				request = frappe._dict(headers={"If-None-Match": f'"{etag}"'})
+				with patch.object(frappe.local, "request", request, create=True):
+					self.assertIsNone(call(method))
+				self.assertEqual(frappe.local.flags.response_etag, etag)
+
+				response = Response(b"{}")
+				apply_etag_response(response)
+				self.assertEqual(response.status_code, 304)
+
+
+def call(method):
+	"""Call an endpoint as a fresh request would"""
+	clear_etag_flags()
+	return method()
+
+
+def clear_etag_flags():
+	frappe.local.flags.pop("response_etag", None)
+	frappe.local.flags.pop("response_not_modified", None)
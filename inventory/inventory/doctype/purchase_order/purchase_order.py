@@ -1,6 +1,6 @@
 import frappe
 from frappe.model.document import Document
-from frappe.utils import getdate, now_datetime
+from frappe.utils import flt, getdate, now, now_datetime
 
 class PurchaseOrder(Document):
     def validate(self):
@@ -54,15 +54,95 @@ class PurchaseOrder(Document):
         pr.receipt_date = now_datetime().date()
         pr.purchase_order = self.name
         
-        # Add items from Purchase Order
+        # Add what is still to be received from the Purchase Order
         for item in self.items:
+            pending_qty = flt(item.quantity) - flt(item.received_qty)
+            if pending_qty <= 0:
+                continue
             pr.append("items", {
                 "item": item.item,
-                "quantity": item.quantity,
+                "quantity": pending_qty,
                 "rate": item.rate,
-                "amount": item.amount
+                "amount": pending_qty * flt(item.rate),
+                "purchase_order": self.name,
+                "purchase_order_item": item.name
             })
         
-        pr.total_amount = self.total_amount
+        pr.total_amount = sum(flt(item.amount) for item in pr.items)
         
-        return pr 
\ No newline at end of file
+        return pr
+
+
+def update_received_qty(purchase_order, receipt_items, cancel=False):
+    """
+    Add (or on cancel take back) a Purchase Receipt's quantities to the order lines' received_qty
+
+    Lines linked through `purchase_order_item` are incremented directly; the others are
+    spread over the order's lines of the same item in order, up to what each still has to
+    receive (the last line takes any excess). All lines change in one atomic increment.
+    """
+    sign = -1 if cancel else 1
+    increments = {}
+    unlinked = {}
+    for item in receipt_items:
+        if item.purchase_order_item:
+            increments[item.purchase_order_item] = increments.get(item.purchase_order_item, 0) + sign * flt(item.quantity)
+        else:
+            unlinked[item.item] = unlinked.get(item.item, 0) + flt(item.quantity)
+    
+    if unlinked:
+        lines = frappe.db.sql("""
+            SELECT name, item, quantity, received_qty
+            FROM `tabPurchase Order Item`
+            WHERE parent = %s AND parenttype = 'Purchase Order'
+            ORDER BY idx
+            FOR UPDATE
+        """, (purchase_order,), as_dict=True)
+        last_line = {line.item: line.name for line in lines}
+        for line in lines:
+            remaining = unlinked.get(line.item, 0)
+            if remaining <= 0:
+                continue
+            received = flt(line.received_qty) + increments.get(line.name, 0)
+            change = min(received, remaining) if cancel else min(max(flt(line.quantity) - received, 0), remaining)
+            if change > 0:
+                increments[line.name] = increments.get(line.name, 0) + sign * change
+                unlinked[line.item] = remaining - change
+        for item_code, remaining in unlinked.items():
+            if remaining > 0 and not cancel and item_code in last_line:
+                increments[last_line[item_code]] = increments.get(last_line[item_code], 0) + remaining
+    
+    increments = {name: qty for name, qty in increments.items() if qty}
+    if not increments:
+        return
+    
+    frappe.db.sql(f"""
+        UPDATE `tabPurchase Order Item`
+        SET received_qty = GREATEST(received_qty + CASE name {' '.join(['WHEN %s THEN %s'] * len(increments))} END, 0)
+        WHERE parent = %s AND name IN ({', '.join(['%s'] * len(increments))})
+    """, [value for pair in increments.items() for value in pair] + [purchase_order] + list(increments))
+
+
+def update_receipt_status(purchase_orders):
+    """
+    Derive the status of submitted orders from their lines' received_qty, in one statement:
+    Completed when every line is received, Partially Received when something is, else Ordered
+    """
+    if isinstance(purchase_orders, str):
+        purchase_orders = [purchase_orders]
+    if not purchase_orders:
+        return
+    
+    frappe.db.sql("""
+        UPDATE `tabPurchase Order`
+        SET status = (
+            SELECT CASE
+                WHEN SUM(CASE WHEN poi.received_qty >= poi.quantity THEN 1 ELSE 0 END) = COUNT(*) THEN 'Completed'
+                WHEN SUM(poi.received_qty) > 0 THEN 'Partially Received'
+                ELSE 'Ordered'
+            END
+            FROM `tabPurchase Order Item` poi
+            WHERE poi.parent = `tabPurchase Order`.name AND poi.parenttype = 'Purchase Order'
+        ), modified = %(now)s
+        WHERE name IN %(orders)s AND docstatus = 1
+    """, {"orders": tuple(purchase_orders), "now": now()}) 
\ No newline at end of file
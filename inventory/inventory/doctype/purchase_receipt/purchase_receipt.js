@@ -117,13 +117,17 @@ frappe.ui.form.on('Purchase Receipt', {
                         frm.clear_table("items");
                         
                         // Add items from Purchase Order
+                        // Only what is still to be received
                         po.items.forEach(function(item) {
+                            let pending_qty = flt(item.quantity) - flt(item.received_qty);
+                            if(pending_qty <= 0) return;
                             let pr_item = frm.add_child("items");
                             pr_item.item = item.item;
-                            pr_item.quantity = item.quantity;
+                            pr_item.quantity = pending_qty;
                             pr_item.rate = item.rate;
-                            pr_item.amount = item.amount;
+                            pr_item.amount = pending_qty * flt(item.rate);
                             pr_item.purchase_order = frm.doc.purchase_order;
+                            pr_item.purchase_order_item = item.name;
                         });
                         
                         frm.refresh_field("items");
@@ -1,6 +1,7 @@
 import frappe
 from frappe.model.document import Document
 from frappe.utils import getdate, now_datetime
+from inventory.inventory.doctype.purchase_order.purchase_order import update_receipt_status, update_received_qty
 
 class PurchaseReceipt(Document):
     def validate(self):
@@ -83,67 +84,8 @@ class PurchaseReceipt(Document):
     
     def update_purchase_order_status(self, cancelled=False):
         """
-        Update the status of the linked Purchase Order
+        Add (or take back) the received quantities on the linked Purchase Order's lines
+        and derive its status from them, so a cancelled receipt is recomputed like any other
         """
-        if not cancelled:
-            # Get the Purchase Order
-            po = frappe.get_doc("Purchase Order", self.purchase_order)
-            
-            # Check if all items are received
-            all_received = True
-            
-            # Get all purchase receipts against this PO
-            purchase_receipts = frappe.get_all(
-                "Purchase Receipt",
-                filters={"purchase_order": self.purchase_order, "docstatus": 1},
-                fields=["name"]
-            )
-            
-            # Get all items in purchase receipts
-            receipt_items = {}
-            for pr in purchase_receipts:
-                pr_items = frappe.get_all(
-                    "Purchase Receipt Item",
-                    filters={"parent": pr.name, "purchase_order": self.purchase_order},
-                    fields=["item", "quantity"]
-                )
-                
-                for item in pr_items:
-                    if item.item in receipt_items:
-                        receipt_items[item.item] += item.quantity
-                    else:
-                        receipt_items[item.item] = item.quantity
-            
-            # Compare with PO items
-            po_items = frappe.get_all(
-                "Purchase Order Item",
-                filters={"parent": self.purchase_order},
-                fields=["item", "quantity"]
-            )
-            
-            for item in po_items:
-                received_qty = receipt_items.get(item.item, 0)
-                if received_qty < item.quantity:
-                    all_received = False
-                    break
-            
-            # Update status
-            if all_received:
-                po.update_status("Completed")
-            else:
-                po.update_status("Partially Received")
-        else:
-            # Cancelled case - recheck status
-            po = frappe.get_doc("Purchase Order", self.purchase_order)
-            
-            # Get all active purchase receipts against this PO
-            purchase_receipts = frappe.get_all(
-                "Purchase Receipt",
-                filters={"purchase_order": self.purchase_order, "docstatus": 1},
-                fields=["name"]
-            )
-            
-            if not purchase_receipts:
-                po.update_status("Ordered")
-            else:
-                po.update_status("Partially Received") 
\ No newline at end of file
+        update_received_qty(self.purchase_order, self.items, cancel=cancelled)
+        update_receipt_status(self.purchase_order)
@@ -1,6 +1,13 @@
 import frappe
 from frappe.model.document import Document
-from frappe.utils import getdate, now_datetime
+from frappe.utils import flt, getdate, now, now_datetime
+from inventory.inventory.doctype.stock_reservation.stock_reservation import (
+    get_available_qty,
+    get_reservation_warehouse,
+    get_shortage_message,
+    release_stock,
+    reserve_stock,
+)
 
 class SalesOrder(Document):
     def validate(self):
@@ -38,26 +45,55 @@ class SalesOrder(Document):
     
     def check_stock_availability(self):
         """
-        Check if stock is available for all items
+        Warn about items whose unreserved stock (actual - reserved) does not cover the order.
+        Submitting reserves the stock and fails on a shortage.
         """
+        warehouse = frappe.db.get_single_value("Inventory Settings", "default_warehouse")
+        if not warehouse:
+            return
+
+        quantities = self.get_item_quantities()
+        item_names = {item.item: item.item_name for item in self.items}
+        availability = get_available_qty(warehouse, quantities)
+        for item_code, required_qty in quantities.items():
+            available_stock = availability[item_code].available_qty
+            if available_stock < required_qty:
+                frappe.msgprint(f"Insufficient stock for item {item_names[item_code]} ({item_code}). Available: {available_stock}, Required: {required_qty}")
+    
+    def get_item_quantities(self):
+        """Ordered quantity per item code"""
+        quantities = {}
         for item in self.items:
-            # Get available stock from all warehouses
-            available_stock = frappe.db.sql("""
-                SELECT SUM(actual_qty) 
-                FROM `tabStock Ledger Entry` 
-                WHERE item = %s AND is_cancelled = 0
-            """, item.item)[0][0] or 0
-            
-            if available_stock < item.quantity:
-                frappe.msgprint(f"Insufficient stock for item {item.item_name} ({item.item}). Available: {available_stock}, Required: {item.quantity}")
+            quantities[item.item] = quantities.get(item.item, 0) + flt(item.quantity)
+        return quantities
     
     def on_submit(self):
         # Update status
         self.status = "Ordered"
+        self.reserve_ordered_stock()
     
     def on_cancel(self):
         # Update status
         self.status = "Cancelled"
+        release_order_reservation(self.name)
+    
+    def reserve_ordered_stock(self):
+        """
+        Reserve the ordered quantities in the default warehouse, so the same units
+        cannot be promised to another order or till
+        """
+        warehouse = get_reservation_warehouse()
+        quantities = self.get_item_quantities()
+        shortages = reserve_stock(warehouse, quantities)
+        if shortages:
+            frappe.throw(get_shortage_message(warehouse, quantities, shortages), title="Insufficient Stock")
+        
+        frappe.db.sql("""
+            UPDATE `tabSales Order Item` SET reserved_qty = quantity
+            WHERE parent = %s AND parenttype = 'Sales Order'
+        """, (self.name,))
+        for item in self.items:
+            item.reserved_qty = item.quantity
     
     def update_status(self, status):
         """
@@ -79,20 +115,168 @@ class SalesOrder(Document):
         dn.delivery_date = now_datetime().date()
         dn.sales_order = self.name
         
-        # Add items from Sales Order
+        # Add what is still to be delivered from the Sales Order
         for item in self.items:
+            pending_qty = flt(item.quantity) - flt(item.delivered_qty)
+            if pending_qty <= 0:
+                continue
             dn.append("items", {
                 "item": item.item,
-                "quantity": item.quantity,
+                "quantity": pending_qty,
                 "rate": item.rate,
-                "amount": item.amount
+                "amount": pending_qty * flt(item.rate),
+                "sales_order": self.name,
+                "sales_order_item": item.name
             })
         
-        dn.total_amount = self.total_amount
+        dn.total_amount = sum(flt(item.amount) for item in dn.items)
         
         return dn
 
 
+def get_order_reservations(sales_order):
+    """Lock the order's lines and return their reserved and delivered quantities"""
+    return frappe.db.sql("""
+        SELECT name, item, quantity, reserved_qty, delivered_qty
+        FROM `tabSales Order Item`
+        WHERE parent = %s AND parenttype = 'Sales Order'
+        ORDER BY idx
+        FOR UPDATE
+    """, (sales_order,), as_dict=True)
+
+
+def update_line_reservations(lines, warehouse, release=True):
+    """Write the lines' new reserved_qty in one statement and move the difference on the bins"""
+    if not lines:
+        return
+    
+    cases, values, quantities = [], [], {}
+    for line, change in lines:
+        cases.append("WHEN %s THEN %s")
+        values.extend([line.name, flt(line.reserved_qty) + (-change if release else change)])
+        quantities[line.item] = quantities.get(line.item, 0) + change
+    values.extend(line.name for line, change in lines)
+    
+    frappe.db.sql(f"""
+        UPDATE `tabSales Order Item`
+        SET reserved_qty = CASE name {' '.join(cases)} END
+        WHERE name IN ({', '.join(['%s'] * len(lines))})
+    """, values)
+    
+    if release:
+        release_stock(warehouse, quantities)
+    else:
+        # Only restored after the cancelled Delivery Note's Stock Entry put the units back
+        reserve_stock(warehouse, quantities, check_available=False)
+
+
+def release_order_reservation(sales_order, quantities=None):
+    """
+    Release the order's reservation: everything still reserved, or with `quantities`
+    ({item: qty}, e.g. what a Delivery Note ships) at most that much per item
+    """
+    lines = []
+    remaining = dict(quantities) if quantities is not None else None
+    for line in get_order_reservations(sales_order):
+        change = flt(line.reserved_qty)
+        if remaining is not None:
+            change = min(change, remaining.get(line.item, 0))
+            remaining[line.item] = remaining.get(line.item, 0) - change
+        if change > 0:
+            lines.append((line, change))
+    
+    update_line_reservations(lines, get_reservation_warehouse())
+
+
+def restore_order_reservation(sales_order, quantities):
+    """Reserve again what a cancelled Delivery Note had taken from a still open order"""
+    if frappe.db.get_value("Sales Order", sales_order, "docstatus") != 1:
+        return
+    
+    lines = []
+    remaining = dict(quantities)
+    for line in get_order_reservations(sales_order):
+        change = min(flt(line.quantity) - flt(line.reserved_qty), remaining.get(line.item, 0))
+        if change > 0:
+            remaining[line.item] -= change
+            lines.append((line, change))
+    
+    update_line_reservations(lines, get_reservation_warehouse(), release=False)
+
+
+def update_delivered_qty(sales_order, delivery_items, cancel=False):
+    """
+    Add (or on cancel take back) a Delivery Note's quantities to the order lines' delivered_qty
+
+    Lines linked through `sales_order_item` update that line; the others are spread over
+    the order's lines of the same item in order, up to what each still has to deliver.
+    The lines are locked and written back by one statement.
+    """
+    lines = get_order_reservations(sales_order)
+    previous = {line.name: flt(line.delivered_qty) for line in lines}
+    delivered = dict(previous)
+    
+    unlinked = {}
+    for item in delivery_items:
+        if item.sales_order_item and item.sales_order_item in delivered:
+            delivered[item.sales_order_item] += -flt(item.quantity) if cancel else flt(item.quantity)
+        else:
+            unlinked[item.item] = unlinked.get(item.item, 0) + flt(item.quantity)
+    
+    for line in lines:
+        remaining = unlinked.get(line.item, 0)
+        if remaining <= 0:
+            continue
+        if cancel:
+            change = min(delivered[line.name], remaining)
+            delivered[line.name] -= change
+        else:
+            change = min(max(flt(line.quantity) - delivered[line.name], 0), remaining)
+            delivered[line.name] += change
+        unlinked[line.item] = remaining - change
+    
+    # Whatever is left over (over-delivery) goes to the item's last line
+    for line in reversed(lines):
+        remaining = unlinked.pop(line.item, 0)
+        if remaining > 0 and not cancel:
+            delivered[line.name] += remaining
+    
+    changed = [(name, max(qty, 0)) for name, qty in delivered.items() if qty != previous[name]]
+    if not changed:
+        return
+    
+    frappe.db.sql(f"""
+        UPDATE `tabSales Order Item`
+        SET delivered_qty = CASE name {' '.join(['WHEN %s THEN %s'] * len(changed))} END
+        WHERE name IN ({', '.join(['%s'] * len(changed))})
+    """, [value for pair in changed for value in pair] + [name for name, qty in changed])
+
+
+def update_delivery_status(sales_orders):
+    """
+    Derive the status of submitted orders from their lines' delivered_qty, in one statement:
+    Completed when every line is delivered, Partially Delivered when something is, else Ordered
+    """
+    if isinstance(sales_orders, str):
+        sales_orders = [sales_orders]
+    if not sales_orders:
+        return
+    
+    frappe.db.sql("""
+        UPDATE `tabSales Order`
+        SET status = (
+            SELECT CASE
+                WHEN SUM(CASE WHEN soi.delivered_qty >= soi.quantity THEN 1 ELSE 0 END) = COUNT(*) THEN 'Completed'
+                WHEN SUM(soi.delivered_qty) > 0 THEN 'Partially Delivered'
+                ELSE 'Ordered'
+            END
+            FROM `tabSales Order Item` soi
+            WHERE soi.parent = `tabSales Order`.name AND soi.parenttype = 'Sales Order'
+        ), modified = %(now)s
+        WHERE name IN %(orders)s AND docstatus = 1
+    """, {"orders": tuple(sales_orders), "now": now()})
+
+
 @frappe.whitelist()
 def search_item_by_barcode(search_value):
     """
@@ -0,0 +1,89 @@
+frappe.listview_settings['Sales Order'] = {
+    add_fields: ["status"],
+    get_indicator: function(doc) {
+        if (doc.status === "Draft") {
+            return [__("Draft"), "gray", "status,=,Draft"];
+        } else if (doc.status === "Ordered") {
+            return [__("Ordered"), "orange", "status,=,Ordered"];
+        } else if (doc.status === "Partially Delivered") {
+            return [__("Partially Delivered"), "yellow", "status,=,Partially Delivered"];
+        } else if (doc.status === "Completed") {
+            return [__("Completed"), "green", "status,=,Completed"];
+        } else if (doc.status === "Cancelled") {
+            return [__("Cancelled"), "red", "status,=,Cancelled"];
+        }
+    },
+    onload: function(listview) {
+        listview.page.add_action_item(__('Create Delivery Notes'), function() {
+            const selected = listview.get_checked_items();
+            if (selected.length === 0) {
+                frappe.msgprint(__('Please select at least one Sales Order'));
+                return;
+            }
+
+            frappe.prompt([
+                {
+                    fieldname: 'warehouse',
+                    fieldtype: 'Link',
+                    label: __('Source Warehouse'),
+                    options: 'Warehouse',
+                    description: __('Leave empty to use the Default Warehouse')
+                },
+                {
+                    fieldname: 'delivery_date',
+                    fieldtype: 'Date',
+                    label: __('Delivery Date'),
+                    default: frappe.datetime.get_today(),
+                    reqd: 1
+                }
+            ], function(values) {
+                frappe.call({
+                    method: 'inventory.inventory.bulk_dispatch.start_bulk_dispatch',
+                    args: {
+                        sales_orders: selected.map(s => s.name),
+                        warehouse: values.warehouse,
+                        delivery_date: values.delivery_date
+                    },
+                    callback: function(r) {
+                        if (!r.exc) {
+                            frappe.show_alert({
+                                message: __('Dispatch of {0} orders queued', [selected.length]),
+                                indicator: 'green'
+                            });
+                            poll_bulk_dispatch(listview, r.message);
+                        }
+                    }
+                });
+            }, __('Create Delivery Notes'), __('Dispatch'));
+        });
+    }
+};
+
+function poll_bulk_dispatch(listview, job_id) {
+    frappe.call({
+        method: 'inventory.inventory.bulk_dispatch.get_bulk_dispatch_status',
+        args: { job_id: job_id },
+        callback: function(r) {
+            const status = r.message;
+            if (!status) return;
+            if (status.status !== "Completed") {
+                setTimeout(() => poll_bulk_dispatch(listview, job_id), 3000);
+                return;
+            }
+
+            frappe.hide_progress();
+            listview.refresh();
+            const rows = status.results.map(result => `<tr>
+                <td>${result.sales_order}</td>
+                <td>${result.delivery_note || ''}</td>
+                <td>${result.delivery_note ? __('Created') : frappe.utils.escape_html(result.message || '')}</td>
+            </tr>`).join('');
+            frappe.msgprint({
+                title: __('{0} Delivery Notes created, {1} orders failed', [status.created, status.failed]),
+                message: `<table class="table table-bordered"><tr><th>${__('Sales Order')}</th>
+                    <th>${__('Delivery Note')}</th><th>${__('Result')}</th></tr>${rows}</table>`,
+                wide: true
+            });
+        }
+    });
+}
@@ -0,0 +1,78 @@
+# Copyright (c) 2025, Dases and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+# Cache key for the latest closed stock period
+CLOSING_DATE_CACHE_KEY = "stock_last_closing_date"
+
+
+class StockClosingBalance(Document):
+	pass
+
+
+def get_last_closing_date(before_date=None):
+	"""Get the end date of the latest submitted Stock Period Closing
+
+	If `before_date` is given, only closings strictly before that date are considered
+	"""
+	if before_date:
+		return frappe.db.sql("""
+			SELECT MAX(period_end_date)
+			FROM `tabStock Period Closing`
+			WHERE docstatus = 1 AND period_end_date < %s
+		""", (before_date,))[0][0]
+
+	cached = frappe.cache().get_value(CLOSING_DATE_CACHE_KEY)
+	if cached is not None:
+		return cached or None
+
+	closing_date = frappe.db.sql("""
+		SELECT MAX(period_end_date)
+		FROM `tabStock Period Closing`
+		WHERE docstatus = 1
+	""")[0][0]
+
+	# Cache an empty string for "no closing yet" so the lookup is not repeated
+	frappe.cache().set_value(CLOSING_DATE_CACHE_KEY, closing_date or "")
+	return closing_date
+
+
+def invalidate_closing_date_cache():
+	frappe.cache().delete_value(CLOSING_DATE_CACHE_KEY)
+
+
+def get_stock_ledger_source(before_date=None):
+	"""Return a FROM-clause source to use instead of `tabStock Ledger Entry` in balance queries
+
+	The source has the ledger columns used by balance queries (item, warehouse, batch_no,
+	posting_date, voucher_type, actual_qty, valuation_rate, is_cancelled). Once a period is
+	closed it reads the opening balance snapshot plus the current-period entries only, so
+	the cost is bounded by period volume rather than total history. Snapshot rows carry the
+	closing date as posting_date and 'Stock Closing Balance' as voucher_type.
+
+	Callers must give the source an alias, e.g. `FROM {source} sle`.
+	"""
+	closing_date = get_last_closing_date(before_date)
+	if not closing_date:
+		return "`tabStock Ledger Entry`"
+
+	closing_date = frappe.db.escape(str(closing_date))
+	return f"""(
+		SELECT item, warehouse, batch_no, closing_date AS posting_date,
+			'Stock Closing Balance' AS voucher_type, qty AS actual_qty,
+			valuation_rate, 0 AS is_cancelled
+		FROM `tabStock Closing Balance`
+		WHERE closing_date = {closing_date}
+		UNION ALL
+		SELECT item, warehouse, batch_no, posting_date,
+			voucher_type, actual_qty,
+			valuation_rate, is_cancelled
+		FROM `tabStock Ledger Entry`
+		WHERE posting_date > {closing_date}
+	)"""
+
+
+def on_doctype_update():
+	frappe.db.add_index("Stock Closing Balance", ["closing_date", "item", "warehouse"], "scb_closing_item_warehouse_index")
@@ -1,6 +1,18 @@
 import frappe
 from frappe.model.document import Document
 from frappe.utils import now_datetime, flt
+from inventory.inventory.doctype.stock_closing_balance.stock_closing_balance import get_stock_ledger_source
+from inventory.inventory.doctype.stock_ledger_entry.stock_ledger_entry import make_sl_entries
+
+# Ledger movements per entry type: (warehouse field, direction), a transfer posts both sides
+STOCK_MOVEMENTS = {
+    "Receipt": [("target_warehouse", "in")],
+    "Purchase": [("target_warehouse", "in")],
+    "Issue": [("source_warehouse", "out")],
+    "Sale": [("source_warehouse", "out")],
+    "Transfer": [("source_warehouse", "out"), ("target_warehouse", "in")],
+    "Manufacture": [("target_warehouse", "in")],
+}
 
 class StockEntry(Document):
     def validate(self):
@@ -69,12 +81,12 @@ class StockEntry(Document):
                     
                 # For receipt entries, update valuation rate with weighted average
                 # Get current stock information
-                stock_data = frappe.db.sql("""
+                stock_data = frappe.db.sql(f"""
                     SELECT 
                         SUM(actual_qty) as qty,
                         SUM(actual_qty * valuation_rate) as value
                     FROM 
-                        `tabStock Ledger Entry`
+                        {get_stock_ledger_source()} sle
                     WHERE 
                         item = %s 
                         AND warehouse = %s
@@ -96,84 +108,25 @@ class StockEntry(Document):
                         frappe.db.set_value("Item", item_row.item, "last_purchase_rate", item_row.rate)
     
     def update_stock_ledger(self, is_cancelled=False):
+        """
+        Post (or on cancel reverse) the ledger entries of all lines with one multi-row insert
+        """
+        posting_time = now_datetime().time()
+        entries = []
         for item in self.items:
-            # Handle stock updates based on entry type
-            if self.entry_type == "Receipt":
-                self.create_stock_ledger_entry(
-                    item.item,
-                    self.target_warehouse,
-                    item.quantity,
-                    "in",
-                    item.batch,
-                    item.rate,
-                    is_cancelled
-                )
-            elif self.entry_type == "Purchase":
-                # Purchase from supplier - adds stock to target warehouse
-                self.create_stock_ledger_entry(
-                    item.item,
-                    self.target_warehouse,
-                    item.quantity,
-                    "in",
-                    item.batch,
-                    item.rate,
-                    is_cancelled
-                )
-            elif self.entry_type == "Issue":
-                self.create_stock_ledger_entry(
-                    item.item,
-                    self.source_warehouse,
-                    item.quantity,
-                    "out",
-                    item.batch,
-                    item.rate,
-                    is_cancelled
-                )
-            elif self.entry_type == "Sale":
-                # Sale to customer - removes stock from source warehouse
-                self.create_stock_ledger_entry(
-                    item.item,
-                    self.source_warehouse,
-                    item.quantity,
-                    "out",
-                    item.batch,
-                    item.rate,
-                    is_cancelled
-                )
-            elif self.entry_type == "Transfer":
-                # Deduct from source warehouse
-                self.create_stock_ledger_entry(
-                    item.item,
-                    self.source_warehouse,
-                    item.quantity,
-                    "out",
-                    item.batch,
-                    item.rate,
+            for warehouse_field, qty_type in STOCK_MOVEMENTS.get(self.entry_type, []):
+                entries.append(self.get_stock_ledger_entry(
+                    item,
+                    self.get(warehouse_field),
+                    qty_type,
                     is_cancelled
-                )
-                # Add to target warehouse
-                self.create_stock_ledger_entry(
-                    item.item,
-                    self.target_warehouse,
-                    item.quantity,
-                    "in",
-                    item.batch,
-                    item.rate,
-                    is_cancelled
-                )
-            elif self.entry_type == "Manufacture":
-                self.create_stock_ledger_entry(
-                    item.item,
-                    self.target_warehouse,
-                    item.quantity,
-                    "in",
-                    item.batch,
-                    item.rate,
-                    is_cancelled
-                )
+                ))
+        
+        make_sl_entries(entries, "Stock Entry", self.name, self.date, posting_time)
     
-    def create_stock_ledger_entry(self, item_code, warehouse, qty, qty_type, batch=None, rate=0, is_cancelled=False):
+    def get_stock_ledger_entry(self, item, warehouse, qty_type, is_cancelled=False):
         # Adjust quantity based on entry type and cancellation status
+        qty = flt(item.quantity)
         actual_qty = qty
         if qty_type == "out" or is_cancelled:
             actual_qty = -1 * qty
@@ -182,27 +135,14 @@ class StockEntry(Document):
         elif is_cancelled and qty_type == "in":
             actual_qty = -1 * qty
         
-        # Calculate stock value difference
-        stock_value_difference = flt(actual_qty) * flt(rate)
-        
-        # If it's an outward entry, get the current valuation rate
-        if not rate and qty_type == "out":
-            rate = frappe.db.get_value("Item", item_code, "valuation_rate") or 0
-        
-        # Create Stock Ledger Entry
-        sle = frappe.new_doc("Stock Ledger Entry")
-        sle.item = item_code
-        sle.warehouse = warehouse
-        sle.posting_date = self.date
-        sle.posting_time = now_datetime().time()
-        sle.voucher_type = "Stock Entry"
-        sle.voucher_no = self.name
-        sle.voucher_detail_no = ""
-        sle.actual_qty = actual_qty
-        sle.batch_no = batch
-        sle.valuation_rate = rate
-        sle.stock_value_difference = stock_value_difference
-        sle.company = "hjjhhj"#frappe.defaults.get_global_default('company')
-        sle.fiscal_year = "2025"#frappe.defaults.get_global_default('fiscal_year')
-        sle.is_cancelled = is_cancelled
-        sle.insert()
\ No newline at end of file
+        # Outward entries without a rate are valued at the item's valuation rate
+        return {
+            "item": item.item,
+            "warehouse": warehouse,
+            "actual_qty": actual_qty,
+            "valuation_rate": item.rate,
+            "batch_no": item.batch,
+            "voucher_detail_no": item.name,
+            "is_cancelled": is_cancelled,
+            "outward": qty_type == "out",
+        }
@@ -1,9 +1,60 @@
 # Copyright (c) 2025, Dases and Contributors
 # See license.txt
 
-# import frappe
+from unittest.mock import patch
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import flt, nowdate
+
+from inventory.inventory.doctype.stock_ledger_entry.stock_ledger_entry import make_sl_entries
+
+ITEM = "_Test Posting Item"
+SOURCE = "_Test Posting Source"
+TARGET = "_Test Posting Target"
+LINES = 500
 
 
 class TestStockEntry(FrappeTestCase):
-	pass
+	def setUp(self):
+		frappe.db.bulk_insert(
+			"Item",
+			fields=["name", "item_code", "item_name", "item_category", "unit_of_measurement", "valuation_rate"],
+			values=[(ITEM, ITEM, ITEM, "_Test Category", "Nos", 7)],
+		)
+		frappe.db.bulk_insert(
+			"Warehouse",
+			fields=["name", "warehouse_name", "warehouse_code", "warehouse_type"],
+			values=[(name, name, name, "Transit") for name in (SOURCE, TARGET)],
+		)
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_transfer_posts_in_one_insert(self):
+		entries = []
+		for i in range(LINES):
+			entries.append({"item": ITEM, "warehouse": SOURCE, "actual_qty": -1, "voucher_detail_no": str(i)})
+			entries.append({"item": ITEM, "warehouse": TARGET, "actual_qty": 1, "voucher_detail_no": str(i)})
+
+		with patch.object(frappe.db, "bulk_insert", wraps=frappe.db.bulk_insert) as bulk_insert:
+			make_sl_entries(entries, "Stock Entry", "_Test Posting Voucher", nowdate())
+		self.assertEqual(bulk_insert.call_count, 1)
+
+		rows = frappe.db.sql("""
+			SELECT warehouse, COUNT(*) AS entries, SUM(actual_qty) AS qty, MAX(valuation_rate) AS rate
+			FROM `tabStock Ledger Entry`
+			WHERE voucher_no = '_Test Posting Voucher'
+			GROUP BY warehouse
+		""", as_dict=True)
+		by_warehouse = {row.warehouse: row for row in rows}
+		self.assertEqual(by_warehouse[SOURCE].entries, LINES)
+		self.assertEqual(flt(by_warehouse[SOURCE].qty), -LINES)
+		self.assertEqual(flt(by_warehouse[TARGET].qty), LINES)
+		# Outward entries without a rate take the item's valuation rate
+		self.assertEqual(flt(by_warehouse[SOURCE].rate), 7)
+
+	def test_unknown_warehouse_is_rejected(self):
+		self.assertRaises(frappe.ValidationError, make_sl_entries,
+			[{"item": ITEM, "warehouse": "_Test Missing Warehouse", "actual_qty": 1}],
+			"Stock Entry", "_Test Posting Voucher", nowdate())
@@ -1,6 +1,6 @@
 import frappe
 from frappe.model.document import Document
-from frappe.utils import flt
+from frappe.utils import flt, getdate, now, nowtime
 from frappe import _
 
 class StockLedgerEntry(Document):
@@ -8,6 +8,7 @@ class StockLedgerEntry(Document):
 		"""Validate stock ledger entry"""
 		self.validate_mandatory_fields()
 		self.validate_item_and_warehouse()
+		self.validate_closed_period()
 	
 	def validate_mandatory_fields(self):
 		"""Validate that all required fields are present"""
@@ -29,48 +30,119 @@ class StockLedgerEntry(Document):
 		if not frappe.db.exists("Warehouse", self.warehouse):
 			frappe.throw(_("Warehouse {0} does not exist").format(self.warehouse))
 	
-	def on_submit(self):
-		"""Update stock balance after submission"""
-		self.update_stock_balance()
-	
-	def on_cancel(self):
-		"""Reverse stock balance on cancellation"""
-		self.update_stock_balance(reverse=True)
-	
-	def update_stock_balance(self, reverse=False):
-		"""Update the stock balance for the item in the warehouse"""
-		try:
-			# Calculate the quantity change
-			qty_change = flt(self.actual_qty)
-			if reverse:
-				qty_change = -1 * qty_change
-			
-			# Get current stock balance
-			current_balance = self.get_current_stock_balance()
-			new_balance = current_balance + qty_change
-			
-			# Update or create stock balance record
-			self.update_stock_balance_record(new_balance)
-			
-			frappe.db.commit()
-			
-		except Exception as e:
-			frappe.log_error(f"Error updating stock balance: {str(e)}", "Stock Balance Update Error")
-			frappe.throw(_("Failed to update stock balance: {0}").format(str(e)))
-	
-	def get_current_stock_balance(self):
-		"""Get current stock balance for item in warehouse from Stock Ledger Entry"""
-		# Calculate current balance from all stock ledger entries
-		balance = frappe.db.sql("""
-			SELECT COALESCE(SUM(actual_qty), 0) as balance
-			FROM `tabStock Ledger Entry`
-			WHERE item = %s AND warehouse = %s
-			AND name != %s
-		""", (self.item, self.warehouse, self.name or ''), as_dict=True)[0].balance
-		return flt(balance)
-	
-	def update_stock_balance_record(self, new_balance):
-		"""Stock balance is now calculated dynamically from Stock Ledger Entry records"""
-		# No need to maintain separate stock balance records
-		# Stock balance is calculated on-demand from Stock Ledger Entry
-		pass
\ No newline at end of file
+	def validate_closed_period(self):
+		"""Entries cannot be posted into a closed stock period"""
+		from inventory.inventory.doctype.stock_closing_balance.stock_closing_balance import get_last_closing_date
+
+		closing_date = get_last_closing_date()
+		if closing_date and getdate(self.posting_date) <= getdate(closing_date):
+			frappe.throw(_("Cannot post Stock Ledger Entry on {0}: stock period is closed up to {1}").format(
+				self.posting_date, closing_date))
+
+# Composite indexes matched to the access paths of the hot ledger queries
+# (POS stock lookups, mobile master data API, stock reports, low stock alert)
+STOCK_LEDGER_INDEXES = {
+	"sle_item_warehouse_index": ["item", "warehouse", "is_cancelled"],
+	"sle_warehouse_item_index": ["warehouse", "item"],
+	"sle_voucher_type_item_date_index": ["voucher_type", "item", "posting_date"],
+	"sle_item_posting_date_index": ["item", "posting_date"],
+	"sle_voucher_index": ["voucher_type", "voucher_no"],
+	"sle_batch_no_index": ["batch_no"],
+}
+
+
+def on_doctype_update():
+	"""Create the composite indexes on Stock Ledger Entry (idempotent)"""
+	for index_name, fields in STOCK_LEDGER_INDEXES.items():
+		frappe.db.add_index("Stock Ledger Entry", fields, index_name)
+
+
+# Columns written by `make_sl_entries`
+SL_ENTRY_FIELDS = [
+	"name", "creation", "modified", "owner", "modified_by", "docstatus",
+	"item", "warehouse", "posting_date", "posting_time", "voucher_type", "voucher_no",
+	"voucher_detail_no", "batch_no", "actual_qty", "valuation_rate", "stock_value_difference",
+	"company", "fiscal_year", "is_cancelled",
+]
+
+
+def get_posting_company():
+	"""Company of the stock postings: Inventory Settings, else the global default (cached)"""
+	from inventory.pos.cache import get_inventory_settings
+
+	return get_inventory_settings().company_name or frappe.defaults.get_global_default("company")
+
+
+def get_fiscal_year(posting_date):
+	"""Fiscal year of a posting date (calendar year)"""
+	return str(getdate(posting_date).year)
+
+
+def get_valuation_rates(item_codes, warehouses):
+	"""Check that all items and warehouses exist, in one query; returns {item: valuation_rate}"""
+	item_codes, warehouses = set(item_codes), set(warehouses)
+	rows = frappe.db.sql("""
+		SELECT 'Item' AS doctype, name, valuation_rate FROM `tabItem` WHERE name IN %(items)s
+		UNION ALL
+		SELECT 'Warehouse' AS doctype, name, 0 AS valuation_rate FROM `tabWarehouse` WHERE name IN %(warehouses)s
+	""", {"items": tuple(item_codes) or ("",), "warehouses": tuple(warehouses) or ("",)}, as_dict=True)
+
+	valuation_rates = {row.name: flt(row.valuation_rate) for row in rows if row.doctype == "Item"}
+	found_warehouses = {row.name for row in rows if row.doctype == "Warehouse"}
+	for item_code in sorted(item_codes - set(valuation_rates)):
+		frappe.throw(_("Item {0} does not exist").format(item_code))
+	for warehouse in sorted(warehouses - found_warehouses):
+		frappe.throw(_("Warehouse {0} does not exist").format(warehouse))
+	return valuation_rates
+
+
+def make_sl_entries(entries, voucher_type, voucher_no, posting_date, posting_time=None, company=None):
+	"""Post the Stock Ledger Entries of one voucher with a single multi-row insert
+
+	`entries` are dicts with item, warehouse, actual_qty and optionally valuation_rate,
+	batch_no, voucher_detail_no, is_cancelled and outward (defaults to a negative qty).
+	Outward entries without a rate are valued at the item's valuation rate. Items and warehouses are checked in one query
+	and the closed period, company and fiscal year are resolved once for the voucher,
+	instead of per entry as `StockLedgerEntry.validate` does.
+	"""
+	from inventory.inventory.doctype.stock_closing_balance.stock_closing_balance import get_last_closing_date
+
+	if not entries:
+		return
+
+	for entry in entries:
+		if not entry.get("item"):
+			frappe.throw(_("Item is required"))
+		if not entry.get("warehouse"):
+			frappe.throw(_("Warehouse is required"))
+	if not posting_date:
+		frappe.throw(_("Posting Date is required"))
+
+	closing_date = get_last_closing_date()
+	if closing_date and getdate(posting_date) <= getdate(closing_date):
+		frappe.throw(_("Cannot post Stock Ledger Entry on {0}: stock period is closed up to {1}").format(
+			posting_date, closing_date))
+
+	valuation_rates = get_valuation_rates(
+		[entry["item"] for entry in entries], [entry["warehouse"] for entry in entries])
+
+	company = company or get_posting_company()
+	fiscal_year = get_fiscal_year(posting_date)
+	posting_time = posting_time or nowtime()
+	timestamp = now()
+	user = frappe.session.user
+
+	values = []
+	for entry in entries:
+		actual_qty = flt(entry["actual_qty"])
+		rate = flt(entry.get("valuation_rate"))
+		if not rate and entry.get("outward", actual_qty < 0):
+			rate = valuation_rates.get(entry["item"], 0)
+		values.append((
+			frappe.generate_hash(length=10), timestamp, timestamp, user, user, 0,
+			entry["item"], entry["warehouse"], posting_date, posting_time, voucher_type, voucher_no,
+			entry.get("voucher_detail_no") or "", entry.get("batch_no"), actual_qty, rate, actual_qty * rate,
+			company, fiscal_year, 1 if entry.get("is_cancelled") else 0,
+		))
+
+	frappe.db.bulk_insert("Stock Ledger Entry", fields=SL_ENTRY_FIELDS, values=values)
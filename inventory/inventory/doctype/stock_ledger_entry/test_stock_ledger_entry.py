@@ -0,0 +1,154 @@
+# Copyright (c) 2025, Dases and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, nowdate
+
+from inventory.inventory.doctype.stock_ledger_entry.stock_ledger_entry import on_doctype_update
+
+SEED_ITEMS = 200
+SEED_WAREHOUSES = 5
+SEED_ROWS = 5000
+
+# Shapes of the hot ledger queries (pos/api, master_data_api, stock reports, low_stock_alert)
+HOT_QUERIES = {
+	"pos_item_stock": (
+		"""SELECT COALESCE(SUM(actual_qty), 0) FROM `tabStock Ledger Entry`
+		WHERE item = %(item)s AND warehouse = %(warehouse)s"""
+	),
+	"pos_items_warehouse_summary": (
+		"""SELECT item, SUM(actual_qty) FROM `tabStock Ledger Entry`
+		WHERE warehouse = %(warehouse)s GROUP BY item"""
+	),
+	"master_data_available_qty": (
+		"""SELECT SUM(actual_qty) FROM `tabStock Ledger Entry`
+		WHERE item = %(item)s AND is_cancelled = 0"""
+	),
+	"master_data_batches": (
+		"""SELECT b.name, SUM(sle.actual_qty) FROM `tabBatch` b
+		JOIN `tabStock Ledger Entry` sle ON sle.batch_no = b.name
+		WHERE sle.item = %(item)s AND sle.is_cancelled = 0 GROUP BY b.name"""
+	),
+	"low_stock_current_stock": (
+		"""SELECT warehouse, SUM(actual_qty) FROM `tabStock Ledger Entry`
+		WHERE item = %(item)s AND is_cancelled = 0 AND warehouse = %(warehouse)s GROUP BY warehouse"""
+	),
+	"low_stock_last_purchase": (
+		"""SELECT MAX(posting_date) FROM `tabStock Ledger Entry`
+		WHERE item = %(item)s AND voucher_type = 'Purchase Receipt' AND is_cancelled = 0"""
+	),
+	"low_stock_avg_sales": (
+		"""SELECT ABS(SUM(actual_qty)) / 30 FROM `tabStock Ledger Entry`
+		WHERE item = %(item)s AND voucher_type = 'Delivery Note' AND is_cancelled = 0
+		AND posting_date >= %(from_date)s"""
+	),
+	"item_movement_opening": (
+		"""SELECT SUM(actual_qty) FROM `tabStock Ledger Entry`
+		WHERE item = %(item)s AND posting_date < %(from_date)s AND is_cancelled = 0"""
+	),
+	"stock_balance_by_batch": (
+		"""SELECT item, warehouse, batch_no, SUM(actual_qty) FROM `tabStock Ledger Entry`
+		WHERE batch_no = %(batch_no)s GROUP BY item, warehouse, batch_no"""
+	),
+	"voucher_entries": (
+		"""SELECT name FROM `tabStock Ledger Entry`
+		WHERE voucher_type = 'POS Invoice' AND voucher_no = %(voucher_no)s"""
+	),
+}
+
+
+class TestStockLedgerEntry(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		on_doctype_update()
+		seed_stock_ledger()
+
+	def test_hot_queries_use_an_index(self):
+		values = {
+			"item": "_Test SLE Item 1",
+			"warehouse": "_Test SLE Warehouse 1",
+			"batch_no": "_Test SLE Batch 1",
+			"voucher_no": "_Test SLE Voucher 1",
+			"from_date": add_days(nowdate(), -30),
+		}
+
+		if frappe.db.db_type == "postgres":
+			# Make the planner prefer any usable index, so a remaining sequential
+			# scan means no index matches the access path
+			frappe.db.sql("SET LOCAL enable_seqscan = off")
+
+		try:
+			for name, query in HOT_QUERIES.items():
+				with self.subTest(query=name):
+					self.assertFalse(
+						is_sequential_scan(query, values),
+						f"Hot query {name} falls back to a sequential scan on Stock Ledger Entry",
+					)
+		finally:
+			if frappe.db.db_type == "postgres":
+				frappe.db.sql("SET LOCAL enable_seqscan = on")
+
+
+def seed_stock_ledger():
+	"""Bulk insert a ledger large enough for the optimizer to consider the indexes"""
+	voucher_types = ["Purchase Receipt", "Delivery Note", "POS Invoice", "Stock Entry"]
+	values = []
+	for i in range(SEED_ROWS):
+		values.append(
+			(
+				frappe.generate_hash(length=12),
+				f"_Test SLE Item {i % SEED_ITEMS}",
+				f"_Test SLE Warehouse {i % SEED_WAREHOUSES}",
+				add_days(nowdate(), -(i % 365)),
+				"10:00:00",
+				voucher_types[i % len(voucher_types)],
+				f"_Test SLE Voucher {i}",
+				f"_Test SLE Batch {i % 50}",
+				10 if i % 2 else -5,
+				100,
+				"_Test Company",
+				"2025",
+				0,
+			)
+		)
+
+	frappe.db.bulk_insert(
+		"Stock Ledger Entry",
+		fields=[
+			"name",
+			"item",
+			"warehouse",
+			"posting_date",
+			"posting_time",
+			"voucher_type",
+			"voucher_no",
+			"batch_no",
+			"actual_qty",
+			"valuation_rate",
+			"company",
+			"fiscal_year",
+			"is_cancelled",
+		],
+		values=values,
+	)
+
+	if frappe.db.db_type == "postgres":
+		frappe.db.sql('ANALYZE "tabStock Ledger Entry"')
+	else:
+		frappe.db.sql("ANALYZE TABLE `tabStock Ledger Entry`")
+
+
+def is_sequential_scan(query, values):
+	"""Return True if the plan reads Stock Ledger Entry without using an index"""
+	plan = frappe.db.sql(f"EXPLAIN {query}", values, as_dict=True)
+
+	if frappe.db.db_type == "postgres":
+		plan_text = "\n".join(str(list(row.values())[0]) for row in plan)
+		return 'Seq Scan on "tabStock Ledger Entry"' in plan_text
+
+	for row in plan:
+		if row.get("table") in ("tabStock Ledger Entry", "sle") and (not row.get("key") or row.get("type") == "ALL"):
+			return True
+	return False
@@ -0,0 +1,155 @@
+# Copyright (c) 2025, Dases and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import flt, getdate, nowdate
+
+from inventory.inventory.doctype.stock_closing_balance.stock_closing_balance import (
+	get_last_closing_date,
+	get_stock_ledger_source,
+	invalidate_closing_date_cache,
+)
+
+ARCHIVE_TABLE = "tabStock Ledger Entry Archive"
+
+
+class StockPeriodClosing(Document):
+	def validate(self):
+		self.validate_period_end_date()
+
+	def validate_period_end_date(self):
+		"""Periods are closed in order and never in the future"""
+		if getdate(self.period_end_date) >= getdate(nowdate()):
+			frappe.throw(_("Period End Date must be before today"))
+
+		self.previous_closing_date = get_last_closing_date()
+		if self.previous_closing_date and getdate(self.period_end_date) <= getdate(self.previous_closing_date):
+			frappe.throw(
+				_("Period End Date must be after the last closed period ({0})").format(self.previous_closing_date)
+			)
+
+	def before_submit(self):
+		self.validate_pending_stock_postings()
+
+	def validate_pending_stock_postings(self):
+		"""POS Invoices of the period whose deferred stock posting has not landed yet
+		would be left out of the closing balances"""
+		pending = frappe.db.sql_list("""
+			SELECT name FROM `tabPOS Invoice`
+			WHERE docstatus = 1 AND stock_pending = 1 AND posting_date <= %s
+			ORDER BY name
+			FOR UPDATE
+		""", (self.period_end_date,))
+		if pending:
+			frappe.throw(
+				_("Stock of these POS Invoices is not posted yet, retry once it is: {0}").format(", ".join(pending))
+			)
+
+	def on_submit(self):
+		self.create_closing_balances()
+		if self.archive_entries:
+			self.archive_closed_entries()
+		invalidate_closing_date_cache()
+
+	def on_cancel(self):
+		# Uncached, and counting this closing: its docstatus is already 2 here
+		latest_closing_date = frappe.db.sql("""
+			SELECT MAX(period_end_date)
+			FROM `tabStock Period Closing`
+			WHERE docstatus = 1 OR name = %s
+		""", (self.name,))[0][0]
+		if getdate(latest_closing_date) != getdate(self.period_end_date):
+			frappe.throw(_("Only the latest Stock Period Closing can be cancelled"))
+		if self.archived_entries:
+			frappe.throw(_("Cannot cancel a closing whose entries were archived. Restore them first."))
+
+		frappe.db.delete("Stock Closing Balance", {"period_closing": self.name})
+		invalidate_closing_date_cache()
+
+	def create_closing_balances(self):
+		"""Write one snapshot row per (item, warehouse, batch) with qty and value
+
+		Reads the previous snapshot plus the entries of this period only. Cancelled entries
+		are left out: the snapshot rows are read back as not cancelled.
+		"""
+		source = get_stock_ledger_source(before_date=self.period_end_date)
+		balances = frappe.db.sql(f"""
+			SELECT
+				sle.item,
+				sle.warehouse,
+				sle.batch_no,
+				SUM(sle.actual_qty) AS qty,
+				SUM(sle.actual_qty * sle.valuation_rate) AS stock_value
+			FROM {source} sle
+			WHERE sle.posting_date <= %s AND sle.is_cancelled = 0
+			GROUP BY sle.item, sle.warehouse, sle.batch_no
+		""", (self.period_end_date,), as_dict=True)
+
+		now = frappe.utils.now()
+		values = []
+		for row in balances:
+			qty = flt(row.qty)
+			stock_value = flt(row.stock_value)
+			if not qty and not stock_value:
+				continue
+
+			values.append((
+				frappe.generate_hash(length=10),
+				now,
+				now,
+				frappe.session.user,
+				frappe.session.user,
+				self.period_end_date,
+				self.name,
+				row.item,
+				row.warehouse,
+				row.batch_no,
+				qty,
+				stock_value / qty if qty else 0,
+				stock_value,
+			))
+
+		frappe.db.bulk_insert(
+			"Stock Closing Balance",
+			fields=[
+				"name", "creation", "modified", "owner", "modified_by",
+				"closing_date", "period_closing", "item", "warehouse", "batch_no",
+				"qty", "valuation_rate", "stock_value",
+			],
+			values=values,
+		)
+		self.db_set("snapshot_rows", len(values))
+
+	def archive_closed_entries(self):
+		"""Move the Stock Ledger Entries of the closed period to the archive table"""
+		ensure_archive_table()
+
+		archived = frappe.db.sql("""
+			SELECT COUNT(*) FROM `tabStock Ledger Entry` WHERE posting_date <= %s
+		""", (self.period_end_date,))[0][0]
+
+		frappe.db.sql(f"""
+			INSERT INTO `{ARCHIVE_TABLE}`
+			SELECT * FROM `tabStock Ledger Entry` WHERE posting_date <= %s
+		""", (self.period_end_date,))
+		frappe.db.sql("""
+			DELETE FROM `tabStock Ledger Entry` WHERE posting_date <= %s
+		""", (self.period_end_date,))
+
+		self.db_set("archived_entries", archived)
+
+
+def ensure_archive_table():
+	"""Create the archive table with the same structure as Stock Ledger Entry"""
+	if frappe.db.db_type == "postgres":
+		frappe.db.sql_ddl(f"""
+			CREATE TABLE IF NOT EXISTS "{ARCHIVE_TABLE}"
+			(LIKE "tabStock Ledger Entry" INCLUDING ALL)
+		""")
+	else:
+		frappe.db.sql_ddl(f"""
+			CREATE TABLE IF NOT EXISTS `{ARCHIVE_TABLE}`
+			LIKE `tabStock Ledger Entry`
+		""")
@@ -0,0 +1,97 @@
+# Copyright (c) 2025, Dases and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, flt, nowdate
+
+from inventory.inventory.doctype.stock_closing_balance.stock_closing_balance import (
+	get_stock_ledger_source,
+	invalidate_closing_date_cache,
+)
+
+
+class TestStockPeriodClosing(FrappeTestCase):
+	def tearDown(self):
+		frappe.db.rollback()
+		invalidate_closing_date_cache()
+
+	def test_balances_match_ledger_after_closing(self):
+		seed_entries()
+		before = get_balances("`tabStock Ledger Entry`")
+
+		closing = frappe.get_doc({
+			"doctype": "Stock Period Closing",
+			"period_type": "Month",
+			"period_end_date": add_days(nowdate(), -30),
+		})
+		closing.insert()
+		closing.submit()
+
+		self.assertTrue(closing.snapshot_rows)
+		self.assertEqual(before, get_balances(get_stock_ledger_source()))
+
+	def test_posting_into_closed_period_is_blocked(self):
+		closing = frappe.get_doc({
+			"doctype": "Stock Period Closing",
+			"period_type": "Month",
+			"period_end_date": add_days(nowdate(), -30),
+		})
+		closing.insert()
+		closing.submit()
+
+		sle = frappe.new_doc("Stock Ledger Entry")
+		sle.posting_date = add_days(nowdate(), -40)
+		self.assertRaises(frappe.ValidationError, sle.validate_closed_period)
+
+	def test_latest_closing_can_be_cancelled_with_a_cold_cache(self):
+		closing = frappe.get_doc({
+			"doctype": "Stock Period Closing",
+			"period_type": "Month",
+			"period_end_date": add_days(nowdate(), -30),
+		})
+		closing.insert()
+		closing.submit()
+
+		invalidate_closing_date_cache()
+		closing.cancel()
+		self.assertFalse(frappe.db.exists("Stock Closing Balance", {"period_closing": closing.name}))
+
+
+def seed_entries():
+	values = []
+	for i in range(60):
+		values.append((
+			frappe.generate_hash(length=12),
+			f"_Test Closing Item {i % 3}",
+			"_Test Closing Warehouse",
+			add_days(nowdate(), -(i + 1)),
+			"10:00:00",
+			"Stock Entry",
+			f"_Test Closing Voucher {i}",
+			10 if i % 3 else -4,
+			50 + i,
+			"_Test Company",
+			"2025",
+			# Some entries were reversed and must not count either side of a closing
+			1 if i % 7 == 0 else 0,
+		))
+
+	frappe.db.bulk_insert(
+		"Stock Ledger Entry",
+		fields=[
+			"name", "item", "warehouse", "posting_date", "posting_time", "voucher_type",
+			"voucher_no", "actual_qty", "valuation_rate", "company", "fiscal_year", "is_cancelled",
+		],
+		values=values,
+	)
+
+
+def get_balances(source):
+	rows = frappe.db.sql(f"""
+		SELECT item, warehouse, SUM(actual_qty) AS qty, SUM(actual_qty * valuation_rate) AS value
+		FROM {source} sle
+		WHERE item LIKE %s AND is_cancelled = 0
+		GROUP BY item, warehouse
+	""", ("_Test Closing Item%",), as_dict=True)
+	return {(r.item, r.warehouse): (flt(r.qty, 3), flt(r.value, 2)) for r in rows}
@@ -0,0 +1,184 @@
+# Copyright (c) 2025, Dases and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import flt, now
+
+from inventory.inventory.doctype.stock_closing_balance.stock_closing_balance import get_stock_ledger_source
+from inventory.pos.stock_posting import get_in_flight_qty
+
+
+class StockReservation(Document):
+	pass
+
+
+def on_doctype_update():
+	"""One reservation row per (item, warehouse)"""
+	frappe.db.add_unique("Stock Reservation", ["item", "warehouse"], "stock_reservation_item_warehouse")
+
+
+def get_reservation_warehouse():
+	"""Sales Orders and Delivery Notes move stock from the default warehouse"""
+	from inventory.pos.cache import get_inventory_settings
+
+	warehouse = get_inventory_settings().default_warehouse
+	if not warehouse:
+		frappe.throw(_("Please set Default Warehouse in Inventory Settings"))
+	return warehouse
+
+
+def ensure_reservation_rows(warehouse, item_codes):
+	"""Create the missing reservation rows (concurrent callers may race, duplicates are ignored)"""
+	item_codes = sorted(set(item_codes))
+	existing = set(frappe.db.sql_list("""
+		SELECT item FROM `tabStock Reservation` WHERE warehouse = %(warehouse)s AND item IN %(items)s
+	""", {"warehouse": warehouse, "items": tuple(item_codes)}))
+
+	timestamp = now()
+	for item_code in item_codes:
+		if item_code in existing:
+			continue
+		values = (frappe.generate_hash(length=10), timestamp, timestamp, frappe.session.user,
+			frappe.session.user, item_code, warehouse)
+		if frappe.db.db_type == "postgres":
+			frappe.db.sql("""
+				INSERT INTO `tabStock Reservation`
+					(name, creation, modified, owner, modified_by, docstatus, item, warehouse, reserved_qty, held_qty)
+				VALUES (%s, %s, %s, %s, %s, 0, %s, %s, 0, 0)
+				ON CONFLICT (item, warehouse) DO NOTHING
+			""", values)
+		else:
+			frappe.db.sql("""
+				INSERT IGNORE INTO `tabStock Reservation`
+					(name, creation, modified, owner, modified_by, docstatus, item, warehouse, reserved_qty, held_qty)
+				VALUES (%s, %s, %s, %s, %s, 0, %s, %s, 0, 0)
+			""", values)
+
+
+def reserve_stock(warehouse, quantities, field="reserved_qty", check_available=True):
+	"""Atomically add `quantities` ({item_code: qty}) to the reserved (or held) quantity
+
+	Each item is reserved by a single conditional UPDATE on its (item, warehouse) row: with
+	`check_available` it only applies while actual - reserved - held covers the quantity,
+	and the row lock serializes concurrent reservations of the same item. Rows are updated
+	in item order so concurrent multi-item reservations cannot deadlock.
+
+	Returns the items that could not be reserved as {item_code: available_qty}; the
+	caller is expected to throw (rolling the other reservations back) if it is not empty.
+	"""
+	quantities = {item_code: flt(qty) for item_code, qty in quantities.items() if flt(qty) > 0}
+	if not quantities:
+		return {}
+	ensure_reservation_rows(warehouse, quantities)
+
+	in_flight = get_in_flight_qty(warehouse, quantities)
+	shortages = {}
+	for item_code in sorted(quantities):
+		values = {
+			"item": item_code,
+			"warehouse": warehouse,
+			"qty": quantities[item_code],
+			"in_flight": in_flight.get(item_code, 0),
+			"now": now(),
+		}
+		condition = ""
+		if check_available:
+			condition = f"""
+				AND (
+					SELECT COALESCE(SUM(sle.actual_qty), 0)
+					FROM {get_stock_ledger_source()} sle
+					WHERE sle.item = %(item)s AND sle.warehouse = %(warehouse)s AND sle.is_cancelled = 0
+				) - %(in_flight)s - reserved_qty - held_qty >= %(qty)s
+			"""
+
+		query = f"""
+			UPDATE `tabStock Reservation`
+			SET {field} = {field} + %(qty)s, modified = %(now)s
+			WHERE item = %(item)s AND warehouse = %(warehouse)s {condition}
+		"""
+		if frappe.db.db_type == "postgres":
+			reserved = frappe.db.sql(query + " RETURNING name", values)
+		else:
+			frappe.db.sql(query, values)
+			reserved = frappe.db.sql("SELECT ROW_COUNT()")[0][0]
+
+		if not reserved:
+			shortages[item_code] = None
+
+	if shortages:
+		for item_code, availability in get_available_qty(warehouse, shortages).items():
+			shortages[item_code] = availability.available_qty
+	return shortages
+
+
+def release_stock(warehouse, quantities, field="reserved_qty"):
+	"""Atomically take `quantities` ({item_code: qty}) off the reserved (or held) quantity"""
+	timestamp = now()
+	for item_code in sorted(quantities):
+		qty = flt(quantities[item_code])
+		if qty <= 0:
+			continue
+		frappe.db.sql(f"""
+			UPDATE `tabStock Reservation`
+			SET {field} = GREATEST({field} - %(qty)s, 0), modified = %(now)s
+			WHERE item = %(item)s AND warehouse = %(warehouse)s
+		""", {"item": item_code, "warehouse": warehouse, "qty": qty, "now": timestamp})
+
+
+def get_available_qty(warehouse, item_codes):
+	"""Actual, reserved, held and available (actual - reserved - held) quantity per item
+
+	One indexed read: the ledger balance of the items grouped in a subquery, joined to
+	their reservation rows. Sales whose deferred POS stock posting has not landed yet
+	count as already gone.
+	"""
+	item_codes = sorted(set(item_codes))
+	if not item_codes:
+		return {}
+
+	rows = frappe.db.sql(f"""
+		SELECT stock.item, stock.actual_qty,
+			COALESCE(res.reserved_qty, 0) AS reserved_qty,
+			COALESCE(res.held_qty, 0) AS held_qty
+		FROM (
+			SELECT sle.item, SUM(sle.actual_qty) AS actual_qty
+			FROM {get_stock_ledger_source()} sle
+			WHERE sle.warehouse = %(warehouse)s AND sle.item IN %(items)s AND sle.is_cancelled = 0
+			GROUP BY sle.item
+		) stock
+		LEFT JOIN `tabStock Reservation` res
+			ON res.item = stock.item AND res.warehouse = %(warehouse)s
+	""", {"warehouse": warehouse, "items": tuple(item_codes)}, as_dict=True)
+
+	in_flight = get_in_flight_qty(warehouse, item_codes)
+	availability = {
+		item_code: frappe._dict(actual_qty=0, reserved_qty=0, held_qty=0, available_qty=0)
+		for item_code in item_codes
+	}
+	for row in rows:
+		actual_qty = flt(row.actual_qty) - in_flight.get(row.item, 0)
+		availability[row.item] = frappe._dict(
+			actual_qty=actual_qty,
+			reserved_qty=flt(row.reserved_qty),
+			held_qty=flt(row.held_qty),
+			available_qty=actual_qty - flt(row.reserved_qty) - flt(row.held_qty),
+		)
+	return availability
+
+
+def get_shortage_message(warehouse, quantities, shortages):
+	items = "".join(
+		f"<li><b>{item_code}</b>: {_('Available')}: {flt(available)}, {_('Required')}: {flt(quantities[item_code])}</li>"
+		for item_code, available in shortages.items()
+	)
+	return _("Insufficient unreserved stock in warehouse <b>{0}</b> for:").format(warehouse) + f"<ul>{items}</ul>"
+
+
+@frappe.whitelist()
+def get_stock_availability(item_codes, warehouse=None):
+	"""Available (unreserved) quantity of the given items"""
+	if isinstance(item_codes, str):
+		item_codes = frappe.parse_json(item_codes)
+	return get_available_qty(warehouse or get_reservation_warehouse(), item_codes)
@@ -0,0 +1,87 @@
+# Copyright (c) 2025, Dases and Contributors
+# See license.txt
+
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import flt, nowdate
+
+from inventory.inventory.doctype.stock_reservation.stock_reservation import (
+	get_available_qty,
+	release_stock,
+	reserve_stock,
+)
+
+ITEM = "_Test Reservation Item"
+WAREHOUSE = "_Test Reservation Warehouse"
+STOCK = 50
+ORDER_QTY = 2
+ORDERS = 60
+
+
+class TestStockReservation(FrappeTestCase):
+	def setUp(self):
+		cleanup()
+		frappe.db.bulk_insert(
+			"Stock Ledger Entry",
+			fields=[
+				"name", "item", "warehouse", "posting_date", "posting_time", "voucher_type",
+				"voucher_no", "actual_qty", "valuation_rate", "company", "fiscal_year",
+			],
+			values=[(
+				frappe.generate_hash(length=12), ITEM, WAREHOUSE, nowdate(), "10:00:00",
+				"Stock Entry", "_Test Reservation Voucher", STOCK, 10, "_Test Company", "2025",
+			)],
+		)
+		frappe.db.commit()
+
+	def tearDown(self):
+		cleanup()
+
+	def test_parallel_reservations_do_not_oversell(self):
+		site = frappe.local.site
+		with ThreadPoolExecutor(max_workers=16) as executor:
+			results = list(executor.map(lambda _: reserve(site), range(ORDERS)))
+
+		accepted = results.count(True)
+		self.assertEqual(accepted, STOCK // ORDER_QTY)
+
+		availability = get_available_qty(WAREHOUSE, [ITEM])[ITEM]
+		self.assertEqual(flt(availability.reserved_qty), accepted * ORDER_QTY)
+		self.assertEqual(flt(availability.available_qty), STOCK - accepted * ORDER_QTY)
+
+	def test_release_makes_stock_available_again(self):
+		self.assertEqual(reserve_stock(WAREHOUSE, {ITEM: STOCK}), {})
+		self.assertEqual(reserve_stock(WAREHOUSE, {ITEM: 1}), {ITEM: 0})
+
+		release_stock(WAREHOUSE, {ITEM: 10})
+		availability = get_available_qty(WAREHOUSE, [ITEM])[ITEM]
+		self.assertEqual(flt(availability.actual_qty), STOCK)
+		self.assertEqual(flt(availability.available_qty), 10)
+
+	def test_holds_count_against_availability(self):
+		self.assertEqual(reserve_stock(WAREHOUSE, {ITEM: 30}, field="held_qty"), {})
+		self.assertEqual(reserve_stock(WAREHOUSE, {ITEM: 30}), {ITEM: 20})
+
+
+def reserve(site):
+	"""Reserve from its own connection, like a separate web worker would"""
+	frappe.init(site=site)
+	frappe.connect()
+	frappe.set_user("Administrator")
+	try:
+		if reserve_stock(WAREHOUSE, {ITEM: ORDER_QTY}):
+			frappe.db.rollback()
+			return False
+		frappe.db.commit()
+		return True
+	finally:
+		frappe.destroy()
+
+
+def cleanup():
+	frappe.db.rollback()
+	frappe.db.delete("Stock Reservation", {"item": ITEM})
+	frappe.db.delete("Stock Ledger Entry", {"item": ITEM})
+	frappe.db.commit()
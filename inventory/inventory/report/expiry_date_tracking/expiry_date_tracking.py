@@ -1,6 +1,7 @@
 import frappe
 from frappe import _
 from frappe.utils import flt, date_diff, getdate, nowdate, add_days
+from inventory.inventory.doctype.stock_closing_balance.stock_closing_balance import get_stock_ledger_source
 
 def execute(filters=None):
     if not filters:
@@ -57,7 +58,7 @@ def get_data(filters):
         FROM 
             "tabBatch" b
         LEFT JOIN 
-            "tabStock Ledger Entry" sle ON sle.batch_no = b.name AND sle.is_cancelled = 0
+            {get_stock_ledger_source()} sle ON sle.batch_no = b.name AND sle.is_cancelled = 0
         WHERE 
             {where_clause}
         GROUP BY 
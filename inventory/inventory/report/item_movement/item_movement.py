@@ -1,6 +1,7 @@
 import frappe
 from frappe import _
-from frappe.utils import flt
+from frappe.utils import flt, add_days
+from inventory.inventory.doctype.stock_closing_balance.stock_closing_balance import get_stock_ledger_source
 
 def execute(filters=None):
     if not filters:
@@ -64,7 +65,7 @@ def get_data(filters):
         if from_date:
             opening_query = f"""
                 SELECT SUM(actual_qty) as qty
-                FROM "tabStock Ledger Entry"
+                FROM {get_stock_ledger_source(before_date=from_date)} sle
                 WHERE item = %(item)s 
                 AND posting_date < %(from_date)s
                 AND is_cancelled = 0
@@ -131,7 +132,7 @@ def get_data(filters):
         # Get closing value
         closing_value_query = f"""
             SELECT SUM(actual_qty * valuation_rate) as value
-            FROM "tabStock Ledger Entry"
+            FROM {get_stock_ledger_source(before_date=add_days(to_date, 1) if to_date else None)} sle
             WHERE item = %(item)s
             AND is_cancelled = 0
             {"AND posting_date <= %(to_date)s" if to_date else ""}
@@ -1,6 +1,7 @@
 import frappe
 from frappe import _
 from frappe.utils import flt, add_days, nowdate
+from inventory.inventory.doctype.stock_closing_balance.stock_closing_balance import get_stock_ledger_source
 
 def execute(filters=None):
     if not filters:
@@ -78,7 +79,7 @@ def get_data(filters):
                 warehouse,
                 SUM(actual_qty) as current_stock
             FROM 
-                "tabStock Ledger Entry"
+                {get_stock_ledger_source()} sle
             WHERE 
                 {stock_where}
             GROUP BY 
@@ -1,6 +1,7 @@
 import frappe
 from frappe import _
 from frappe.utils import flt, date_diff, getdate, nowdate
+from inventory.inventory.doctype.stock_closing_balance.stock_closing_balance import get_stock_ledger_source
 
 def execute(filters=None):
     if not filters:
@@ -52,7 +53,7 @@ def get_data(filters):
             MIN(CASE WHEN actual_qty > 0 THEN posting_date END) as first_receipt_date,
             SUM(actual_qty * valuation_rate) as stock_value
         FROM 
-            "tabStock Ledger Entry"
+            {get_stock_ledger_source()} sle
         WHERE 
             {where_clause}
         GROUP BY 
@@ -1,5 +1,6 @@
 import frappe
 from frappe import _
+from inventory.inventory.doctype.stock_closing_balance.stock_closing_balance import get_stock_ledger_source
 
 def execute(filters=None):
     if not filters:
@@ -60,7 +61,7 @@ def get_stock_balance_data(filters):
             SUM(actual_qty) as balance_qty,
             SUM(actual_qty * valuation_rate) as total_value
         FROM 
-            "tabStock Ledger Entry" 
+            {get_stock_ledger_source()} sle 
         {where_clause}
         GROUP BY 
             item, warehouse, batch_no
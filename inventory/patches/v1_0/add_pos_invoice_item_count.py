@@ -0,0 +1,21 @@
+import frappe
+
+def execute():
+    """
+    Backfill POS Invoice.item_count from the invoice lines and add the
+    (pos_session, docstatus, posting_date) index used by the recent invoices panel
+    """
+    from inventory.pos.doctype.pos_invoice.pos_invoice import on_doctype_update
+
+    frappe.reload_doc("pos", "doctype", "pos_invoice")
+
+    frappe.db.sql("""
+        UPDATE `tabPOS Invoice` pi
+        SET item_count = (
+            SELECT COUNT(*) FROM `tabPOS Invoice Item` pii
+            WHERE pii.parent = pi.name AND pii.parenttype = 'POS Invoice'
+        )
+    """)
+
+    on_doctype_update()
+    frappe.db.commit()
@@ -0,0 +1,29 @@
+import frappe
+
+def execute():
+    """
+    Backfill Purchase Order Item.received_qty from the submitted Purchase Receipts and
+    re-derive the status of the submitted Purchase Orders from it
+    """
+    from inventory.inventory.doctype.purchase_order.purchase_order import update_receipt_status
+
+    frappe.reload_doc("inventory", "doctype", "purchase_order_item")
+    frappe.reload_doc("inventory", "doctype", "purchase_receipt_item")
+
+    # Per (order, item), like the status check it replaces; an item ordered on several
+    # lines is counted on each of them, capped at the line quantity
+    frappe.db.sql("""
+        UPDATE `tabPurchase Order Item` poi
+        SET received_qty = LEAST(poi.quantity, COALESCE((
+            SELECT SUM(pri.quantity)
+            FROM `tabPurchase Receipt Item` pri
+            INNER JOIN `tabPurchase Receipt` pr ON pr.name = pri.parent
+            WHERE pr.docstatus = 1 AND pr.purchase_order = poi.parent AND pri.item = poi.item
+        ), 0))
+        WHERE poi.parenttype = 'Purchase Order'
+    """)
+
+    purchase_orders = frappe.get_all("Purchase Order", filters={"docstatus": 1}, pluck="name")
+    for start in range(0, len(purchase_orders), 1000):
+        update_receipt_status(purchase_orders[start:start + 1000])
+    frappe.db.commit()
@@ -0,0 +1,29 @@
+import frappe
+
+def execute():
+    """
+    Backfill Sales Order Item.delivered_qty from the submitted Delivery Notes and
+    re-derive the status of the submitted Sales Orders from it
+    """
+    from inventory.inventory.doctype.sales_order.sales_order import update_delivery_status
+
+    frappe.reload_doc("inventory", "doctype", "sales_order_item")
+    frappe.reload_doc("inventory", "doctype", "delivery_note_item")
+
+    # Per (order, item), like the status check it replaces; an item ordered on several
+    # lines is counted on each of them, capped at the line quantity
+    frappe.db.sql("""
+        UPDATE `tabSales Order Item` soi
+        SET delivered_qty = LEAST(soi.quantity, COALESCE((
+            SELECT SUM(dni.quantity)
+            FROM `tabDelivery Note Item` dni
+            INNER JOIN `tabDelivery Note` dn ON dn.name = dni.parent
+            WHERE dn.docstatus = 1 AND dn.sales_order = soi.parent AND dni.item = soi.item
+        ), 0))
+        WHERE soi.parenttype = 'Sales Order'
+    """)
+
+    sales_orders = frappe.get_all("Sales Order", filters={"docstatus": 1}, pluck="name")
+    for start in range(0, len(sales_orders), 1000):
+        update_delivery_status(sales_orders[start:start + 1000])
+    frappe.db.commit()
@@ -0,0 +1,14 @@
+import frappe
+
+def execute():
+    """
+    Add composite indexes to Stock Ledger Entry for the hot query paths:
+    (item, warehouse, is_cancelled), (warehouse, item),
+    (voucher_type, item, posting_date), (item, posting_date),
+    (voucher_type, voucher_no) and batch_no
+    """
+    from inventory.inventory.doctype.stock_ledger_entry.stock_ledger_entry import on_doctype_update
+
+    frappe.reload_doc("inventory", "doctype", "stock_ledger_entry")
+    on_doctype_update()
+    frappe.db.commit()
@@ -0,0 +1,49 @@
+import frappe
+
+def execute():
+    """
+    Reserve what the submitted Sales Orders still have to deliver (quantity minus
+    delivered_qty, backfilled by add_sales_order_delivered_qty, which runs first) and add
+    the (item, warehouse) unique key of Stock Reservation
+    """
+    from inventory.inventory.doctype.stock_reservation.stock_reservation import (
+        get_reservation_warehouse,
+        on_doctype_update,
+        reserve_stock,
+    )
+
+    frappe.reload_doc("inventory", "doctype", "stock_reservation")
+    frappe.reload_doc("inventory", "doctype", "sales_order_item")
+    on_doctype_update()
+
+    if not frappe.db.get_single_value("Inventory Settings", "default_warehouse"):
+        return
+
+    open_lines = frappe.db.sql("""
+        SELECT soi.name, soi.item, soi.quantity - COALESCE(soi.delivered_qty, 0) AS pending_qty
+        FROM `tabSales Order Item` soi
+        INNER JOIN `tabSales Order` so ON so.name = soi.parent
+        WHERE so.docstatus = 1 AND so.status IN ('Ordered', 'Partially Delivered')
+            AND soi.parenttype = 'Sales Order'
+            AND soi.quantity > COALESCE(soi.delivered_qty, 0)
+    """, as_dict=True)
+    if not open_lines:
+        return
+
+    quantities = {}
+    for line in open_lines:
+        quantities[line.item] = quantities.get(line.item, 0) + line.pending_qty
+
+    # Already promised, so reserved even where the stock no longer covers it
+    reserve_stock(get_reservation_warehouse(), quantities, check_available=False)
+    frappe.db.sql("""
+        UPDATE `tabSales Order Item` soi
+        SET reserved_qty = soi.quantity - COALESCE(soi.delivered_qty, 0)
+        WHERE soi.parenttype = 'Sales Order'
+            AND soi.quantity > COALESCE(soi.delivered_qty, 0)
+            AND soi.parent IN (
+                SELECT so.name FROM `tabSales Order` so
+                WHERE so.docstatus = 1 AND so.status IN ('Ordered', 'Partially Delivered')
+            )
+    """)
+    frappe.db.commit()
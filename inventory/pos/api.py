@@ -4,14 +4,29 @@
 import frappe
 from frappe import _
 from frappe.utils import flt, getdate, nowdate
+from inventory.api.log_buffer import log_api_error
+from inventory.pos.cache import get_pos_profile, get_pos_session
 from inventory.pos.doctype.pos_profile.pos_profile import get_default_pos_profile
+from inventory.pos.doctype.pos_cart_hold.pos_cart_hold import (
+    get_cart_hold_qty,
+    get_cart_hold_ttl,
+    hold_cart_items,
+    release_cart_hold,
+)
+from inventory.pos.stock_posting import get_in_flight_qty, lock_stock_posting
+from inventory.inventory.doctype.stock_reservation.stock_reservation import get_available_qty
+from inventory.inventory.doctype.stock_closing_balance.stock_closing_balance import get_stock_ledger_source
 
 
 @frappe.whitelist()
-def get_pos_invoices_for_modification(limit=50, from_date=None, to_date=None):
-    """Get recent POS invoices that can be modified"""
+def get_pos_invoices_for_modification(limit=50, from_date=None, to_date=None, last_creation=None, last_name=None):
+    """Get recent POS invoices that can be modified
+
+    Newest first, keyset-paginated on (creation, name): pass the `creation` and `name`
+    of the last row received as `last_creation` / `last_name` to get the next page.
+    """
     try:
-        from frappe.utils import getdate, today, add_days
+        from frappe.utils import cint, today, add_days
         
         # Default to last 30 days if not specified
         if not from_date:
@@ -19,34 +34,48 @@ def get_pos_invoices_for_modification(limit=50, from_date=None, to_date=None):
         if not to_date:
             to_date = today()
         
+        values = {
+            "user": frappe.session.user,
+            "from_date": from_date,
+            "to_date": to_date,
+            "limit": cint(limit) or 50,
+        }
+        
+        cursor_condition = ""
+        if last_creation and last_name:
+            cursor_condition = """
+                AND (pi.creation < %(last_creation)s
+                    OR (pi.creation = %(last_creation)s AND pi.name < %(last_name)s))
+            """
+            values.update({"last_creation": last_creation, "last_name": last_name})
+        
         # Get recent invoices from current user's sessions
         invoices = frappe.db.sql("""
             SELECT 
                 pi.name,
+                pi.creation,
                 pi.posting_date,
                 pi.posting_time,
                 pi.customer,
                 pi.grand_total,
                 pi.status,
                 pi.pos_session,
-                ps.pos_profile,
-                COUNT(pii.name) as item_count
+                pi.pos_profile,
+                pi.item_count
             FROM "tabPOS Invoice" pi
-            LEFT JOIN "tabPOS Session" ps ON pi.pos_session = ps.name
-            LEFT JOIN "tabPOS Invoice Item" pii ON pi.name = pii.parent
+            INNER JOIN "tabPOS Session" ps ON pi.pos_session = ps.name
             WHERE pi.docstatus = 1
-                AND ps.pos_user = %s
-                AND pi.posting_date BETWEEN %s AND %s
-            GROUP BY pi.name, pi.posting_date, pi.posting_time, pi.customer, 
-                     pi.grand_total, pi.status, pi.pos_session, ps.pos_profile
-            ORDER BY pi.creation DESC
-            LIMIT %s
-        """, (frappe.session.user, from_date, to_date, limit), as_dict=True)
+                AND ps.pos_user = %(user)s
+                AND pi.posting_date BETWEEN %(from_date)s AND %(to_date)s
+                {cursor_condition}
+            ORDER BY pi.creation DESC, pi.name DESC
+            LIMIT %(limit)s
+        """.format(cursor_condition=cursor_condition), values, as_dict=True)
         
         return invoices
         
     except Exception as e:
-        frappe.log_error(f"Error in get_pos_invoices_for_modification: {str(e)}")
+        log_api_error("get_pos_invoices_for_modification", e)
         return []
 
 
@@ -58,8 +87,8 @@ def get_pos_invoice_details(invoice_name):
         invoice = frappe.get_doc("POS Invoice", invoice_name)
         
         # Check if user has permission to modify this invoice
-        session = frappe.get_doc("POS Session", invoice.pos_session)
-        if session.pos_user != frappe.session.user:
+        pos_user = frappe.db.get_value("POS Session", invoice.pos_session, "pos_user")
+        if pos_user != frappe.session.user:
             frappe.throw(_("You don't have permission to modify this invoice"))
         
         # Get invoice items
@@ -96,14 +125,27 @@ def get_pos_invoice_details(invoice_name):
         }
         
     except Exception as e:
-        frappe.log_error(f"Error in get_pos_invoice_details: {str(e)}")
+        log_api_error("get_pos_invoice_details", e)
         frappe.throw(_("Error loading invoice details: {0}").format(str(e)))
 
 
 @frappe.whitelist()
-def update_pos_invoice(invoice_name, items, payments, customer="Walk-in Customer"):
-    """Update an existing POS invoice"""
+def update_pos_invoice(invoice_name, items, payments, customer="Walk-in Customer", pos_client=None, amend=1):
+    """Update an existing POS invoice
+
+    The original invoice is cancelled and an amendment (`amended_from` set to the original)
+    is submitted in its place. In amend mode (the default) the original's stock entries are
+    kept and the amendment only posts the net per-item quantity differences, so an edit
+    costs O(changed lines). With `amend=0` the original is fully reversed and the
+    amendment posts every line again.
+    """
     import json
+    from frappe.utils import cint
+    from inventory.pos.doctype.pos_invoice.pos_invoice import (
+        create_pos_client_transaction,
+        get_invoice_client,
+        get_stock_deltas,
+    )
     
     try:
         # Parse JSON strings if needed
@@ -116,27 +158,29 @@ def update_pos_invoice(invoice_name, items, payments, customer="Walk-in Customer
         invoice = frappe.get_doc("POS Invoice", invoice_name)
         
         # Check permissions
-        session = frappe.get_doc("POS Session", invoice.pos_session)
-        if session.pos_user != frappe.session.user:
+        pos_user = frappe.db.get_value("POS Session", invoice.pos_session, "pos_user")
+        if pos_user != frappe.session.user:
             frappe.throw(_("You don't have permission to modify this invoice"))
         
-        # Cancel the original invoice
-        invoice.cancel()
-        
-        # Create a new invoice with updated data
+        # Create the amendment with updated data
         new_invoice = frappe.new_doc("POS Invoice")
+        new_invoice.amended_from = invoice.name
+        new_invoice.naming_series = invoice.naming_series
         new_invoice.pos_profile = invoice.pos_profile
         new_invoice.pos_session = invoice.pos_session
         new_invoice.customer = customer
+        new_invoice.pos_client = pos_client or invoice.pos_client
         new_invoice.posting_date = invoice.posting_date
         new_invoice.posting_time = invoice.posting_time
         new_invoice.company = invoice.company
+        new_invoice.warehouse = invoice.warehouse
         new_invoice.currency = invoice.currency
         
         # Add items
         for item_data in items:
             new_invoice.append("items", {
                 "item_code": item_data["item_code"],
+                "item_name": item_data.get("item_name"),
                 "qty": item_data["qty"],
                 "rate": item_data["rate"]
             })
@@ -148,8 +192,29 @@ def update_pos_invoice(invoice_name, items, payments, customer="Walk-in Customer
                 "amount": payment_data["amount"]
             })
         
-        # Save and submit
-        new_invoice.save()
+        # Cancel the original invoice; in amend mode its stock stays with the amendment.
+        # An original whose deferred stock posting has not run yet has nothing to keep:
+        # it is dropped and the amendment posts all of its lines.
+        if cint(amend) and not (invoice.stock_pending and lock_stock_posting(invoice.name)):
+            invoice.flags.keep_stock_for_amendment = True
+            new_invoice.flags.stock_deltas = get_stock_deltas(invoice.items, new_invoice.items)
+        invoice.cancel()
+        
+        new_invoice.insert()
+        
+        # Only the change in credit is charged or given back
+        credit_change = get_credit_amount(new_invoice.payments) - get_credit_amount(invoice.payments)
+        if credit_change:
+            new_invoice.pos_client = new_invoice.pos_client or get_invoice_client(invoice)
+            if not new_invoice.pos_client:
+                frappe.throw(_("Please select a POS Client for credit sales"))
+            create_pos_client_transaction(
+                new_invoice.pos_client,
+                "Sale" if credit_change > 0 else "Payment",
+                abs(credit_change),
+                new_invoice.name
+            )
+        
         new_invoice.submit()
         
         return {
@@ -160,10 +225,15 @@ def update_pos_invoice(invoice_name, items, payments, customer="Walk-in Customer
         }
         
     except Exception as e:
-        frappe.log_error(f"Error in update_pos_invoice: {str(e)}")
+        log_api_error("update_pos_invoice", e)
         frappe.throw(_("Error updating invoice: {0}").format(str(e)))
 
 
+def get_credit_amount(payments):
+    """Total paid on credit in a set of invoice payment rows"""
+    return sum(flt(p.amount) for p in payments if p.payment_method == "Credit")
+
+
 @frappe.whitelist()
 def get_pos_data():
     """Get all data needed for POS interface"""
@@ -178,20 +248,20 @@ def get_pos_data():
         open_session = get_current_open_session()
         
         # Get items with stock data
-        items = get_pos_items(pos_profile.warehouse if pos_profile else None)
+        items = get_pos_items(pos_profile.warehouse_name if pos_profile else None)
         
         # Get payment methods
         payment_methods = pos_profile.payment_methods if pos_profile else []
         
         return {
-            "pos_profile": pos_profile.as_dict() if pos_profile else None,
-            "open_session": open_session.as_dict() if open_session else None,
+            "pos_profile": pos_profile,
+            "open_session": open_session,
             "items": items,
-            "payment_methods": [pm.as_dict() for pm in payment_methods]
+            "payment_methods": payment_methods
         }
         
     except Exception as e:
-        frappe.log_error(f"Error in get_pos_data: {str(e)}")
+        log_api_error("get_pos_data", e)
         return {"error": str(e)}
 
 
@@ -213,7 +283,7 @@ def get_user_pos_profile():
         )
     
     if pos_profile_name:
-        return frappe.get_doc("POS Profile", pos_profile_name)
+        return get_pos_profile(pos_profile_name)
     
     return None
 
@@ -230,7 +300,7 @@ def get_current_open_session():
     )
     
     if session_name:
-        return frappe.get_doc("POS Session", session_name)
+        return get_pos_session(session_name)
     
     return None
 
@@ -266,32 +336,40 @@ def get_pos_items(warehouse=None, search_term="", customer=None):
                 item.standard_rate,
                 item.item_image,
                 item.description,
-                COALESCE(sle_summary.stock_qty, 0) as stock_qty,
+                COALESCE(sle_summary.stock_qty, 0) - COALESCE(res.reserved_qty, 0)
+                    - COALESCE(res.held_qty, 0) as stock_qty,
                 item.unit_of_measurement
             FROM `tabItem` item
             LEFT JOIN (
                 SELECT 
                     item as item_code,
                     SUM(actual_qty) as stock_qty
-                FROM `tabStock Ledger Entry`
+                FROM {get_stock_ledger_source()} sle
                 WHERE warehouse = %s
                 GROUP BY item
             ) sle_summary ON item.item_code = sle_summary.item_code
+            LEFT JOIN `tabStock Reservation` res
+                ON res.item = item.item_code AND res.warehouse = %s
             WHERE {' AND '.join(conditions)}
             ORDER BY item.item_name
             LIMIT 100
         """
         
-        # Warehouse comes first (for the subquery), then other filter values
-        query_values = [warehouse] + values
+        # Warehouse comes first (for the subquery and the reservation join), then other filter values
+        query_values = [warehouse, warehouse] + values
         items = frappe.db.sql(query, query_values, as_dict=True)
         
         # Get cached prices (fast lookup)
         price_map = get_all_selling_prices_cached()
         
+        # Sales whose deferred stock posting has not landed yet are not available
+        in_flight = get_in_flight_qty(warehouse, [item.item_code for item in items])
+        
         # Apply prices to items
         for item in items:
             item_code = item.get('item_code')
+            if item_code in in_flight:
+                item['stock_qty'] = flt(item['stock_qty']) - in_flight[item_code]
             
             # If customer is specified, try to get customer-specific price
             if customer:
@@ -308,7 +386,7 @@ def get_pos_items(warehouse=None, search_term="", customer=None):
         return items
         
     except Exception as e:
-        frappe.log_error(f"Error in get_pos_items: {str(e)}")
+        log_api_error("get_pos_items", e)
         return []
 
 
@@ -330,9 +408,9 @@ def get_product_details(item_code, warehouse=None, customer=None):
         # Get stock quantity
         stock_qty = 0
         if warehouse:
-            stock_result = frappe.db.sql("""
+            stock_result = frappe.db.sql(f"""
                 SELECT COALESCE(SUM(actual_qty), 0) as stock_qty
-                FROM `tabStock Ledger Entry`
+                FROM {get_stock_ledger_source()} sle
                 WHERE item = %s AND warehouse = %s
             """, (item_code, warehouse), as_dict=True)
             if stock_result:
@@ -418,44 +496,41 @@ def get_product_details(item_code, warehouse=None, customer=None):
         }
         
     except Exception as e:
-        frappe.log_error(f"Error in get_product_details: {str(e)}")
+        log_api_error("get_product_details", e)
         return None
 
 
 @frappe.whitelist()
 def get_item_stock(item_code, warehouse):
-    """Get current stock level for an item"""
+    """Get current stock level for an item (actual - reserved - held)"""
     try:
-        # Calculate stock from Stock Ledger Entry
-        stock_qty = frappe.db.sql("""
-            SELECT COALESCE(SUM(actual_qty), 0) as stock_qty
-            FROM `tabStock Ledger Entry`
-            WHERE item = %s AND warehouse = %s
-        """, (item_code, warehouse), as_dict=True)[0].stock_qty or 0
+        stock_qty = get_available_qty(warehouse, [item_code])[item_code].available_qty
         
         return {"item_code": item_code, "stock_qty": stock_qty}
         
     except Exception as e:
-        frappe.log_error(f"Error in get_item_stock: {str(e)}")
+        log_api_error("get_item_stock", e)
         return {"item_code": item_code, "stock_qty": 0}
 
 
 @frappe.whitelist()
-def validate_stock_availability(items, warehouse):
-    """Validate if sufficient stock is available for all items"""
+def validate_stock_availability(items, warehouse, cart_id=None):
+    """Validate if sufficient stock is available for all items
+
+    Available means actual minus reserved (Sales Orders) and held (open carts); the
+    quantities held by `cart_id` itself count as available to it. All items are read at once.
+    """
     try:
+        if isinstance(items, str):
+            items = frappe.parse_json(items)
         validation_results = []
+        availability = get_available_qty(warehouse, [item.get("item_code") for item in items])
+        own_hold = get_cart_hold_qty(cart_id) if cart_id else {}
         
         for item in items:
             item_code = item.get("item_code")
             required_qty = flt(item.get("qty"))
-            
-            # Calculate available quantity from Stock Ledger Entry
-            available_qty = frappe.db.sql("""
-                SELECT COALESCE(SUM(actual_qty), 0) as stock_qty
-                FROM `tabStock Ledger Entry`
-                WHERE item = %s AND warehouse = %s
-            """, (item_code, warehouse), as_dict=True)[0].stock_qty or 0
+            available_qty = availability[item_code].available_qty + own_hold.get(item_code, 0)
             
             is_valid = available_qty >= required_qty
             
@@ -473,10 +548,55 @@ def validate_stock_availability(items, warehouse):
         }
         
     except Exception as e:
-        frappe.log_error(f"Error in validate_stock_availability: {str(e)}")
+        log_api_error("validate_stock_availability", e)
         return {"is_valid": False, "error": str(e)}
 
 
+@frappe.whitelist()
+def hold_cart_stock(cart_id, items, warehouse):
+    """Hold the cart's items for a few minutes so another till cannot sell the same units
+
+    Replaces the cart's previous hold. Call again when the cart changes and
+    `release_cart_stock` when it is cleared; paying the cart releases it too.
+    """
+    try:
+        if isinstance(items, str):
+            items = frappe.parse_json(items)
+        quantities = {}
+        for item in items:
+            quantities[item.get("item_code")] = quantities.get(item.get("item_code"), 0) + flt(item.get("qty"))
+        
+        frappe.db.savepoint("hold_cart_stock")
+        shortages = hold_cart_items(cart_id, warehouse, quantities)
+        if shortages:
+            frappe.db.rollback(save_point="hold_cart_stock")
+            return {
+                "success": False,
+                "shortages": [
+                    {"item_code": item_code, "required_qty": quantities[item_code], "available_qty": available}
+                    for item_code, available in shortages.items()
+                ]
+            }
+        
+        return {"success": True, "expires_in": get_cart_hold_ttl()}
+        
+    except Exception as e:
+        log_api_error("hold_cart_stock", e)
+        return {"success": False, "error": str(e)}
+
+
+@frappe.whitelist()
+def release_cart_stock(cart_id):
+    """Give back the items held by a cart"""
+    try:
+        release_cart_hold(cart_id)
+        return {"success": True}
+        
+    except Exception as e:
+        log_api_error("release_cart_stock", e)
+        return {"success": False, "error": str(e)}
+
+
 @frappe.whitelist()
 def get_customer_details(customer_name):
     """Get customer details for POS"""
@@ -497,7 +617,7 @@ def get_customer_details(customer_name):
         }
         
     except Exception as e:
-        frappe.log_error(f"Error in get_customer_details: {str(e)}")
+        log_api_error("get_customer_details", e)
         return None
 
 
@@ -527,7 +647,7 @@ def search_customers(search_term):
         return customers
         
     except Exception as e:
-        frappe.log_error(f"Error in search_customers: {str(e)}")
+        log_api_error("search_customers", e)
         return [{"name": "Walk-in Customer", "customer_name": "Walk-in Customer", "customer_type": "Individual"}]
 
 
@@ -603,5 +723,5 @@ def get_pos_reports_data(from_date=None, to_date=None, pos_profile=None):
         }
         
     except Exception as e:
-        frappe.log_error(f"Error in get_pos_reports_data: {str(e)}")
+        log_api_error("get_pos_reports_data", e)
         return {"error": str(e)}
\ No newline at end of file
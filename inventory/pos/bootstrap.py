@@ -0,0 +1,123 @@
+# Copyright (c) 2025, Dases and contributors
+# For license information, please see license.txt
+
+import gzip
+import hashlib
+
+import frappe
+from frappe.utils import add_days, today
+
+from inventory.api.sync import with_etag
+from inventory.inventory.doctype.item_price.item_price import get_all_selling_prices_cached
+from inventory.pos.api import get_pos_items, search_customers
+from inventory.pos.cache import get_pos_profile
+from inventory.pos.doctype.pos_shortcut.pos_shortcut import get_all_shortcuts
+
+# Top customers are the most frequent ones of the profile over this many days
+TOP_CUSTOMERS_DAYS = 90
+TOP_CUSTOMERS_LIMIT = 20
+
+# Bundles smaller than this are not worth compressing
+GZIP_MIN_SIZE = 1024
+
+
+@frappe.whitelist()
+def get_pos_bootstrap(pos_profile=None, etag=None):
+    """Everything the point of sale needs at start-up, in one response
+
+    Returns the profiles to choose from, the user's open session and, for the session's
+    (or the given) profile: payment methods, shortcuts, top customers, the catalog page
+    and the price map. The bundle carries an `etag` (content hash). Clients that send it
+    back as `etag` get `{"not_modified": 1}`; HTTP clients sending `If-None-Match` get a
+    bodiless 304.
+    """
+    bundle = build_pos_bootstrap(pos_profile)
+    bundle_etag = hashlib.md5(frappe.as_json(bundle).encode()).hexdigest()
+
+    if etag == bundle_etag:
+        return {"etag": bundle_etag, "not_modified": 1}
+
+    bundle["etag"] = bundle_etag
+    frappe.local.flags.pos_bootstrap_gzip = True
+    return with_etag(bundle, etag=bundle_etag)
+
+
+def build_pos_bootstrap(pos_profile=None):
+    profiles = frappe.get_all(
+        "POS Profile",
+        fields=["name", "profile_name", "currency", "company_name", "warehouse_name"],
+        order_by="name"
+    )
+
+    session = frappe.db.get_value(
+        "POS Session",
+        {"pos_user": frappe.session.user, "status": ["in", ["Opening", "Open"]]},
+        ["name", "pos_profile", "status", "opening_amount"],
+        as_dict=True
+    )
+
+    bundle = {"profiles": profiles, "session": session}
+
+    profile = get_pos_profile(session.pos_profile if session else pos_profile)
+    if not profile:
+        return bundle
+
+    if session:
+        session.warehouse = profile.warehouse_name
+
+    bundle.update({
+        "profile": {
+            "name": profile.name,
+            "profile_name": profile.profile_name,
+            "company_name": profile.company_name,
+            "warehouse_name": profile.warehouse_name,
+            "currency": profile.currency,
+            "allow_negative_stock": profile.allow_negative_stock,
+        },
+        "payment_methods": [
+            {"payment_method": pm.payment_method, "is_default": pm.is_default}
+            for pm in profile.payment_methods or []
+        ],
+        "shortcuts": get_all_shortcuts(),
+        "customers": get_top_customers(profile.name),
+        "items": get_pos_items(profile.warehouse_name) if profile.warehouse_name else [],
+        "prices": get_all_selling_prices_cached(),
+    })
+    return bundle
+
+
+def get_top_customers(pos_profile):
+    """Most frequent customers of a profile, Walk-in Customer first"""
+    customers = frappe.db.sql("""
+        SELECT
+            pi.customer AS name,
+            COALESCE(c.customer_name, pi.customer) AS customer_name,
+            c.customer_type
+        FROM `tabPOS Invoice` pi
+        LEFT JOIN `tabCustomer` c ON c.name = pi.customer
+        WHERE pi.pos_profile = %s
+            AND pi.docstatus = 1
+            AND pi.posting_date >= %s
+            AND pi.customer != 'Walk-in Customer'
+        GROUP BY pi.customer, c.customer_name, c.customer_type
+        ORDER BY COUNT(*) DESC, pi.customer
+        LIMIT %s
+    """, (pos_profile, add_days(today(), -TOP_CUSTOMERS_DAYS), TOP_CUSTOMERS_LIMIT), as_dict=True)
+
+    if not customers:
+        return search_customers("")
+
+    return [{"name": "Walk-in Customer", "customer_name": "Walk-in Customer", "customer_type": "Individual"}, *customers]
+
+
+def apply_bootstrap_response(response=None, request=None):
+    """after_request hook: gzip bootstrap bundles (ETag/304 is handled by `apply_etag_response`)"""
+    if not frappe.local.flags.get("pos_bootstrap_gzip") or response is None or response.status_code != 200:
+        return
+
+    accept_encoding = (request.headers.get("Accept-Encoding") if request else "") or ""
+    data = response.get_data()
+    if "gzip" in accept_encoding and len(data) >= GZIP_MIN_SIZE and "Content-Encoding" not in response.headers:
+        response.set_data(gzip.compress(data))
+        response.headers["Content-Encoding"] = "gzip"
+        response.headers["Vary"] = "Accept-Encoding"
@@ -0,0 +1,142 @@
+# Copyright (c) 2025, Dases and contributors
+# For license information, please see license.txt
+
+"""Memoized POS Profile / POS Session / Inventory Settings lookups.
+
+Each lookup is kept for the rest of the request in `frappe.local` and shared between
+workers through redis for a short TTL. The documents' `on_update` drops both, so a
+checkout reads each of them at most once and usually not at all. The shared copy is only
+dropped once the change is committed: dropping it earlier lets a concurrent request
+cache the old row again for the whole TTL.
+
+Shared copies are tagged with the document's version, which the drop increments. A
+reader that loaded the row before a change committed tags its copy with the old
+version, so writing it back late does not serve the old row to anyone.
+"""
+
+import pickle
+
+import frappe
+from frappe.utils import cint
+
+# Cache key prefix for POS lookups
+POS_LOOKUP_CACHE_KEY = "pos_lookup"
+
+# Shared copies expire quickly even without an on_update (e.g. direct db.set_value)
+POS_LOOKUP_CACHE_TTL = 300
+
+
+def get_pos_profile(name):
+    """POS Profile as a dict, including its payment methods"""
+    return _get_cached("POS Profile", name)
+
+
+def get_pos_session(name):
+    """POS Session as a dict (without the reconciliation rows)"""
+    return _get_cached("POS Session", name, with_children=False)
+
+
+def get_inventory_settings():
+    """Inventory Settings as a dict"""
+    return _get_cached("Inventory Settings", "Inventory Settings")
+
+
+def invalidate_pos_lookup(doctype, name):
+    """Drop the request copy of a cached document now and the shared copy after commit
+
+    Until the transaction ends the request reads the document from the database and
+    neither reads nor refills the shared copy.
+    """
+    cache_key = get_lookup_cache_key(doctype, name)
+    get_request_cache().pop(cache_key, None)
+
+    pending = get_pending_invalidations()
+    if cache_key in pending:
+        return
+    pending.add(cache_key)
+    frappe.db.after_commit.add(lambda: drop_shared_lookup(cache_key))
+    frappe.db.after_rollback.add(lambda: drop_pending_invalidation(cache_key))
+
+
+def drop_shared_lookup(cache_key):
+    cache = frappe.cache()
+    cache.incr(cache.make_key(get_version_key(cache_key)))
+    cache.delete_value(cache_key)
+    drop_pending_invalidation(cache_key)
+
+
+def drop_pending_invalidation(cache_key):
+    # The request copy may hold uncommitted (or now rolled back) values
+    get_request_cache().pop(cache_key, None)
+    get_pending_invalidations().discard(cache_key)
+
+
+def get_lookup_cache_key(doctype, name):
+    return f"{POS_LOOKUP_CACHE_KEY}:{doctype}:{name}"
+
+
+def get_version_key(cache_key):
+    return f"{cache_key}:version"
+
+
+def get_shared_copy(cache_key):
+    """Current version of a document and its shared copy, if the copy has that version"""
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    pipe.get(cache.make_key(get_version_key(cache_key)))
+    pipe.get(cache.make_key(cache_key))
+    version, shared = pipe.execute()
+
+    version = cint(version.decode() if version else 0)
+    shared = pickle.loads(shared) if shared else None
+    if shared and shared.get("version") == version:
+        return version, shared["doc"]
+    return version, None
+
+
+def get_request_cache():
+    if not hasattr(frappe.local, "pos_lookup_cache"):
+        frappe.local.pos_lookup_cache = {}
+    return frappe.local.pos_lookup_cache
+
+
+def get_pending_invalidations():
+    """Cache keys of documents changed in the current transaction"""
+    if not hasattr(frappe.local, "pos_lookup_pending"):
+        frappe.local.pos_lookup_pending = set()
+    return frappe.local.pos_lookup_pending
+
+
+def _get_cached(doctype, name, with_children=True):
+    if not name:
+        return None
+
+    cache_key = get_lookup_cache_key(doctype, name)
+    request_cache = get_request_cache()
+    if cache_key in request_cache:
+        return request_cache[cache_key]
+
+    changed = cache_key in get_pending_invalidations()
+    # The version is read before the row, so a copy loaded before a change is tagged as old
+    version, value = (None, None) if changed else get_shared_copy(cache_key)
+    if value is None:
+        if not frappe.get_meta(doctype).issingle and not frappe.db.exists(doctype, name):
+            return None
+        value = frappe.get_doc(doctype, name).as_dict(no_child_table=not with_children)
+        if not changed:
+            frappe.cache().set_value(
+                cache_key, {"version": version, "doc": value}, expires_in_sec=POS_LOOKUP_CACHE_TTL
+            )
+
+    value = to_attr_dict(value)
+    request_cache[cache_key] = value
+    return value
+
+
+def to_attr_dict(value):
+    """frappe._dict all the way down, so cached rows read like documents (row.field)"""
+    if isinstance(value, dict):
+        return frappe._dict({key: to_attr_dict(val) for key, val in value.items()})
+    if isinstance(value, list):
+        return [to_attr_dict(val) for val in value]
+    return value
@@ -0,0 +1,93 @@
+# Copyright (c) 2025, Dases and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_to_date, cint, flt, now_datetime
+
+from inventory.inventory.doctype.stock_reservation.stock_reservation import release_stock, reserve_stock
+
+# Seconds an open cart keeps its items held (site config `pos_cart_hold_ttl`)
+DEFAULT_CART_HOLD_TTL = 900
+
+
+class POSCartHold(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("POS Cart Hold", ["item", "warehouse"], "pos_cart_hold_item_warehouse_index")
+
+
+def get_cart_hold_ttl():
+	return cint(frappe.conf.get("pos_cart_hold_ttl")) or DEFAULT_CART_HOLD_TTL
+
+
+def hold_cart_items(cart_id, warehouse, quantities):
+	"""Replace the items held by a cart with `quantities` ({item_code: qty})
+
+	The previous hold is released first, so a cart never counts twice against
+	availability. Returns the items that could not be held as {item_code: available_qty};
+	the caller rolls back when it is not empty.
+	"""
+	release_cart_hold(cart_id)
+
+	shortages = reserve_stock(warehouse, quantities, field="held_qty")
+	if shortages:
+		return shortages
+
+	expires_at = add_to_date(now_datetime(), seconds=get_cart_hold_ttl())
+	timestamp = now_datetime()
+	frappe.db.bulk_insert(
+		"POS Cart Hold",
+		fields=["name", "creation", "modified", "owner", "modified_by", "cart_id", "item", "warehouse", "qty", "expires_at"],
+		values=[
+			(frappe.generate_hash(length=10), timestamp, timestamp, frappe.session.user, frappe.session.user,
+				cart_id, item_code, warehouse, flt(qty), expires_at)
+			for item_code, qty in quantities.items() if flt(qty) > 0
+		],
+	)
+	return {}
+
+
+def release_cart_hold(cart_id):
+	"""Give back everything a cart holds (on checkout, clear or abandon)"""
+	holds = frappe.db.sql("""
+		SELECT name, item, warehouse, qty FROM `tabPOS Cart Hold` WHERE cart_id = %s FOR UPDATE
+	""", (cart_id,), as_dict=True)
+	release_holds(holds)
+
+
+def release_expired_cart_holds():
+	"""Scheduler: release the holds of carts that were left open past their TTL"""
+	holds = frappe.db.sql("""
+		SELECT name, item, warehouse, qty FROM `tabPOS Cart Hold`
+		WHERE expires_at < %s
+		FOR UPDATE SKIP LOCKED
+	""", (now_datetime(),), as_dict=True)
+	if holds:
+		release_holds(holds)
+		frappe.db.commit()
+
+
+def release_holds(holds):
+	if not holds:
+		return
+
+	by_warehouse = {}
+	for hold in holds:
+		quantities = by_warehouse.setdefault(hold.warehouse, {})
+		quantities[hold.item] = quantities.get(hold.item, 0) + flt(hold.qty)
+	for warehouse, quantities in by_warehouse.items():
+		release_stock(warehouse, quantities, field="held_qty")
+
+	frappe.db.sql("""
+		DELETE FROM `tabPOS Cart Hold` WHERE name IN %(names)s
+	""", {"names": tuple(hold.name for hold in holds)})
+
+
+def get_cart_hold_qty(cart_id):
+	"""Quantity per item held by a cart"""
+	return {item_code: flt(qty) for item_code, qty in frappe.db.sql("""
+		SELECT item, SUM(qty) FROM `tabPOS Cart Hold` WHERE cart_id = %s GROUP BY item
+	""", (cart_id,))}
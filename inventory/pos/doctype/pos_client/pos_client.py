@@ -2,9 +2,12 @@
 # For license information, please see license.txt
 
 import frappe
+from frappe import _
 from frappe.model.document import Document
 from frappe.utils import flt, now
 
+from inventory.api.log_buffer import log_api_error
+
 class POSClient(Document):
 	def validate(self):
 		self.set_full_name()
@@ -63,12 +66,14 @@ class POSClient(Document):
 	def add_credit_transaction(self, amount, transaction_type="Sale", reference_doc=None):
 		"""Add a credit transaction and update balance"""
 		if transaction_type == "Sale":
-			self.current_balance = flt(self.current_balance) + flt(amount)
+			new_balance = update_client_balance(self.name, flt(amount))
 		elif transaction_type == "Payment":
-			self.current_balance = flt(self.current_balance) - flt(amount)
+			new_balance = update_client_balance(self.name, -flt(amount))
+		else:
+			new_balance = flt(self.current_balance)
 		
+		self.current_balance = new_balance
 		self.last_transaction_date = now()
-		self.save(ignore_permissions=True)
 		
 		# Create transaction log
 		self.create_transaction_log(amount, transaction_type, reference_doc)
@@ -87,7 +92,7 @@ class POSClient(Document):
 			})
 			transaction_log.insert(ignore_permissions=True)
 		except Exception as e:
-			frappe.log_error(f"Error creating transaction log: {str(e)}")
+			log_api_error("add_credit_transaction", e)
 
 	@frappe.whitelist()
 	def get_credit_summary(self):
@@ -101,6 +106,43 @@ class POSClient(Document):
 			"status": self.status
 		}
 
+def update_client_balance(client_name, amount, check_credit_limit=False):
+	"""Atomically add `amount` to the client's current balance and return the new balance
+
+	The balance is changed by a single conditional UPDATE, so concurrent charges on the
+	same client cannot lose updates. With `check_credit_limit`, the update only applies
+	if the client allows credit, is active and stays within its credit limit; otherwise
+	nothing is changed and None is returned.
+	"""
+	conditions = ""
+	if check_credit_limit:
+		conditions = """
+			AND allow_credit = 1
+			AND status = 'Active'
+			AND COALESCE(current_balance, 0) + %(amount)s <= COALESCE(credit_limit, 0)
+		"""
+
+	values = {"client": client_name, "amount": flt(amount), "now": now()}
+	query = f"""
+		UPDATE `tabPOS Client`
+		SET current_balance = COALESCE(current_balance, 0) + %(amount)s,
+			last_transaction_date = %(now)s
+		WHERE name = %(client)s {conditions}
+	"""
+
+	if frappe.db.db_type == "postgres":
+		result = frappe.db.sql(query + " RETURNING current_balance", values)
+		return flt(result[0][0]) if result else None
+
+	frappe.db.sql(query, values)
+	if not frappe.db.sql("SELECT ROW_COUNT()")[0][0]:
+		return None
+
+	# The row stays locked by the UPDATE until commit, so this reads our own balance
+	return flt(frappe.db.sql("""
+		SELECT current_balance FROM `tabPOS Client` WHERE name = %s
+	""", client_name)[0][0])
+
 @frappe.whitelist()
 def search_pos_clients(search_term, limit=10):
 	"""Search POS clients for autocomplete"""
@@ -129,7 +171,7 @@ def search_pos_clients(search_term, limit=10):
 		return clients
 		
 	except Exception as e:
-		frappe.log_error(f"Error in search_pos_clients: {str(e)}")
+		log_api_error("search_pos_clients", e)
 		return []
 
 @frappe.whitelist()
@@ -139,7 +181,7 @@ def get_client_details(client_name):
 		client = frappe.get_doc("POS Client", client_name)
 		return client.get_credit_summary()
 	except Exception as e:
-		frappe.log_error(f"Error in get_client_details: {str(e)}")
+		log_api_error("get_client_details", e)
 		return None
 
 @frappe.whitelist()
@@ -153,7 +195,7 @@ def validate_credit_purchase(client_name, amount):
 			"message": message
 		}
 	except Exception as e:
-		frappe.log_error(f"Error in validate_credit_purchase: {str(e)}")
+		log_api_error("validate_credit_purchase", e)
 		return {
 			"can_purchase": False,
 			"message": "Error validating credit purchase"
@@ -0,0 +1,91 @@
+# Copyright (c) 2025, Dases and Contributors
+# See license.txt
+
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import flt
+
+from inventory.pos.doctype.pos_invoice.pos_invoice import create_pos_client_transaction
+
+CLIENT_CODE = "_TEST-CREDIT-CLIENT"
+CREDIT_LIMIT = 500
+CHARGE = 10
+CHARGES = 100
+
+
+class TestPOSClient(FrappeTestCase):
+	def setUp(self):
+		cleanup()
+		client = frappe.get_doc({
+			"doctype": "POS Client",
+			"client_code": CLIENT_CODE,
+			"first_name": "_Test",
+			"last_name": "Credit Client",
+			"allow_credit": 1,
+			"credit_limit": CREDIT_LIMIT,
+			"current_balance": 0,
+			"status": "Active",
+		})
+		client.insert(ignore_permissions=True)
+		self.client = client.name
+		frappe.db.commit()
+
+	def tearDown(self):
+		cleanup()
+
+	def test_parallel_charges_respect_credit_limit(self):
+		site = frappe.local.site
+		with ThreadPoolExecutor(max_workers=16) as executor:
+			results = list(executor.map(lambda _: charge(site, self.client), range(CHARGES)))
+
+		accepted = results.count(True)
+		self.assertEqual(accepted, CREDIT_LIMIT // CHARGE)
+
+		balance = flt(frappe.db.get_value("POS Client", self.client, "current_balance"))
+		self.assertEqual(balance, accepted * CHARGE)
+		self.assertLessEqual(balance, CREDIT_LIMIT)
+
+		transactions = frappe.get_all("POS Client Transaction",
+			filters={"client": self.client, "transaction_type": "Sale"},
+			fields=["amount", "balance_after"])
+		self.assertEqual(len(transactions), accepted)
+		self.assertEqual(sum(flt(t.amount) for t in transactions), balance)
+		# Every accepted charge saw a distinct balance, i.e. no update was lost
+		self.assertEqual(len({flt(t.balance_after) for t in transactions}), accepted)
+
+	def test_payment_reduces_balance(self):
+		create_pos_client_transaction(self.client, "Sale", 200)
+		create_pos_client_transaction(self.client, "Payment", 50)
+		self.assertEqual(flt(frappe.db.get_value("POS Client", self.client, "current_balance")), 150)
+
+	def test_charge_over_limit_is_rejected(self):
+		self.assertRaises(frappe.ValidationError,
+			create_pos_client_transaction, self.client, "Sale", CREDIT_LIMIT + 1)
+		self.assertEqual(flt(frappe.db.get_value("POS Client", self.client, "current_balance")), 0)
+
+
+def charge(site, client):
+	"""Charge the client from its own connection, like a separate web worker would"""
+	frappe.init(site=site)
+	frappe.connect()
+	frappe.set_user("Administrator")
+	try:
+		create_pos_client_transaction(client, "Sale", CHARGE)
+		frappe.db.commit()
+		return True
+	except frappe.ValidationError:
+		frappe.db.rollback()
+		return False
+	finally:
+		frappe.destroy()
+
+
+def cleanup():
+	frappe.db.rollback()
+	clients = frappe.get_all("POS Client", filters={"client_code": CLIENT_CODE}, pluck="name")
+	if clients:
+		frappe.db.delete("POS Client Transaction", {"client": ("in", clients)})
+		frappe.db.delete("POS Client", {"name": ("in", clients)})
+	frappe.db.commit()
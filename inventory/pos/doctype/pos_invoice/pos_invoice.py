@@ -5,6 +5,17 @@ import frappe
 from frappe import _
 from frappe.model.document import Document
 from frappe.utils import flt, now_datetime, getdate, nowtime
+from inventory.inventory.doctype.stock_ledger_entry.stock_ledger_entry import get_fiscal_year, get_posting_company
+from inventory.inventory.doctype.stock_reservation.stock_reservation import release_stock, reserve_stock
+from inventory.pos.cache import get_inventory_settings, get_pos_profile, get_pos_session
+from inventory.pos.stock_posting import (
+	get_item_quantities,
+	get_posting_warehouse,
+	is_deferred_stock_posting,
+	lock_stock_posting,
+	queue_stock_posting,
+	release_stock_posting,
+)
 
 
 class POSInvoice(Document):
@@ -20,18 +31,35 @@ class POSInvoice(Document):
 			self.posting_time = nowtime()
 
 	def before_submit(self):
-		self.update_stock()
+		if self.flags.stock_deltas is not None:
+			# Amendment: the original's stock stays posted, only the differences are added
+			self.post_stock_deltas(self.flags.stock_deltas)
+		elif is_deferred_stock_posting(self.pos_profile):
+			# Stock Ledger Entries are posted later by `post_deferred_stock`
+			queue_stock_posting(self)
+		else:
+			self.update_stock()
 		self.status = "Paid"
 
+	def before_cancel(self):
+		if self.stock_pending:
+			# Locked read: the background poster may have posted it since it was loaded
+			self.flags.stock_posting_dropped = lock_stock_posting(self.name)
+			self.stock_pending = 0
+
 	def on_cancel(self):
 		self.status = "Cancelled"
-		self.update_stock(cancel=True)
+		if self.flags.stock_posting_dropped:
+			# Never posted: nothing to reverse
+			release_stock_posting(self)
+		elif not self.flags.keep_stock_for_amendment:
+			self.update_stock(cancel=True)
 
 	def validate_pos_session(self):
 		"""Validate POS session is open"""
 		if self.pos_session:
-			session_status = frappe.db.get_value("POS Session", self.pos_session, "status")
-			if session_status not in ["Open"]:
+			session = get_pos_session(self.pos_session)
+			if not session or session.status not in ["Open"]:
 				frappe.throw(_("POS Session must be Open to create transactions"))
 
 	def validate_customer(self):
@@ -42,6 +70,7 @@ class POSInvoice(Document):
 	def calculate_totals(self):
 		"""Calculate invoice totals including profit analysis"""
 		self.total_qty = 0
+		self.item_count = len(self.items)
 		self.net_total = 0
 		self.total_cost = 0
 		self.total_profit = 0
@@ -127,6 +156,22 @@ class POSInvoice(Document):
 				cancel
 			)
 
+	def post_stock_deltas(self, deltas):
+		"""Post one stock ledger entry per item whose net quantity changed
+
+		`deltas` maps item code to (qty difference, rate) as returned by `get_stock_deltas`.
+		More sold means stock goes out, less sold means it comes back.
+		"""
+		default_warehouse = self.warehouse or self.get_default_warehouse()
+		for item_code, (qty, rate) in deltas.items():
+			self.create_stock_ledger_entry(
+				item_code,
+				default_warehouse,
+				qty,
+				rate,
+				cancel=qty < 0
+			)
+
 	def create_stock_ledger_entry(self, item_code, warehouse, qty, rate, cancel=False):
 		"""Create stock ledger entry for POS invoice item"""
 		if not warehouse:
@@ -150,16 +195,8 @@ class POSInvoice(Document):
 			sle.actual_qty = -abs(qty)  # Negative for sales
 			
 		sle.valuation_rate = rate
-		sle.company = self.company
-		# Get fiscal year from posting date
-		try:
-			from frappe.utils import get_fiscal_year
-			fiscal_year = get_fiscal_year(self.posting_date, company=self.company)[0]
-			sle.fiscal_year = fiscal_year
-		except:
-			# Fallback to current year if fiscal year calculation fails
-			from frappe.utils import getdate
-			sle.fiscal_year = str(getdate().year)
+		sle.company = self.company or get_posting_company()
+		sle.fiscal_year = get_fiscal_year(self.posting_date)
 		
 		sle.insert()
 		sle.submit()
@@ -172,7 +209,7 @@ class POSInvoice(Document):
 
 	def get_default_warehouse(self):
 		"""Get default warehouse from Inventory Settings"""
-		default_warehouse = frappe.db.get_single_value("Inventory Settings", "default_warehouse")
+		default_warehouse = get_inventory_settings().default_warehouse
 		if not default_warehouse:
 			frappe.throw(_("Please set Default Warehouse in Inventory Settings"))
 		return default_warehouse
@@ -202,18 +239,18 @@ class POSInvoice(Document):
 
 	@frappe.whitelist()
 	def print_receipt(self):
-		"""Generate receipt for printing"""
-		return {
-			"invoice": self.as_dict(),
-			"items": [item.as_dict() for item in self.items],
-			"payments": [payment.as_dict() for payment in self.payments],
-			"company": frappe.get_doc("Company", self.company).as_dict(),
-			"pos_profile": frappe.get_doc("POS Profile", self.pos_profile).as_dict()
-		}
+		"""Generate receipt for printing (compact payload, see `inventory.pos.receipt`)"""
+		from inventory.pos.receipt import get_receipt_data
+		return get_receipt_data(self.name)
 
 @frappe.whitelist()
-def create_pos_invoice(pos_profile, items, customer="Walk-in Customer", payments=None, pos_session=None, pos_client=None):
-	"""Create a new POS invoice"""
+def create_pos_invoice(pos_profile, items, customer="Walk-in Customer", payments=None, pos_session=None, pos_client=None, cart_id=None):
+	"""Create a new POS invoice
+
+	Unless the profile allows negative stock, the sale is refused when actual minus
+	reserved minus held stock does not cover it. `cart_id` releases the stock the cart was
+	holding (see `hold_cart_stock`) first, in the same transaction, so it counts for this sale.
+	"""
 	import json
 	
 	# Parse JSON strings if needed
@@ -223,17 +260,14 @@ def create_pos_invoice(pos_profile, items, customer="Walk-in Customer", payments
 		payments = json.loads(payments)
 	
 	# Get POS profile data
-	profile_doc = frappe.get_doc("POS Profile", pos_profile)
+	profile_doc = get_pos_profile(pos_profile)
+	if not profile_doc:
+		frappe.throw(_("POS Profile {0} not found").format(pos_profile))
 	
 	# Use provided session or find open session
 	if pos_session:
 		# Validate the provided session
-		session_data = frappe.db.get_value(
-			"POS Session",
-			pos_session,
-			["status", "pos_profile", "pos_user"],
-			as_dict=True
-		)
+		session_data = get_pos_session(pos_session)
 		if not session_data:
 			frappe.throw(_("Invalid POS session provided."))
 		if session_data.status != "Open":
@@ -258,6 +292,7 @@ def create_pos_invoice(pos_profile, items, customer="Walk-in Customer", payments
 	invoice.pos_profile = pos_profile
 	invoice.pos_session = session
 	invoice.customer = customer
+	invoice.pos_client = pos_client
 	invoice.company = profile_doc.company_name or "Default Company"
 	invoice.warehouse = profile_doc.warehouse_name
 	invoice.currency = profile_doc.currency
@@ -283,51 +318,121 @@ def create_pos_invoice(pos_profile, items, customer="Walk-in Customer", payments
 			})
 	
 	invoice.insert()
-	invoice.submit()
 	
-	# Handle POS Client credit transaction if applicable
-	if pos_client and payments:
-		for payment in payments:
-			if payment.get("payment_method") == "Credit":
-				create_pos_client_transaction(
-					pos_client,
-					"Sale",
-					flt(payment.get("amount")),
-					invoice.name
-				)
+	if cart_id:
+		from inventory.pos.doctype.pos_cart_hold.pos_cart_hold import release_cart_hold
+		release_cart_hold(cart_id)
+	if not profile_doc.allow_negative_stock:
+		check_till_stock(invoice)
+	
+	# Authorize the credit part of the sale before any stock is posted. The limit check
+	# and the balance update are one locked statement, so a stale client-side
+	# "available credit" cannot get through; a refusal rolls back the whole invoice.
+	credit_amount = sum(flt(p.get("amount")) for p in (payments or []) if p.get("payment_method") == "Credit")
+	if credit_amount > 0:
+		if not pos_client:
+			frappe.throw(_("Please select a POS Client for credit sales"))
+		create_pos_client_transaction(pos_client, "Sale", credit_amount, invoice.name)
+	
+	invoice.submit()
 	
 	return invoice
 
+def check_till_stock(invoice):
+	"""Refuse a sale that actual - reserved - held stock does not cover
+
+	The quantities are held and given back in the same transaction: the availability check
+	is the atomic one of `reserve_stock`, and its row locks stay until commit, so two tills
+	cannot both sell the last units.
+	"""
+	warehouse = get_posting_warehouse(invoice.warehouse)
+	quantities = get_item_quantities(invoice.items)
+	shortages = reserve_stock(warehouse, quantities, field="held_qty")
+	if shortages:
+		frappe.throw(_("Not enough stock in {0}: {1}").format(warehouse, ", ".join(
+			_("{0} (required {1}, available {2})").format(item_code, quantities[item_code], flt(available))
+			for item_code, available in shortages.items())), title=_("Insufficient Stock"))
+	release_stock(warehouse, quantities, field="held_qty")
+
+def on_doctype_update():
+	"""Indexes for the per-session invoice listings (recent invoices panel, session totals)
+	and the deferred stock poster's pending queue"""
+	frappe.db.add_index("POS Invoice", ["pos_session", "docstatus", "posting_date"],
+		"pos_invoice_session_docstatus_date_index")
+	frappe.db.add_index("POS Invoice", ["stock_pending", "docstatus"], "pos_invoice_stock_pending_index")
+
+def get_stock_deltas(old_items, new_items):
+	"""Net quantity change per item between two sets of invoice lines
+
+	Returns {item_code: (qty difference, rate)} for the items whose total quantity
+	changed; unchanged items are left out so they post nothing.
+	"""
+	deltas = {}
+	for item in old_items:
+		qty, rate = deltas.get(item.item_code, (0, 0))
+		deltas[item.item_code] = (qty - flt(item.qty), flt(item.rate))
+	for item in new_items:
+		qty, rate = deltas.get(item.item_code, (0, 0))
+		deltas[item.item_code] = (qty + flt(item.qty), flt(item.rate))
+	
+	return {item_code: (qty, rate) for item_code, (qty, rate) in deltas.items() if flt(qty, 6)}
+
+def get_invoice_client(invoice):
+	"""POS Client of a credit invoice
+
+	Invoices made before the client was stored on them are resolved through the client
+	transactions of their amendment chain.
+	"""
+	if invoice.pos_client:
+		return invoice.pos_client
+	
+	invoice_name = invoice.name
+	while invoice_name:
+		client = frappe.db.get_value("POS Client Transaction", {"reference_document": invoice_name}, "client")
+		if client:
+			return client
+		invoice_name = frappe.db.get_value("POS Invoice", invoice_name, "amended_from")
+
 def create_pos_client_transaction(client_name, transaction_type, amount, reference_document=None):
-	"""Create a POS Client Transaction record"""
-	try:
-		# Get current client balance
-		client = frappe.get_doc("POS Client", client_name)
-		
-		# Calculate new balance
-		if transaction_type == "Sale":
-			new_balance = client.current_balance + amount
-		elif transaction_type == "Payment":
-			new_balance = client.current_balance - amount
-		else:
-			new_balance = client.current_balance
-		
-		# Create transaction record
-		transaction = frappe.new_doc("POS Client Transaction")
-		transaction.client = client_name
-		transaction.transaction_type = transaction_type
-		transaction.amount = amount
-		transaction.balance_after = new_balance
-		transaction.reference_document = reference_document
-		transaction.insert()
-		transaction.submit()
-		
-		# Update client balance
-		frappe.db.set_value("POS Client", client_name, "current_balance", new_balance)
-		frappe.db.commit()
-		
-		return transaction
-		
-	except Exception as e:
-		frappe.log_error(f"Error creating POS client transaction: {str(e)}")
-		frappe.throw(_("Error processing credit transaction: {0}").format(str(e)))
\ No newline at end of file
+	"""Create a POS Client Transaction record
+
+	The client balance is updated with one conditional UPDATE (see `update_client_balance`),
+	so concurrent charges on the same client are safe. Sales are only applied within the
+	client's credit limit. Nothing is committed here: the transaction is part of the caller's
+	request (e.g. the invoice that is being posted).
+	"""
+	from inventory.pos.doctype.pos_client.pos_client import update_client_balance
+
+	amount = flt(amount)
+	if transaction_type == "Sale":
+		new_balance = update_client_balance(client_name, amount, check_credit_limit=True)
+		if new_balance is None:
+			frappe.throw(get_credit_refusal_message(client_name, amount))
+	elif transaction_type == "Payment":
+		new_balance = update_client_balance(client_name, -amount)
+	else:
+		new_balance = flt(frappe.db.get_value("POS Client", client_name, "current_balance"))
+
+	if new_balance is None:
+		frappe.throw(_("POS Client {0} not found").format(client_name))
+
+	# Create transaction record
+	transaction = frappe.new_doc("POS Client Transaction")
+	transaction.client = client_name
+	transaction.transaction_type = transaction_type
+	transaction.amount = amount
+	transaction.balance_after = new_balance
+	transaction.reference_document = reference_document
+	transaction.insert(ignore_permissions=True)
+
+	return transaction
+
+def get_credit_refusal_message(client_name, amount):
+	"""Explain why a credit sale was refused; only read on the refusal path"""
+	if not frappe.db.exists("POS Client", client_name):
+		return _("POS Client {0} not found").format(client_name)
+	
+	client = frappe.get_doc("POS Client", client_name)
+	message = client.can_make_credit_purchase(amount)[1]
+	return message or _("Credit sale of {0} exceeds the available credit of POS Client {1}").format(
+		amount, client_name)
@@ -0,0 +1,297 @@
+# Copyright (c) 2025, Dases and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, flt, now, nowdate
+
+from inventory.inventory.doctype.stock_reservation.stock_reservation import get_available_qty
+from inventory.pos.api import update_pos_invoice
+from inventory.pos.cache import invalidate_pos_lookup
+from inventory.pos.doctype.pos_cart_hold.pos_cart_hold import get_cart_hold_qty, hold_cart_items
+from inventory.pos.doctype.pos_invoice.pos_invoice import create_pos_invoice
+from inventory.pos.stock_posting import (
+	IN_FLIGHT_CACHE_KEY,
+	get_in_flight_qty,
+	post_deferred_stock,
+	reconcile_in_flight,
+	update_in_flight,
+)
+
+ITEM = "_Test POS Invoice Item"
+WAREHOUSE = "_Test POS Invoice Warehouse"
+PROFILE = "_Test POS Invoice Profile"
+SESSION = "_Test POS Invoice Session"
+CLIENT_CODE = "_TEST-POS-INVOICE-CLIENT"
+STOCK = 100
+RATE = 10
+
+
+class TestPOSInvoice(FrappeTestCase):
+	def setUp(self):
+		cleanup()
+		make_fixtures()
+		self.client = frappe.get_doc({
+			"doctype": "POS Client",
+			"client_code": CLIENT_CODE,
+			"first_name": "_Test",
+			"last_name": "Invoice Client",
+			"allow_credit": 1,
+			"credit_limit": 1000,
+			"current_balance": 0,
+			"status": "Active",
+		}).insert(ignore_permissions=True).name
+		frappe.db.commit()
+
+	def tearDown(self):
+		cleanup()
+
+	def test_failed_line_rolls_back_credit_charge(self):
+		# The second line fails its Stock Ledger Entry validation after the charge and the
+		# first line's entry were written (no stock check up front to stop it earlier)
+		frappe.db.set_value("POS Profile", PROFILE, "allow_negative_stock", 1)
+		invalidate_pos_lookup("POS Profile", PROFILE)
+		items = [
+			{"item_code": ITEM, "qty": 2, "rate": RATE},
+			{"item_code": "_Test POS Invoice Missing Item", "qty": 1, "rate": RATE},
+		]
+		self.assertRaises(frappe.ValidationError, create_pos_invoice, PROFILE, items,
+			payments=[{"payment_method": "Credit", "amount": 3 * RATE}],
+			pos_session=SESSION, pos_client=self.client)
+		frappe.db.rollback()
+
+		self.assertEqual(get_client_balance(self.client), 0)
+		self.assertFalse(frappe.db.exists("POS Client Transaction", {"client": self.client}))
+		self.assertEqual(get_ledger_qty(), STOCK)
+
+	def test_chained_amendments_find_the_client(self):
+		invoice = self.make_invoice(qty=2, credit=20)
+		# Credit unchanged: the first amendment writes no client transaction
+		first = amend(invoice.name, qty=3, credit=20)
+		# Credit reduced: the second one only writes a Payment
+		second = amend(first, qty=3, credit=10)
+		# Neither call passes the client
+		third = amend(second, qty=4, credit=40)
+
+		self.assertEqual(get_client_balance(self.client), 40)
+		self.assertEqual(frappe.db.get_value("POS Invoice", third, "pos_client"), self.client)
+		self.assertEqual(get_ledger_qty(), STOCK - 4)
+
+	def test_credit_increase_and_decrease(self):
+		invoice = self.make_invoice(qty=2, credit=20)
+		increased = amend(invoice.name, qty=4, credit=40)
+		self.assertEqual(get_client_balance(self.client), 40)
+
+		amend(increased, qty=4, credit=10)
+		self.assertEqual(get_client_balance(self.client), 10)
+
+		transactions = frappe.get_all("POS Client Transaction", filters={"client": self.client},
+			fields=["transaction_type", "amount"], order_by="creation")
+		self.assertEqual(
+			[(t.transaction_type, flt(t.amount)) for t in transactions],
+			[("Sale", 20), ("Sale", 20), ("Payment", 30)],
+		)
+
+	def test_cancelled_amendment_nets_the_ledger_to_zero(self):
+		invoice = self.make_invoice(qty=2)
+		amendment = amend(invoice.name, qty=5)
+		# The original's entries were kept, the amendment only posted the difference
+		self.assertEqual(get_ledger_qty(), STOCK - 5)
+		self.assertEqual(frappe.db.count("Stock Ledger Entry", {"voucher_no": amendment}), 1)
+
+		frappe.get_doc("POS Invoice", amendment).cancel()
+		self.assertEqual(get_ledger_qty(), STOCK)
+
+	def test_sale_beyond_available_stock_is_refused(self):
+		self.assertRaises(frappe.ValidationError, self.make_invoice, qty=STOCK + 1)
+		frappe.db.rollback()
+		self.assertEqual(get_ledger_qty(), STOCK)
+
+	def test_stock_held_by_another_cart_is_not_sold(self):
+		hold_cart_items("_Test Other Cart", WAREHOUSE, {ITEM: STOCK - 1})
+		self.assertRaises(frappe.ValidationError, self.make_invoice, qty=2)
+		frappe.db.rollback()
+
+		# The cart's own hold counts for its sale, and is released by it
+		hold_cart_items("_Test Own Cart", WAREHOUSE, {ITEM: STOCK})
+		create_pos_invoice(PROFILE, [{"item_code": ITEM, "qty": STOCK, "rate": RATE}],
+			payments=get_payments(STOCK), pos_session=SESSION, cart_id="_Test Own Cart")
+		self.assertEqual(get_cart_hold_qty("_Test Own Cart"), {})
+		self.assertEqual(get_ledger_qty(), 0)
+
+	def make_invoice(self, qty, credit=0):
+		return create_pos_invoice(PROFILE, [{"item_code": ITEM, "qty": qty, "rate": RATE}],
+			payments=get_payments(qty, credit), pos_session=SESSION,
+			pos_client=self.client if credit else None)
+
+
+class TestDeferredStockPosting(FrappeTestCase):
+	def setUp(self):
+		cleanup()
+		make_fixtures()
+		frappe.db.set_value("POS Profile", PROFILE, "deferred_stock_posting", 1)
+		invalidate_pos_lookup("POS Profile", PROFILE)
+		frappe.db.commit()
+
+		# The poster is run by the tests themselves
+		enqueue = patch.object(frappe, "enqueue")
+		enqueue.start()
+		self.addCleanup(enqueue.stop)
+
+	def tearDown(self):
+		cleanup()
+
+	def test_submit_marks_pending_and_reduces_availability(self):
+		invoice = sell(2)
+
+		self.assertEqual(frappe.db.get_value("POS Invoice", invoice, "stock_pending"), 1)
+		self.assertFalse(frappe.db.exists("Stock Ledger Entry", {"voucher_no": invoice}))
+		self.assertEqual(get_in_flight_qty(WAREHOUSE, [ITEM]), {ITEM: 2})
+		self.assertEqual(flt(get_available_qty(WAREHOUSE, [ITEM])[ITEM].available_qty), STOCK - 2)
+
+	def test_batch_posts_and_clears_in_flight(self):
+		invoice = sell(2)
+		post_deferred_stock()
+
+		self.assertEqual(frappe.db.get_value("POS Invoice", invoice, "stock_pending"), 0)
+		self.assertEqual(frappe.db.count("Stock Ledger Entry", {"voucher_no": invoice}), 1)
+		self.assertEqual(get_in_flight_qty(WAREHOUSE, [ITEM]), {})
+		# Counted once: by the ledger now, no longer in flight
+		self.assertEqual(flt(get_available_qty(WAREHOUSE, [ITEM])[ITEM].available_qty), STOCK - 2)
+
+	def test_cancel_before_posting_releases_in_flight(self):
+		invoice = sell(2)
+		frappe.get_doc("POS Invoice", invoice).cancel()
+		frappe.db.commit()
+
+		self.assertEqual(get_in_flight_qty(WAREHOUSE, [ITEM]), {})
+		self.assertFalse(frappe.db.exists("Stock Ledger Entry", {"voucher_no": invoice}))
+		self.assertEqual(get_ledger_qty(), STOCK)
+
+		# The poster has nothing left to do for it
+		post_deferred_stock()
+		self.assertEqual(get_ledger_qty(), STOCK)
+
+	def test_amending_pending_original(self):
+		invoice = sell(2)
+		amendment = amend(invoice, qty=5)
+		frappe.db.commit()
+
+		# The original's pending quantity is dropped, the amendment's is in flight
+		self.assertEqual(get_in_flight_qty(WAREHOUSE, [ITEM]), {ITEM: 5})
+		self.assertEqual(frappe.db.get_value("POS Invoice", amendment, "stock_pending"), 1)
+
+		post_deferred_stock()
+		self.assertFalse(frappe.db.exists("Stock Ledger Entry", {"voucher_no": invoice}))
+		self.assertEqual(get_ledger_qty(), STOCK - 5)
+		self.assertEqual(get_in_flight_qty(WAREHOUSE, [ITEM]), {})
+
+	def test_reconcile_rebuilds_drifted_counters(self):
+		sell(2)
+		# The counter lost the sale (e.g. the worker died before its after-commit update)
+		update_in_flight(WAREHOUSE, {ITEM: -5})
+		self.assertEqual(get_in_flight_qty(WAREHOUSE, [ITEM]), {})
+
+		reconcile_in_flight()
+		self.assertEqual(get_in_flight_qty(WAREHOUSE, [ITEM]), {ITEM: 2})
+
+		frappe.cache().delete_value(f"{IN_FLIGHT_CACHE_KEY}:{WAREHOUSE}")
+		reconcile_in_flight()
+		self.assertEqual(get_in_flight_qty(WAREHOUSE, [ITEM]), {ITEM: 2})
+
+	def test_closing_waits_for_pending_postings(self):
+		invoice = sell(2)
+		frappe.db.set_value("POS Invoice", invoice, "posting_date", add_days(nowdate(), -31))
+
+		closing = frappe.get_doc({
+			"doctype": "Stock Period Closing",
+			"period_type": "Month",
+			"period_end_date": add_days(nowdate(), -30),
+		}).insert()
+		self.assertRaises(frappe.ValidationError, closing.submit)
+
+
+def sell(qty):
+	"""Submit and commit a cash sale; returns the invoice name"""
+	invoice = create_pos_invoice(PROFILE, [{"item_code": ITEM, "qty": qty, "rate": RATE}],
+		payments=get_payments(qty), pos_session=SESSION)
+	frappe.db.commit()
+	return invoice.name
+
+
+def amend(invoice_name, qty, credit=0):
+	"""Amend an invoice through the POS endpoint; returns the amendment's name"""
+	return update_pos_invoice(invoice_name, [{"item_code": ITEM, "qty": qty, "rate": RATE}],
+		get_payments(qty, credit))["new_invoice"]
+
+
+def get_payments(qty, credit=0):
+	payments = [{"payment_method": "Credit", "amount": credit}] if credit else []
+	if qty * RATE > credit:
+		payments.append({"payment_method": "Cash", "amount": qty * RATE - credit})
+	return payments
+
+
+def make_fixtures():
+	timestamp = now()
+	common = (timestamp, timestamp, "Administrator", "Administrator")
+	frappe.db.bulk_insert("Item Category", fields=["name", "creation", "modified", "owner", "modified_by",
+		"category_name"], values=[("_Test POS Invoice Category", *common, "_Test POS Invoice Category")])
+	frappe.db.bulk_insert("UOM", fields=["name", "creation", "modified", "owner", "modified_by",
+		"uom_name", "uom_abbreviation"], values=[("_Test POS Invoice UOM", *common, "_Test POS Invoice UOM", "TPI")])
+	frappe.db.bulk_insert("Item", fields=["name", "creation", "modified", "owner", "modified_by", "item_code",
+		"item_name", "item_category", "unit_of_measurement", "valuation_rate"],
+		values=[(ITEM, *common, ITEM, ITEM, "_Test POS Invoice Category", "_Test POS Invoice UOM", 5)])
+	frappe.db.bulk_insert("Warehouse", fields=["name", "creation", "modified", "owner", "modified_by",
+		"warehouse_name", "warehouse_code", "warehouse_type"],
+		values=[(WAREHOUSE, *common, WAREHOUSE, WAREHOUSE, "Distribution")])
+	frappe.db.bulk_insert("POS Profile", fields=["name", "creation", "modified", "owner", "modified_by",
+		"profile_name", "company_name", "warehouse_name", "currency"],
+		values=[(PROFILE, *common, PROFILE, "_Test Company", WAREHOUSE, "USD")])
+	frappe.db.bulk_insert("POS Session", fields=["name", "creation", "modified", "owner", "modified_by",
+		"pos_profile", "pos_user", "period_start_date", "opening_time", "status"],
+		values=[(SESSION, *common, PROFILE, "Administrator", nowdate(), timestamp, "Open")])
+	frappe.db.bulk_insert("Stock Ledger Entry", fields=["name", "creation", "modified", "owner", "modified_by",
+		"docstatus", "item", "warehouse", "posting_date", "posting_time", "voucher_type", "voucher_no",
+		"actual_qty", "valuation_rate", "company", "fiscal_year"],
+		values=[(frappe.generate_hash(length=12), *common, 1, ITEM, WAREHOUSE, nowdate(), "00:00:00",
+			"Stock Entry", "_Test POS Invoice Opening", STOCK, 5, "_Test Company", nowdate()[:4])])
+
+
+def get_client_balance(client):
+	return flt(frappe.db.get_value("POS Client", client, "current_balance"))
+
+
+def get_ledger_qty():
+	return flt(frappe.db.sql("""
+		SELECT COALESCE(SUM(actual_qty), 0) FROM `tabStock Ledger Entry`
+		WHERE item = %s AND warehouse = %s AND is_cancelled = 0
+	""", (ITEM, WAREHOUSE))[0][0])
+
+
+def cleanup():
+	frappe.db.rollback()
+	invoices = frappe.get_all("POS Invoice", filters={"pos_profile": PROFILE}, pluck="name")
+	if invoices:
+		frappe.db.delete("POS Invoice Item", {"parent": ("in", invoices)})
+		frappe.db.delete("POS Invoice Payment", {"parent": ("in", invoices)})
+		frappe.db.delete("POS Invoice", {"name": ("in", invoices)})
+	clients = frappe.get_all("POS Client", filters={"client_code": CLIENT_CODE}, pluck="name")
+	if clients:
+		frappe.db.delete("POS Client Transaction", {"client": ("in", clients)})
+		frappe.db.delete("POS Client", {"name": ("in", clients)})
+	frappe.db.delete("Stock Ledger Entry", {"item": ITEM})
+	frappe.db.delete("POS Cart Hold", {"item": ITEM})
+	frappe.db.delete("Stock Reservation", {"item": ITEM})
+	frappe.db.delete("POS Session", {"name": SESSION})
+	frappe.db.delete("POS Profile", {"name": PROFILE})
+	frappe.db.delete("Warehouse", {"name": WAREHOUSE})
+	frappe.db.delete("Item", {"name": ITEM})
+	frappe.db.delete("UOM", {"name": "_Test POS Invoice UOM"})
+	frappe.db.delete("Item Category", {"name": "_Test POS Invoice Category"})
+	invalidate_pos_lookup("POS Profile", PROFILE)
+	invalidate_pos_lookup("POS Session", SESSION)
+	frappe.db.commit()
+	frappe.cache().delete_value(f"{IN_FLIGHT_CACHE_KEY}:{WAREHOUSE}")
@@ -11,6 +11,12 @@ class POSProfile(Document):
 		if self.payment_methods:
 			self.validate_payment_methods()
 	
+	def on_update(self):
+		from inventory.pos.cache import invalidate_pos_lookup
+		from inventory.pos.receipt import invalidate_receipt_header_cache
+		invalidate_pos_lookup(self.doctype, self.name)
+		invalidate_receipt_header_cache(self.name)
+	
 	def validate_default_profile(self):
 		"""Ensure only one default POS Profile exists"""
 		if self.is_default:
@@ -44,12 +50,13 @@ class POSProfile(Document):
 @frappe.whitelist()
 def get_default_pos_profile():
 	"""Get the default POS profile"""
+	from inventory.pos.cache import get_pos_profile
 	default_profile = frappe.db.get_value("POS Profile", {"is_default": 1}, "name")
 	if default_profile:
-		return frappe.get_doc("POS Profile", default_profile)
+		return get_pos_profile(default_profile)
 	else:
 		# Return the first available profile
 		first_profile = frappe.db.get_value("POS Profile", {}, "name")
 		if first_profile:
-			return frappe.get_doc("POS Profile", first_profile)
+			return get_pos_profile(first_profile)
 	return None 
\ No newline at end of file
@@ -0,0 +1,82 @@
+# Copyright (c) 2025, Dases and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from inventory.pos.cache import get_lookup_cache_key, get_pos_profile, invalidate_pos_lookup
+
+PROFILE_NAME = "_Test Cached POS Profile"
+
+
+class TestPOSProfile(FrappeTestCase):
+	def setUp(self):
+		frappe.delete_doc_if_exists("POS Profile", PROFILE_NAME)
+		frappe.get_doc({
+			"doctype": "POS Profile",
+			"profile_name": PROFILE_NAME,
+			"company_name": "_Test Company",
+			"currency": "DZD",
+		}).insert(ignore_permissions=True)
+		frappe.db.commit()
+
+	def tearDown(self):
+		frappe.db.rollback()
+		frappe.delete_doc_if_exists("POS Profile", PROFILE_NAME)
+		invalidate_pos_lookup("POS Profile", PROFILE_NAME)
+		frappe.db.commit()
+
+	def test_profile_lookups_are_memoized(self):
+		# Cold: the document is loaded once
+		self.assertEqual(get_pos_profile(PROFILE_NAME).company_name, "_Test Company")
+
+		# Same request: no queries at all
+		with self.assertQueryCount(0):
+			for _ in range(5):
+				get_pos_profile(PROFILE_NAME)
+
+		# Next request: served from the shared cache
+		frappe.local.pos_lookup_cache = {}
+		with self.assertQueryCount(0):
+			self.assertEqual(get_pos_profile(PROFILE_NAME).profile_name, PROFILE_NAME)
+
+	def test_update_invalidates_cached_profile(self):
+		get_pos_profile(PROFILE_NAME)
+
+		profile = frappe.get_doc("POS Profile", PROFILE_NAME)
+		profile.company_name = "_Test Company 2"
+		profile.save(ignore_permissions=True)
+
+		self.assertEqual(get_pos_profile(PROFILE_NAME).company_name, "_Test Company 2")
+
+	def test_shared_copy_is_dropped_on_commit(self):
+		get_pos_profile(PROFILE_NAME)
+		cache_key = get_lookup_cache_key("POS Profile", PROFILE_NAME)
+
+		profile = frappe.get_doc("POS Profile", PROFILE_NAME)
+		profile.company_name = "_Test Company 2"
+		profile.save(ignore_permissions=True)
+
+		# Other workers keep the committed copy until the change is committed
+		self.assertEqual(frappe.cache().get_value(cache_key)["doc"]["company_name"], "_Test Company")
+		# and this request neither reads nor refills it
+		self.assertEqual(get_pos_profile(PROFILE_NAME).company_name, "_Test Company 2")
+		self.assertEqual(frappe.cache().get_value(cache_key)["doc"]["company_name"], "_Test Company")
+
+		frappe.db.commit()
+		self.assertIsNone(frappe.cache().get_value(cache_key))
+
+	def test_late_write_of_an_old_copy_is_ignored(self):
+		get_pos_profile(PROFILE_NAME)
+		cache_key = get_lookup_cache_key("POS Profile", PROFILE_NAME)
+		# What a reader that loaded the row before the change would write back
+		old_copy = frappe.cache().get_value(cache_key)
+
+		profile = frappe.get_doc("POS Profile", PROFILE_NAME)
+		profile.company_name = "_Test Company 2"
+		profile.save(ignore_permissions=True)
+		frappe.db.commit()
+
+		frappe.cache().set_value(cache_key, old_copy)
+		frappe.local.pos_lookup_cache = {}
+		self.assertEqual(get_pos_profile(PROFILE_NAME).company_name, "_Test Company 2")
@@ -1,24 +1,30 @@
 # Copyright (c) 2024, Frappe Technologies Pvt. Ltd. and contributors
 # For license information, please see license.txt
 
+import json
+
 import frappe
 from frappe import _
 from frappe.model.document import Document
 from frappe.utils import now, getdate, flt, now_datetime
 
 
+# Payment method whose amounts are counted in the cash drawer (change is given from it)
+CASH_PAYMENT_METHOD = "Cash"
+
+
 class POSSession(Document):
 	def validate(self):
 		self.validate_session_status()
 		self.validate_opening_time()
 		self.set_status()
 
-	def before_save(self):
-		if self.status == "Open":
-			self.update_session_totals()
+	def on_update(self):
+		from inventory.pos.cache import invalidate_pos_lookup
+		invalidate_pos_lookup(self.doctype, self.name)
 
 	def validate_session_status(self):
-		if self.status == "Closed":
+		if self.status == "Closed" and not self.flags.closing:
 			frappe.throw(_("Cannot modify a closed session"))
 
 	def validate_opening_time(self):
@@ -29,22 +35,16 @@ class POSSession(Document):
 		if self.status == "Opening" and self.opening_time:
 			self.status = "Open"
 
-	def update_session_totals(self):
+	def update_session_totals(self, close_data=None):
 		"""Update session totals from POS Invoices including profit analysis"""
-		invoices = frappe.get_all(
-			"POS Invoice",
-			filters={
-				"pos_session": self.name,
-				"docstatus": 1
-			},
-			fields=["net_total", "grand_total", "total_qty", "total_cost", "total_profit"]
-		)
+		totals = (close_data or get_session_close_data(self.name)).totals
 		
-		self.net_total = sum(flt(inv.net_total) for inv in invoices)
-		self.grand_total = sum(flt(inv.grand_total) for inv in invoices)
-		self.total_quantity = sum(flt(inv.total_qty) for inv in invoices)
-		self.total_cost = sum(flt(inv.total_cost) for inv in invoices)
-		self.total_profit = sum(flt(inv.total_profit) for inv in invoices)
+		self.invoice_count = totals.invoice_count
+		self.net_total = totals.net_total
+		self.grand_total = totals.grand_total
+		self.total_quantity = totals.total_quantity
+		self.total_cost = totals.total_cost
+		self.total_profit = totals.total_profit
 		
 		# Calculate overall profit margin for the session
 		if self.net_total > 0:
@@ -54,51 +54,103 @@ class POSSession(Document):
 		
 		self.closing_amount = flt(self.opening_amount) + self.net_total
 
-	def update_payment_reconciliation(self):
-		"""Update payment reconciliation details"""
+	def update_payment_reconciliation(self, close_data=None, counted_amounts=None):
+		"""Update payment reconciliation details
+
+		`counted_amounts` maps payment method to the amount actually counted at close;
+		methods that were not counted are taken as expected. Cash is expected to be the
+		opening float plus cash received minus change given.
+		"""
+		close_data = close_data or get_session_close_data(self.name)
+		counted_amounts = counted_amounts or {}
+		
 		# Clear existing reconciliation
 		self.payment_reconciliation_details = []
 		
-		# Get all payment methods used in this session
-		payment_data = frappe.db.sql("""
-			SELECT 
-				ip.payment_method,
-				SUM(ip.amount) as total_amount,
-				COUNT(ip.name) as transaction_count
-			FROM `tabPOS Invoice Payment` ip
-			JOIN `tabPOS Invoice` pi ON ip.parent = pi.name
-			WHERE pi.pos_session = %s AND pi.docstatus = 1
-			GROUP BY ip.payment_method
-		""", self.name, as_dict=True)
+		payments = dict(close_data.payments)
+		payments.setdefault(CASH_PAYMENT_METHOD, frappe._dict(amount=0, transaction_count=0))
 		
-		for payment in payment_data:
+		self.cash_variance = 0
+		for payment_method, payment in payments.items():
+			expected = flt(payment.amount)
+			if payment_method == CASH_PAYMENT_METHOD:
+				expected += flt(self.opening_amount) - close_data.totals.change_amount
+			
+			actual = flt(counted_amounts.get(payment_method, expected))
 			self.append("payment_reconciliation_details", {
-				"payment_method": payment.payment_method,
-				"expected_amount": payment.total_amount,
-				"actual_amount": payment.total_amount,  # TODO: Allow manual entry
-				"difference": 0
+				"payment_method": payment_method,
+				"expected_amount": expected,
+				"transaction_count": payment.transaction_count,
+				"actual_amount": actual,
+				"difference": actual - expected
 			})
+			if payment_method == CASH_PAYMENT_METHOD:
+				self.cash_variance = actual - expected
 
 	@frappe.whitelist()
-	def close_session(self, closing_amount=None):
-		"""Close the POS session"""
+	def close_session(self, closing_amount=None, counted_amounts=None):
+		"""Close the POS session and snapshot it into a POS Z Report"""
 		if self.status == "Closed":
 			frappe.throw(_("Session is already closed"))
 		
-		self.update_session_totals()
-		self.status = "Closing"
+		if isinstance(counted_amounts, str):
+			counted_amounts = json.loads(counted_amounts)
+		
+		close_data = get_session_close_data(self.name)
+		self.update_session_totals(close_data)
 		self.closing_time = now()
 		self.period_end_date = getdate()
 		
 		if closing_amount:
 			self.closing_amount = flt(closing_amount)
 		
-		self.update_payment_reconciliation()
+		self.update_payment_reconciliation(close_data, counted_amounts)
+		self.z_report = self.create_z_report(close_data).name
+		
 		self.status = "Closed"
+		self.flags.closing = True
 		self.save()
 		
 		return self
 
+	def create_z_report(self, close_data):
+		"""Submit the end-of-shift snapshot for this session"""
+		cash = next(
+			(row for row in self.payment_reconciliation_details if row.payment_method == CASH_PAYMENT_METHOD),
+			None
+		)
+		report = frappe.get_doc({
+			"doctype": "POS Z Report",
+			"pos_session": self.name,
+			"pos_profile": self.pos_profile,
+			"pos_user": self.pos_user,
+			"report_date": getdate(),
+			"opening_time": self.opening_time,
+			"closing_time": self.closing_time,
+			"invoice_count": self.invoice_count,
+			"total_quantity": self.total_quantity,
+			"net_total": self.net_total,
+			"grand_total": self.grand_total,
+			"total_cost": self.total_cost,
+			"total_profit": self.total_profit,
+			"profit_margin_percent": self.profit_margin_percent,
+			"opening_amount": self.opening_amount,
+			"change_amount": close_data.totals.change_amount,
+			"expected_cash": cash.expected_amount if cash else 0,
+			"counted_cash": cash.actual_amount if cash else 0,
+			"cash_variance": self.cash_variance,
+			"payments": [{
+				"payment_method": row.payment_method,
+				"expected_amount": row.expected_amount,
+				"transaction_count": row.transaction_count,
+				"actual_amount": row.actual_amount,
+				"difference": row.difference
+			} for row in self.payment_reconciliation_details]
+		})
+		report.insert(ignore_permissions=True)
+		report.submit()
+		return report
+
 	@frappe.whitelist()
 	def get_session_summary(self):
 		"""Get session summary for the POS interface including profit analysis"""
@@ -113,6 +165,61 @@ class POSSession(Document):
 		}
 
 
+def get_session_close_data(session_name):
+	"""Invoice totals and per-method payment totals of a session in one statement
+
+	The "totals" row carries the invoice totals, the "payment" rows one method each;
+	both halves are served by the (pos_session, docstatus, posting_date) index.
+	"""
+	rows = frappe.db.sql("""
+		SELECT
+			'totals' AS row_type,
+			NULL AS payment_method,
+			COUNT(pi.name) AS row_count,
+			SUM(pi.net_total) AS net_total,
+			SUM(pi.grand_total) AS grand_total,
+			SUM(pi.total_qty) AS total_quantity,
+			SUM(pi.total_cost) AS total_cost,
+			SUM(pi.total_profit) AS total_profit,
+			SUM(pi.change_amount) AS change_amount
+		FROM `tabPOS Invoice` pi
+		WHERE pi.pos_session = %(session)s AND pi.docstatus = 1
+		UNION ALL
+		SELECT
+			'payment',
+			ip.payment_method,
+			COUNT(ip.name),
+			SUM(ip.amount),
+			0, 0, 0, 0, 0
+		FROM `tabPOS Invoice Payment` ip
+		INNER JOIN `tabPOS Invoice` pi ON ip.parent = pi.name AND ip.parenttype = 'POS Invoice'
+		WHERE pi.pos_session = %(session)s AND pi.docstatus = 1
+		GROUP BY ip.payment_method
+	""", {"session": session_name}, as_dict=True)
+	
+	totals = frappe._dict(invoice_count=0, net_total=0, grand_total=0, total_quantity=0,
+		total_cost=0, total_profit=0, change_amount=0)
+	payments = {}
+	for row in rows:
+		if row.row_type == "totals":
+			totals.update({
+				"invoice_count": int(row.row_count or 0),
+				"net_total": flt(row.net_total),
+				"grand_total": flt(row.grand_total),
+				"total_quantity": flt(row.total_quantity),
+				"total_cost": flt(row.total_cost),
+				"total_profit": flt(row.total_profit),
+				"change_amount": flt(row.change_amount)
+			})
+		else:
+			payments[row.payment_method] = frappe._dict(
+				amount=flt(row.net_total),
+				transaction_count=int(row.row_count or 0)
+			)
+	
+	return frappe._dict(totals=totals, payments=payments)
+
+
 @frappe.whitelist()
 def create_opening_entry(pos_profile, opening_amount=0):
 	"""Create a new POS session opening entry"""
@@ -130,9 +237,8 @@ def create_opening_entry(pos_profile, opening_amount=0):
 	if existing_session:
 		session_doc = frappe.get_doc("POS Session", existing_session)
 		# Get warehouse from POS Profile
-		profile_doc = frappe.get_doc("POS Profile", pos_profile)
 		session_dict = session_doc.as_dict()
-		session_dict['warehouse'] = profile_doc.warehouse_name
+		session_dict['warehouse'] = get_profile_warehouse(pos_profile)
 		return session_dict
 	
 	# Create new session
@@ -145,17 +251,22 @@ def create_opening_entry(pos_profile, opening_amount=0):
 	session.insert()
 	
 	# Get warehouse from POS Profile and add to response
-	profile_doc = frappe.get_doc("POS Profile", pos_profile)
 	session_dict = session.as_dict()
-	session_dict['warehouse'] = profile_doc.warehouse_name
+	session_dict['warehouse'] = get_profile_warehouse(pos_profile)
 	return session_dict
 
 
+def get_profile_warehouse(pos_profile):
+	from inventory.pos.cache import get_pos_profile
+	profile = get_pos_profile(pos_profile)
+	return profile.warehouse_name if profile else None
+
+
 @frappe.whitelist()
-def close_session(session_name):
-	"""Close a POS session"""
+def close_session(session_name, closing_amount=None, counted_amounts=None):
+	"""Close a POS session, optionally with the amounts counted per payment method"""
 	session = frappe.get_doc("POS Session", session_name)
-	return session.close_session()
+	return session.close_session(closing_amount, counted_amounts)
 
 
 @frappe.whitelist()
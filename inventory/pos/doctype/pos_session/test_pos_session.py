@@ -1,9 +1,86 @@
 # Copyright (c) 2025, Dases and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import flt, now, nowdate
+
+from inventory.commands.ledger_check import check_session_totals
+
+CLOSED_SESSION = "_Test Check Session Closed"
+OPEN_SESSION = "_Test Check Session Open"
 
 
 class TestPOSSession(FrappeTestCase):
-	pass
+	def setUp(self):
+		cleanup()
+		timestamp = now()
+		frappe.db.bulk_insert(
+			"POS Session",
+			fields=[
+				"name", "creation", "modified", "owner", "modified_by", "pos_profile", "pos_user",
+				"period_start_date", "status", "opening_amount", "net_total", "grand_total", "closing_amount",
+			],
+			values=[
+				# Stored totals drifted from the invoices
+				(CLOSED_SESSION, timestamp, timestamp, "Administrator", "Administrator", "_Test POS Profile",
+					"Administrator", nowdate(), "Closed", 100, 50, 50, 150),
+				# Totals of an open session are only computed at close
+				(OPEN_SESSION, timestamp, timestamp, "Administrator", "Administrator", "_Test POS Profile",
+					"Administrator", nowdate(), "Open", 100, 0, 0, 0),
+			],
+		)
+		frappe.db.bulk_insert(
+			"POS Invoice",
+			fields=[
+				"name", "creation", "modified", "owner", "modified_by", "docstatus", "pos_profile", "pos_session",
+				"customer", "posting_date", "posting_time", "currency", "net_total", "grand_total", "total_qty",
+			],
+			values=[
+				(f"_Test Check Invoice {i}", timestamp, timestamp, "Administrator", "Administrator", 1,
+					"_Test POS Profile", session, "_Test Customer", nowdate(), "10:00:00", "DZD", 40, 40, 2)
+				for i, session in enumerate([CLOSED_SESSION, CLOSED_SESSION, OPEN_SESSION])
+			],
+		)
+		frappe.db.commit()
+
+	def tearDown(self):
+		cleanup()
+
+	def test_only_closed_sessions_are_checked(self):
+		result = check_session_totals(0, 1, 500, repair=False)
+		reported = {mismatch["pos_session"] for mismatch in result["mismatches"]}
+
+		self.assertIn(CLOSED_SESSION, reported)
+		self.assertNotIn(OPEN_SESSION, reported)
+		self.assertEqual(
+			reported_totals(result, CLOSED_SESSION)["net_total"], (50, 80)
+		)
+
+	def test_repair_rewrites_closed_session_totals(self):
+		result = check_session_totals(0, 1, 500, repair=True)
+		self.assertGreaterEqual(result["repaired"], 1)
+
+		closed = frappe.db.get_value("POS Session", CLOSED_SESSION, ["net_total", "closing_amount"], as_dict=True)
+		self.assertEqual(flt(closed.net_total), 80)
+		self.assertEqual(flt(closed.closing_amount), 180)
+
+		# The open session is left as it is
+		self.assertEqual(flt(frappe.db.get_value("POS Session", OPEN_SESSION, "net_total")), 0)
+
+		# A second run finds nothing left to repair
+		result = check_session_totals(0, 1, 500, repair=False)
+		self.assertNotIn(CLOSED_SESSION, {mismatch["pos_session"] for mismatch in result["mismatches"]})
+
+
+def reported_totals(result, session):
+	for mismatch in result["mismatches"]:
+		if mismatch["pos_session"] == session:
+			return mismatch["stored_vs_ledger"]
+
+
+def cleanup():
+	frappe.db.rollback()
+	frappe.db.delete("POS Invoice", {"name": ["like", "_Test Check Invoice%"]})
+	frappe.db.delete("POS Session", {"name": ["in", [CLOSED_SESSION, OPEN_SESSION]]})
+	frappe.db.commit()
@@ -0,0 +1,8 @@
+// Copyright (c) 2025, Dases and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("POS Z Report", {
+// 	refresh(frm) {
+
+// 	},
+// });
@@ -0,0 +1,22 @@
+# Copyright (c) 2025, Dases and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+
+
+class POSZReport(Document):
+	"""Immutable end-of-shift snapshot of a POS Session, created when the session is closed"""
+
+	def validate(self):
+		self.validate_unique_session()
+
+	def validate_unique_session(self):
+		existing = frappe.db.get_value(
+			"POS Z Report",
+			{"pos_session": self.pos_session, "docstatus": 1, "name": ["!=", self.name]},
+			"name"
+		)
+		if existing:
+			frappe.throw(_("POS Session {0} already has Z Report {1}").format(self.pos_session, existing))
@@ -972,6 +972,9 @@ class POSApp {
 				const receiptPaid = ref(0);
 				const receiptChange = ref(0);
 				const shortcuts = ref({ functions: [], payments: [], products: [] });
+				// The server holds this till's cart items under this id until the sale or a clear
+				const cartId = frappe.utils.get_random(16);
+				let holdTimer = null;
 				
 				const snackbar = reactive({
 					show: false,
@@ -1153,7 +1156,7 @@ class POSApp {
 				const loadShortcuts = async () => {
 					try {
 						const response = await frappe.call({
-							method: 'inventory.doctype.pos_shortcut.pos_shortcut.get_all_shortcuts'
+							method: 'inventory.pos.doctype.pos_shortcut.pos_shortcut.get_all_shortcuts'
 						});
 						shortcuts.value = response.message || {};
 					} catch (error) {
@@ -1300,6 +1303,7 @@ class POSApp {
 
 				const completeSale = async () => {
 					if (!canCompleteSale.value) return;
+					clearTimeout(holdTimer);
 					completingSale.value = true;
 					try {
 						let response;
@@ -1327,7 +1331,8 @@ class POSApp {
 									items: cart.value,
 									payments: [{ payment_method: paymentMethod.value, amount: paidAmount.value }],
 									customer: selectedCustomer.value || 'Walk-in Customer',
-									pos_client: selectedPOSClient.value?.name || null
+									pos_client: selectedPOSClient.value?.name || null,
+									cart_id: cartId
 								}
 							});
 							if (response.message) {
@@ -1505,10 +1510,78 @@ class POSApp {
 					}
 				});
 
+				// Hold the cart's items so another till cannot sell the same units
+				const holdCart = async () => {
+					if (!currentSession.value?.warehouse || modifyingInvoice.value) return;
+					const items = cart.value.map(item => ({ item_code: item.item_code, qty: item.qty }));
+					try {
+						const response = await frappe.call({
+							method: items.length ? 'inventory.pos.api.hold_cart_stock' : 'inventory.pos.api.release_cart_stock',
+							args: items.length
+								? { cart_id: cartId, items: items, warehouse: currentSession.value.warehouse }
+								: { cart_id: cartId }
+						});
+						const shortages = response.message?.shortages || [];
+						if (shortages.length) {
+							showToast(__('Not enough stock for: ') + shortages.map(s => s.item_code).join(', '), 'warning');
+						}
+					} catch (error) {
+						console.error('Error holding cart stock:', error);
+					}
+				};
+
+				watch(cart, () => {
+					clearTimeout(holdTimer);
+					holdTimer = setTimeout(holdCart, 500);
+				}, { deep: true });
+
 				// Lifecycle
+				const loadBootstrap = async () => {
+					// One round trip for profiles, session, catalog, prices, shortcuts and customers.
+					// The last bundle is kept locally and reused when the server says it is unchanged.
+					const storageKey = `pos_bootstrap:${frappe.session.user}`;
+					let cached = null;
+					try {
+						cached = JSON.parse(localStorage.getItem(storageKey) || 'null');
+					} catch (e) {
+						cached = null;
+					}
+					const response = await frappe.call({
+						method: 'inventory.pos.bootstrap.get_pos_bootstrap',
+						args: { etag: cached?.etag || null }
+					});
+					let bundle = response.message || {};
+					if (bundle.not_modified && cached) {
+						bundle = cached;
+					} else {
+						try {
+							localStorage.setItem(storageKey, JSON.stringify(bundle));
+						} catch (e) {
+							// Catalog too large for local storage: just don't keep it
+						}
+					}
+
+					posProfiles.value = bundle.profiles || [];
+					if (!bundle.session) return;
+
+					currentSession.value = bundle.session;
+					showSessionDialog.value = false;
+					products.value = (bundle.items || []).map(item => ({
+						...item,
+						available_qty: item.stock_qty || 0
+					}));
+					shortcuts.value = bundle.shortcuts || {};
+					customers.value = bundle.customers || [];
+				};
+
 				onMounted(async () => {
-					await loadPOSProfiles();
-					await checkExistingSession();
+					try {
+						await loadBootstrap();
+					} catch (error) {
+						console.error('Error loading POS bootstrap:', error);
+						await loadPOSProfiles();
+						await checkExistingSession();
+					}
 				});
 
 				return {
@@ -0,0 +1,192 @@
+# Copyright (c) 2025, Dases and contributors
+# For license information, please see license.txt
+
+import base64
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+
+# Cache key prefixes for the receipt pipeline
+RECEIPT_HEADER_CACHE_KEY = "pos_receipt_header"
+RECEIPT_ESCPOS_CACHE_KEY = "pos_receipt_escpos"
+
+# Rendered receipts of submitted invoices never change, keep them a day
+ESCPOS_CACHE_TTL = 24 * 3600
+
+# ESC/POS control sequences
+ESC_INIT = b"\x1b@"
+ESC_ALIGN_LEFT = b"\x1ba\x00"
+ESC_ALIGN_CENTER = b"\x1ba\x01"
+ESC_BOLD_ON = b"\x1bE\x01"
+ESC_BOLD_OFF = b"\x1bE\x00"
+GS_CUT = b"\x1dV\x00"
+
+
+def get_receipt_header(pos_profile):
+    """Static receipt header/footer for a POS Profile, cached until the profile or settings change"""
+    cache_key = f"{RECEIPT_HEADER_CACHE_KEY}:{pos_profile}"
+    header = frappe.cache().get_value(cache_key)
+    if header is not None:
+        return header
+
+    profile = frappe.db.get_value(
+        "POS Profile",
+        pos_profile,
+        ["profile_name", "company_name", "currency", "letter_head", "print_format"],
+        as_dict=True
+    ) or frappe._dict()
+    settings = frappe.db.get_value(
+        "Inventory Settings",
+        "Inventory Settings",
+        ["company_name", "company_address", "company_phone", "company_email",
+         "rc_number", "nif_number", "nis_number", "article_imposition"],
+        as_dict=True
+    ) or frappe._dict()
+
+    header = {
+        "company": profile.company_name or settings.company_name,
+        "address": settings.company_address,
+        "phone": settings.company_phone,
+        "email": settings.company_email,
+        "rc": settings.rc_number,
+        "nif": settings.nif_number,
+        "nis": settings.nis_number,
+        "ai": settings.article_imposition,
+        "profile": profile.profile_name or pos_profile,
+        "currency": profile.currency,
+        "letter_head": profile.letter_head,
+        "print_format": profile.print_format,
+        "footer": _("Thank you for your purchase!"),
+    }
+    frappe.cache().set_value(cache_key, header)
+    return header
+
+
+def invalidate_receipt_header_cache(pos_profile=None):
+    """Drop the cached header of one profile (or of all profiles) and the rendered receipts"""
+    if pos_profile:
+        frappe.cache().delete_value(f"{RECEIPT_HEADER_CACHE_KEY}:{pos_profile}")
+    else:
+        frappe.cache().delete_keys(f"{RECEIPT_HEADER_CACHE_KEY}:*")
+    # Rendered receipts embed the header
+    frappe.cache().delete_keys(f"{RECEIPT_ESCPOS_CACHE_KEY}:*")
+
+
+def get_receipt_data(invoice_name, include_header=True):
+    """Only the fields the receipt template prints, read with three narrow queries"""
+    invoice = frappe.db.get_value(
+        "POS Invoice",
+        invoice_name,
+        ["name", "pos_profile", "customer", "posting_date", "posting_time", "currency",
+         "total_qty", "net_total", "grand_total", "rounding_adjustment", "paid_amount",
+         "change_amount", "status"],
+        as_dict=True
+    )
+    if not invoice:
+        frappe.throw(_("POS Invoice {0} not found").format(invoice_name))
+
+    items = frappe.db.sql("""
+        SELECT item_name, item_code, qty, rate, amount
+        FROM `tabPOS Invoice Item`
+        WHERE parent = %s AND parenttype = 'POS Invoice'
+        ORDER BY idx
+    """, invoice_name, as_list=True)
+
+    payments = frappe.db.sql("""
+        SELECT payment_method, amount
+        FROM `tabPOS Invoice Payment`
+        WHERE parent = %s AND parenttype = 'POS Invoice'
+        ORDER BY idx
+    """, invoice_name, as_list=True)
+
+    receipt = {
+        "name": invoice.name,
+        "customer": invoice.customer,
+        "date": str(invoice.posting_date),
+        "time": str(invoice.posting_time)[:8],
+        "currency": invoice.currency,
+        "qty": flt(invoice.total_qty),
+        "net": flt(invoice.net_total),
+        "rounding": flt(invoice.rounding_adjustment),
+        "total": flt(invoice.grand_total),
+        "paid": flt(invoice.paid_amount),
+        "change": flt(invoice.change_amount),
+        "status": invoice.status,
+        # Rows as [name, qty, rate, amount]: no repeated keys on long tickets
+        "items": [[row[0] or row[1], flt(row[2]), flt(row[3]), flt(row[4])] for row in items],
+        "payments": [[row[0], flt(row[1])] for row in payments],
+        "profile": invoice.pos_profile,
+    }
+    if include_header:
+        receipt["header"] = get_receipt_header(invoice.pos_profile)
+    return receipt
+
+
+def render_escpos(receipt, width=42, encoding="cp858"):
+    """Render a receipt payload as ESC/POS bytes for a `width`-column thermal printer"""
+    header = receipt.get("header") or get_receipt_header(receipt["profile"])
+
+    def line(text=""):
+        return str(text)[:width].encode(encoding, errors="replace") + b"\n"
+
+    def columns(left, right):
+        right = str(right)
+        left = str(left)[:max(width - len(right) - 1, 1)]
+        return line(left + " " * (width - len(left) - len(right)) + right)
+
+    def money(value):
+        return f"{flt(value):.2f}"
+
+    out = [ESC_INIT, ESC_ALIGN_CENTER, ESC_BOLD_ON, line(header.get("company") or ""), ESC_BOLD_OFF]
+    for key in ("address", "phone"):
+        for text in (header.get(key) or "").splitlines():
+            out.append(line(text))
+    for key, label in (("rc", "RC"), ("nif", "NIF"), ("nis", "NIS"), ("ai", "AI")):
+        if header.get(key):
+            out.append(line(f"{label}: {header[key]}"))
+
+    out += [ESC_ALIGN_LEFT, line("-" * width)]
+    out.append(columns(receipt["name"], f"{receipt['date']} {receipt['time']}"))
+    if receipt.get("customer"):
+        out.append(line(receipt["customer"]))
+    out.append(line("-" * width))
+
+    for name, qty, rate, amount in receipt["items"]:
+        out.append(line(name))
+        out.append(columns(f"  {qty:g} x {money(rate)}", money(amount)))
+
+    out.append(line("-" * width))
+    out += [ESC_BOLD_ON, columns(_("Total"), f"{money(receipt['total'])} {receipt.get('currency') or ''}".strip()), ESC_BOLD_OFF]
+    for method, amount in receipt["payments"]:
+        out.append(columns(method, money(amount)))
+    if receipt.get("change"):
+        out.append(columns(_("Change"), money(receipt["change"])))
+
+    out += [ESC_ALIGN_CENTER, line(), line(header.get("footer") or ""), line(), line(), GS_CUT]
+    return b"".join(out)
+
+
+@frappe.whitelist()
+def get_receipt(invoice_name, output="json", include_header=1, width=42):
+    """Receipt for a POS Invoice
+
+    `output="json"` returns the compact payload (set `include_header=0` when the
+    client already holds the profile header). `output="escpos"` returns base64
+    ESC/POS bytes, cached per invoice once it is submitted.
+    """
+    frappe.has_permission("POS Invoice", "read", invoice_name, throw=True)
+
+    if output != "escpos":
+        return get_receipt_data(invoice_name, include_header=cint(include_header))
+
+    width = cint(width) or 42
+    cache_key = f"{RECEIPT_ESCPOS_CACHE_KEY}:{invoice_name}:{width}"
+    cached = frappe.cache().get_value(cache_key)
+    if cached:
+        return cached
+
+    rendered = base64.b64encode(render_escpos(get_receipt_data(invoice_name), width=width)).decode()
+    if frappe.db.get_value("POS Invoice", invoice_name, "docstatus") == 1:
+        frappe.cache().set_value(cache_key, rendered, expires_in_sec=ESCPOS_CACHE_TTL)
+    return rendered
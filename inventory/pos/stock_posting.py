@@ -0,0 +1,268 @@
+# Copyright (c) 2025, Dases and contributors
+# For license information, please see license.txt
+
+"""Deferred ("submit now, post later") stock posting for POS invoices.
+
+When the POS Profile has `deferred_stock_posting`, a submitted invoice is only marked
+`stock_pending`; its quantities are added to an in-flight counter per warehouse
+(redis) and a background job posts the Stock Ledger Entries of many pending invoices
+at once, with one multi-row insert per batch. Availability checks subtract the
+in-flight quantities until the entries land.
+
+The counters are only adjusted after commit, so a worker dying in between (or a redis
+flush) leaves them off; every poster run rebuilds them from the pending invoices.
+
+Invoices dated in a closed stock period are never posted: a period cannot be closed
+while some are pending, and the poster leaves (and reports) any that slipped in.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import flt, getdate, now
+
+from inventory.inventory.doctype.stock_closing_balance.stock_closing_balance import get_last_closing_date
+from inventory.inventory.doctype.stock_ledger_entry.stock_ledger_entry import (
+    get_fiscal_year,
+    get_posting_company,
+)
+from inventory.pos.cache import get_inventory_settings, get_pos_profile
+
+# Redis hash per warehouse: item code -> quantity sold but not yet posted
+IN_FLIGHT_CACHE_KEY = "pos_stock_in_flight"
+
+# Pending invoices posted per transaction by the background job
+DEFERRED_POSTING_BATCH = 500
+
+
+def is_deferred_stock_posting(pos_profile):
+    profile = get_pos_profile(pos_profile)
+    return bool(profile and profile.deferred_stock_posting)
+
+
+def get_item_quantities(items):
+    """Quantity per item code of a set of invoice lines"""
+    quantities = {}
+    for item in items:
+        quantities[item.item_code] = quantities.get(item.item_code, 0) + flt(item.qty)
+    return quantities
+
+
+def get_posting_warehouse(warehouse):
+    return warehouse or get_inventory_settings().default_warehouse
+
+
+def update_in_flight(warehouse, quantities, sign=1):
+    """Add (or with sign=-1 remove) quantities to the warehouse's in-flight counter"""
+    if not warehouse or not quantities:
+        return
+    cache = frappe.cache()
+    key = cache.make_key(f"{IN_FLIGHT_CACHE_KEY}:{warehouse}")
+    pipe = cache.pipeline()
+    for item_code, qty in quantities.items():
+        pipe.hincrbyfloat(key, item_code, sign * flt(qty))
+    pipe.execute()
+
+
+def get_in_flight_qty(warehouse, item_codes=None):
+    """Quantities sold in `warehouse` whose stock posting has not landed yet, by item code"""
+    if not warehouse:
+        return {}
+    cache = frappe.cache()
+    key = cache.make_key(f"{IN_FLIGHT_CACHE_KEY}:{warehouse}")
+    pipe = cache.pipeline()
+    if item_codes is None:
+        pipe.hgetall(key)
+        counters = {item_code.decode(): flt(qty) for item_code, qty in pipe.execute()[0].items()}
+    else:
+        item_codes = list(item_codes)
+        if not item_codes:
+            return {}
+        pipe.hmget(key, item_codes)
+        counters = {
+            item_code: flt(qty)
+            for item_code, qty in zip(item_codes, pipe.execute()[0], strict=True)
+            if qty is not None
+        }
+
+    # Below zero only after a lost update: not counted, and rebuilt by the next poster run
+    if any(qty < 0 for qty in counters.values()):
+        enqueue_stock_posting()
+    return {item_code: qty for item_code, qty in counters.items() if qty > 0}
+
+
+def queue_stock_posting(invoice):
+    """Mark a submitting invoice for deferred posting (called from before_submit)"""
+    # The entries are inserted without their document validation, so the closed period is checked now
+    closing_date = get_last_closing_date()
+    if closing_date and getdate(invoice.posting_date) <= getdate(closing_date):
+        frappe.throw(_("Cannot post stock on {0}: stock period is closed up to {1}").format(
+            invoice.posting_date, closing_date))
+
+    invoice.stock_pending = 1
+    warehouse = get_posting_warehouse(invoice.warehouse)
+    quantities = get_item_quantities(invoice.items)
+
+    # Counted as in flight only once the invoice is committed
+    frappe.db.after_commit.add(lambda: update_in_flight(warehouse, quantities))
+    enqueue_stock_posting()
+
+
+def enqueue_stock_posting():
+    frappe.enqueue(
+        "inventory.pos.stock_posting.post_deferred_stock",
+        queue="short",
+        job_id=f"{frappe.local.site}:pos_deferred_stock_posting",
+        deduplicate=True,
+        enqueue_after_commit=True,
+    )
+
+
+def lock_stock_posting(invoice_name):
+    """Lock the invoice against the background poster; True if its stock is still pending"""
+    pending = frappe.db.sql("""
+        SELECT stock_pending FROM `tabPOS Invoice` WHERE name = %s FOR UPDATE
+    """, (invoice_name,))
+    return bool(pending and pending[0][0])
+
+
+def release_stock_posting(invoice):
+    """Give back the in-flight quantities of a pending invoice that is cancelled before posting"""
+    warehouse = get_posting_warehouse(invoice.warehouse)
+    quantities = get_item_quantities(invoice.items)
+    frappe.db.after_commit.add(lambda: update_in_flight(warehouse, quantities, sign=-1))
+
+
+def post_deferred_stock():
+    """Background job: post the Stock Ledger Entries of all pending invoices, in batches"""
+    while post_stock_batch():
+        pass
+    reconcile_in_flight()
+    report_closed_period_invoices()
+
+
+def post_stock_batch():
+    """Post one batch of pending invoices in one transaction; returns the number posted
+
+    Invoices dated on or before the last stock period closing are left pending: their
+    entries would change balances that are already closed.
+    """
+    closing_date = get_last_closing_date()
+    invoices = frappe.db.sql(f"""
+        SELECT name, owner, warehouse, posting_date, posting_time, company
+        FROM `tabPOS Invoice`
+        WHERE docstatus = 1 AND stock_pending = 1
+            {"AND posting_date > %(closing_date)s" if closing_date else ""}
+        ORDER BY creation
+        LIMIT {DEFERRED_POSTING_BATCH}
+        FOR UPDATE SKIP LOCKED
+    """, {"closing_date": closing_date}, as_dict=True)
+    if not invoices:
+        return 0
+
+    invoice_map = {invoice.name: invoice for invoice in invoices}
+    items = frappe.db.sql("""
+        SELECT parent, name, item_code, qty, rate
+        FROM `tabPOS Invoice Item`
+        WHERE parenttype = 'POS Invoice' AND parent IN %(invoices)s
+        ORDER BY parent, idx
+    """, {"invoices": tuple(invoice_map)}, as_dict=True)
+
+    timestamp = now()
+    company = get_posting_company()
+    values, in_flight, last_rates = [], {}, {}
+    for item in items:
+        invoice = invoice_map[item.parent]
+        warehouse = get_posting_warehouse(invoice.warehouse)
+        values.append((
+            frappe.generate_hash(length=10), timestamp, timestamp, invoice.owner, invoice.owner, 1,
+            item.item_code, warehouse, invoice.posting_date, invoice.posting_time, "POS Invoice",
+            invoice.name, item.name, -abs(flt(item.qty)), flt(item.rate), invoice.company or company,
+            get_fiscal_year(invoice.posting_date), 0,
+        ))
+        warehouse_quantities = in_flight.setdefault(warehouse, {})
+        warehouse_quantities[item.item_code] = warehouse_quantities.get(item.item_code, 0) + flt(item.qty)
+        last_rates[item.item_code] = flt(item.rate)
+
+    frappe.db.bulk_insert(
+        "Stock Ledger Entry",
+        fields=[
+            "name", "creation", "modified", "owner", "modified_by", "docstatus",
+            "item", "warehouse", "posting_date", "posting_time", "voucher_type",
+            "voucher_no", "voucher_detail_no", "actual_qty", "valuation_rate", "company",
+            "fiscal_year", "is_cancelled",
+        ],
+        values=values,
+    )
+    frappe.db.sql("""
+        UPDATE `tabPOS Invoice` SET stock_pending = 0 WHERE name IN %(invoices)s
+    """, {"invoices": tuple(invoice_map)})
+    update_standard_rates(last_rates, timestamp)
+    frappe.db.commit()
+
+    for warehouse, quantities in in_flight.items():
+        update_in_flight(warehouse, quantities, sign=-1)
+    return len(invoices)
+
+
+def reconcile_in_flight():
+    """Rebuild the in-flight counters from the quantities of the pending invoices
+
+    An invoice committed while this runs may be counted twice (here and by its own
+    after-commit update) until the next run, which only makes availability stricter.
+    """
+    rows = frappe.db.sql("""
+        SELECT inv.warehouse, item.item_code, SUM(item.qty) AS qty
+        FROM `tabPOS Invoice Item` item
+        INNER JOIN `tabPOS Invoice` inv ON inv.name = item.parent
+        WHERE item.parenttype = 'POS Invoice' AND inv.docstatus = 1 AND inv.stock_pending = 1
+        GROUP BY inv.warehouse, item.item_code
+    """, as_dict=True)
+
+    pending = {}
+    for row in rows:
+        quantities = pending.setdefault(get_posting_warehouse(row.warehouse), {})
+        quantities[row.item_code] = quantities.get(row.item_code, 0) + flt(row.qty)
+
+    cache = frappe.cache()
+    pipe = cache.pipeline(transaction=True)
+    for warehouse in set(frappe.get_all("Warehouse", pluck="name")) | set(pending):
+        key = cache.make_key(f"{IN_FLIGHT_CACHE_KEY}:{warehouse}")
+        pipe.delete(key)
+        if pending.get(warehouse):
+            pipe.hset(key, mapping=pending[warehouse])
+    pipe.execute()
+
+
+def report_closed_period_invoices():
+    """Log the pending invoices the poster cannot post because their period is closed"""
+    closing_date = get_last_closing_date()
+    if not closing_date:
+        return
+
+    invoices = frappe.db.sql_list("""
+        SELECT name FROM `tabPOS Invoice`
+        WHERE docstatus = 1 AND stock_pending = 1 AND posting_date <= %s
+        ORDER BY name
+    """, (closing_date,))
+    if invoices:
+        frappe.log_error(
+            _("Stock period is closed up to {0}. Cancel these POS Invoices or reopen the period: {1}").format(
+                closing_date, ", ".join(invoices)),
+            "Deferred Stock Posting",
+        )
+
+
+def update_standard_rates(rates, timestamp):
+    """Last selling rate as the items' standard rate, like a synchronous posting does, in one statement"""
+    if not rates:
+        return
+
+    cases, values = [], []
+    for item_code, rate in rates.items():
+        cases.append("WHEN %s THEN %s")
+        values.extend([item_code, rate])
+    frappe.db.sql(f"""
+        UPDATE `tabItem`
+        SET standard_rate = CASE item_code {' '.join(cases)} END, modified = %s
+        WHERE item_code IN ({', '.join(['%s'] * len(rates))})
+    """, [*values, timestamp, *rates])